@@ -1,25 +1,49 @@
 r"""
 XRAY
 """
-import json
-import os
-from app.core.utils import CustomJSONEncoder
 import sys
+# Замер времени импорта включается как можно раньше, до импорта остальных модулей
+from plugins.xray.utils.import_profiler import import_profiler
+import_profiler.install()
+import atexit
+import datetime
 import subprocess
 import platform
-import pkg_resources
 from sqlalchemy import delete, update, text
-from app.database import row2dict, session_scope, db, convert_utc_to_local
+from app.database import session_scope, db, convert_utc_to_local
 from app.core.main.BasePlugin import BasePlugin
+from plugins.xray.utils.startup_profiler import startup_profiler
+startup_profiler.hook_plugin_class(BasePlugin)
 from flask import render_template, redirect
 from app.core.main.PluginsHelper import plugins
 from app.core.main.ObjectsStorage import objects_storage
 from app.core.models.Plugins import Notify
-from app.core.lib.constants import CategoryNotify
 from app.api import api
+from plugins.xray.utils.metrics_store import MetricsStore
 from plugins.xray.utils.pool_monitor import DatabasePoolMonitor
+from plugins.xray.utils.pool_tracer import PoolTracer
+from plugins.xray.utils.query_profiler import QueryProfiler
+from plugins.xray.utils.analytics import DeltaTracker, AnalyticsSnapshot, AnalyticsPublisher, StatsPoller
+from plugins.xray.utils.event_bus import EventBus
+from plugins.xray.utils.table_stats import TableStatsCollector
+from plugins.xray.utils.db_info import DatabaseInfoCollector
+from plugins.xray.utils.cache_browser import CacheBrowser
+from plugins.xray.utils.thread_pool_monitor import ThreadPoolMonitor
+from plugins.xray.utils.latency import MethodLatencyTracker
+from plugins.xray.utils.rates import PropertyRateTracker
+from plugins.xray.utils.metrics_exporter import MetricsExporter
+from plugins.xray.utils.cycle_watchdog import CycleWatchdog
+from plugins.xray.utils.widget_snapshot import WidgetSnapshotter
+from plugins.xray.utils.packages import PackageInventory
+from plugins.xray.utils.thread_profiler import ThreadProfiler, get_threads_cpu
 from app.core.lib.object import updateProperty
 
+
+def _local_time(timestamp: float):
+    """Unix time -> локальное время для шаблонов"""
+    return convert_utc_to_local(datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc))
+
+
 class xray(BasePlugin):
 
     def __init__(self, app):
@@ -30,6 +54,12 @@ class xray(BasePlugin):
         self.category = "System"
         self.author = "Eraser"
         self.actions = ["widget"]
+        self.analytics_tracker = DeltaTracker()
+        self.analytics = AnalyticsSnapshot(self.analytics_tracker)
+        self.event_bus = EventBus()
+        self.package_inventory = PackageInventory()
+
+        startup_profiler.hook_registry(plugins)
 
         from plugins.xray.api import create_api_ns
         api_ns = create_api_ns(self)
@@ -37,12 +67,48 @@ class xray(BasePlugin):
 
     def initialization(self):
         from app.database import engine
-        self._pool_monitor = DatabasePoolMonitor(engine, self.logger)
+        # История мониторов сохраняется на диск и восстанавливается после перезапуска
+        self._metrics_store = MetricsStore(self.logger)
+        self._metrics_store.start()
+        atexit.register(self._metrics_store.stop)
+        self._pool_monitor = DatabasePoolMonitor(engine, self.logger, self.event_bus, self._metrics_store)
         interval = 5
         from app.configuration import Config
         if Config.DEBUG:
             interval = 1
         self._pool_monitor.start_monitoring(interval)
+        self._pool_tracer = PoolTracer(engine, self.logger)
+        self._pool_tracer.attach()
+        self._pool_monitor.wait_source = self._pool_tracer.wait_stats
+        self._query_profiler = QueryProfiler(engine, self.logger)
+        self._thread_pool_monitor = ThreadPoolMonitor(self.logger, event_bus=self.event_bus,
+                                                      store=self._metrics_store)
+        self._thread_pool_monitor.start_monitoring(interval)
+        self._analytics_publisher = AnalyticsPublisher(self.event_bus, self.analytics)
+        self._method_latency = MethodLatencyTracker()
+        # Замер каждого выполнения метода; без перехвата - выборка из снимков статистики
+        from app.core.main.ObjectManager import ObjectManager
+        if not self._method_latency.hook(ObjectManager):
+            self.logger.warning("ObjectManager.callMethod not found: method latency is sampled from stats")
+        self._property_rates = PropertyRateTracker()
+        # Один снимок getAdvancedStats() на такт для всех потребителей
+        self._stats_poller = StatsPoller(self.logger, objects_storage.getAdvancedStats,
+                                         [self._method_latency, self._property_rates, self.analytics,
+                                          self._analytics_publisher])
+        self._stats_poller.start_monitoring(interval)
+        self._metrics_exporter = MetricsExporter(self.logger, self._pool_monitor, self._thread_pool_monitor,
+                                                 self._stats_poller, self._method_latency, plugins)
+        self._table_stats = TableStatsCollector(engine, self.logger)
+        self._db_info = DatabaseInfoCollector(engine, self.logger)
+        self._db_info.start()
+        self._thread_profiler = ThreadProfiler(self.logger)
+        self._cycle_watchdog = CycleWatchdog(self.logger, plugins)
+        self._cycle_watchdog.start_monitoring()
+        self._widget_snapshot = WidgetSnapshotter(self.logger, plugins, objects_storage, self._pool_monitor,
+                                                  self._thread_pool_monitor, self._cycle_watchdog)
+        self._widget_snapshot.start()
+        # Профиль загрузки сохраняется, когда остальные плагины уже инициализированы
+        startup_profiler.save_later(120, self.logger)
 
     def get_pool_stats(self):
         """API для получения текущей статистики пула"""
@@ -50,11 +116,51 @@ class xray(BasePlugin):
             return self._pool_monitor.get_pool_stats()
         return None
 
-    def get_pool_history(self, minutes: int = 60):
-        """API для получения истории статистики пула"""
+    def get_pool_health(self):
+        """API для получения оценки здоровья пула"""
         if self._pool_monitor:
-            return self._pool_monitor.get_stats_history(minutes)
-        return []
+            return self._pool_monitor.get_health()
+        return None
+
+    def get_pool_history(self, minutes: int = 60, resolution: str = "auto"):
+        """API для получения истории статистики пула (разрешение, точки)"""
+        if self._pool_monitor:
+            return self._pool_monitor.get_history(minutes, resolution)
+        return resolution, []
+
+    def get_methods_latency(self, top: int = 10, by: str = "p99"):
+        """API для получения перцентилей времени выполнения методов"""
+        return {
+            "methods": self._method_latency.top(top, by),
+            "total": self._method_latency.merged(),
+        }
+
+    def get_hot_properties(self, top: int = 20, by: str = "write", window: str = "1m",
+                           level: str = "property"):
+        """API для получения самых нагруженных свойств/объектов"""
+        return self._property_rates.hottest(top, by, window, level)
+
+    def get_cycles_status(self):
+        """API для получения состояния циклических плагинов"""
+        return self._cycle_watchdog.get_status()
+
+    def get_thread_pools_history(self, minutes: int = 60, resolution: str = "auto"):
+        """API для получения истории пулов потоков и batch writer"""
+        return self._thread_pool_monitor.get_history(minutes, resolution)
+
+    def get_table_stats(self, refresh: bool = False):
+        """API для получения статистики таблиц из кэша"""
+        if refresh:
+            self._table_stats.refresh_async()
+        return {
+            "tables": self._table_stats.get_tables(),
+            "age": self._table_stats.age,
+            "ttl": self._table_stats.ttl,
+        }
+
+    def count_table(self, table_name: str):
+        """API для точного подсчёта строк таблицы"""
+        return self._table_stats.exact_count(table_name)
 
     def admin(self, request):
         tab = request.args.get("tab", "")
@@ -102,6 +208,16 @@ class xray(BasePlugin):
                 updateProperty("SystemVar.UnreadNotify", False, self.name)
             return redirect("xray?tab=notifications")
 
+        if op == 'refresh_tables':
+            self._table_stats.refresh_async()
+            return redirect("xray?tab=db")
+        if op == 'count_table':
+            try:
+                self._table_stats.exact_count(request.args.get("table", None))
+            except Exception as e:
+                self.logger.error(f"❌ Error count table {request.args.get('table')}: {e}")
+            return redirect("xray?tab=db")
+
         table_name = request.args.get("table", None)
         if table_name:
             table_name = f'"{table_name}"' if db.engine.dialect.name == 'postgresql' else f'`{table_name}`'
@@ -112,6 +228,7 @@ class xray(BasePlugin):
                     session.execute(query)
                     session.commit()
                     self.logger.info(f"✅ Table {table_name} cleared")
+                    self._table_stats.refresh_async()
                 except Exception as e:
                     session.rollback()
                     self.logger.error(f"❌ Error clear table {table_name}: {e}")
@@ -123,6 +240,7 @@ class xray(BasePlugin):
                     session.execute(query)
                     session.commit()
                     self.logger.info(f"✅ Table {table_name} droped")
+                    self._table_stats.refresh_async()
                 except Exception as e:
                     session.rollback()
                     self.logger.error(f"❌ Error drop table {table_name}: {e}")
@@ -144,6 +262,7 @@ class xray(BasePlugin):
                 self.logger.info(f"Installed package '{package}'!")
             except subprocess.CalledProcessError as e:
                 self.logger.exception(e)
+            self.package_inventory.invalidate()
 
             return redirect("xray?tab=system")
 
@@ -163,30 +282,10 @@ class xray(BasePlugin):
 
         if tab == "cache":
             from app.extensions import cache
-            keys = []
-            cache_type = cache.app.config.get('CACHE_TYPE', 'unknown')
-            if cache_type == 'redis':
-                key_prefix = cache.app.config.get('CACHE_KEY_PREFIX', '')
-                if key_prefix:
-                    pattern = f"{key_prefix}*"
-                else:
-                    pattern = "*"
-                redis_client = cache.cache._write_client
-                for key in redis_client.scan_iter(match=pattern):
-                    # Удаляем префикс
-                    key = key[len(key_prefix):]
-                    keys.append(key.decode('utf-8'))
-
-            elif cache_type == 'simple':
-                keys = cache.cache._cache
-
-            values = {}
-            for k in keys:
-                values[k] = json.dumps(cache.get(k), cls=CustomJSONEncoder, ensure_ascii=False)
+            browser = CacheBrowser(cache)
             content = {
-                "count": len(values),
-                "cache_type": cache_type,
-                "cache": values,
+                "count": browser.count(),
+                "cache_type": browser.cache_type,
                 "tab": tab,
             }
             return render_template("xray_cache.html", **content)
@@ -199,26 +298,32 @@ class xray(BasePlugin):
         elif tab == "props":
             props = {}
             stats = objects_storage.getAdvancedStats()
+            rates = self._property_rates.get_all()
             for key,obj in stats.items():
                 for name,prop in obj['stat_properties'].items():
                     if prop['last_write']:
                         props[key + "." + name] = prop
+                        props[key + "." + name]['rates'] = rates.get(key + "." + name)
                         props[key + "." + name]['object_id'] = obj['id']
                         props[key + "." + name]['description'] = obj['description'] if obj['description'] else obj['name']
                         props[key + "." + name]['last_write'] = convert_utc_to_local(prop['last_write'])
                         props[key + "." + name]['last_read'] = convert_utc_to_local(prop['last_read'])
             content = {
                 "props": props,
+                "hot_properties": self._property_rates.hottest(10, "total"),
+                "hot_objects": self._property_rates.hottest(10, "total", level="object"),
                 "tab": tab,
             }
             return render_template("xray_props.html", **content)
         elif tab == "methods":
             props = {}
             stats = objects_storage.getAdvancedStats()
+            latency = self._method_latency.get_all()
             for key,obj in stats.items():
                 for name,prop in obj['stat_methods'].items():
                     if prop['last_executed']:
                         props[key + "." + name] = prop
+                        props[key + "." + name]['latency'] = latency.get(key + "." + name)
                         props[key + "." + name]['object_id'] = obj['id']
                         props[key + "." + name]['description'] = obj['description'] if obj['description'] else obj['name']
                         props[key + "." + name]['last_executed'] = convert_utc_to_local(prop['last_executed'])
@@ -230,48 +335,32 @@ class xray(BasePlugin):
             }
             return render_template("xray_methods.html", **content)
         elif tab == "notifications":
-            notifications = Notify.query.order_by(Notify.created).all()
-            res = []
-            for rec in notifications:
-                item = row2dict(rec)
-                item['color'] = "danger"
-                if rec.category == CategoryNotify.Debug:
-                    item['color'] = "secondary"
-                elif rec.category == CategoryNotify.Warning:
-                    item['color'] = "warning"
-                elif rec.category == CategoryNotify.Info:
-                    item['color'] = "success"
-                res.append(item)
             content = {
-                "notifications": res,
                 "tab": tab,
             }
             return render_template("xray_notifications.html", **content)
         elif tab == "db":
-            tables = self.__get_table_info()
-            db_info = self.__get_db_info()
+            tables = self._table_stats.get_tables()
+            db_info = self._db_info.get_info()
             content = {
                 "tables": tables,
+                "tables_age": self._table_stats.age,
                 "db_info": db_info,
                 "tab": tab,
             }
             return render_template("xray_db.html", **content)
+        elif tab == "queries":
+            content = {
+                "status": self._query_profiler.status(),
+                "tab": tab,
+            }
+            return render_template("xray_queries.html", **content)
         elif tab == "thread_pools":
             content = {"tab": tab}
             return render_template("xray_thread_pools.html", **content)
         elif tab == "threads":
-            data = []
-            import threading
-            threads = threading.enumerate()
-            for thread in threads:
-                data.append({
-                    'name': thread.name,
-                    'id': thread.ident,
-                    'alive': thread.is_alive(),
-                    'daemon': thread.daemon
-                })
             content = {
-                "threads": data,
+                "threads": get_threads_cpu(),
                 "tab": tab,
             }
             return render_template("xray_threads.html", **content)
@@ -284,8 +373,10 @@ class xray(BasePlugin):
             return render_template("xray_cleaner.html", **content)
         elif tab == "system":
             packs = self.get_installed_packages()
+            import_times = sorted(import_profiler.by_top_level().values(), key=lambda item: item['time'], reverse=True)
             content = {
                 'packages': packs,
+                'import_times': import_times[:30],
                 'python': {
                     'info': sys.version,
                     'version': platform.python_version(),
@@ -293,7 +384,7 @@ class xray(BasePlugin):
                     'path': sys.prefix
                 },
                 'flask': {
-                    'version': pkg_resources.get_distribution("flask").version if 'flask' in {pkg.key for pkg in pkg_resources.working_set} else 'Not install',
+                    'version': self.package_inventory.version("flask") or 'Not install',
                 },
                 'venv': {
                     'active': True if hasattr(sys, 'real_prefix') or (hasattr(sys, 'base_prefix') and sys.base_prefix != sys.prefix) else False,
@@ -302,6 +393,21 @@ class xray(BasePlugin):
                 'tab': tab,
             }
             return render_template("xray_system.html", **content)
+        elif tab == "startup":
+            data = startup_profiler.compare()
+            current = data["current"]
+            # Шкала waterfall: от первого события до последнего
+            events = [(item["start"], item["start"] + item["duration"]) for item in current["plugin_phases"]]
+            events += [(rec["start"], rec["start"] + rec["cumulative"]) for rec in current["modules"]]
+            timeline = (min(e[0] for e in events), max(e[1] for e in events)) if events else (0, 0)
+            content = {
+                "startup": data,
+                "boot_started": _local_time(current["boot"]),
+                "timeline": timeline,
+                "saved": startup_profiler.saved,
+                "tab": tab,
+            }
+            return render_template("xray_startup.html", **content)
         elif tab == "analytics":
             content = {
                 "tab": tab,
@@ -309,450 +415,36 @@ class xray(BasePlugin):
             return render_template("xray_analytics.html", **content)
         else:
             values = {}
+            watchdog = self._cycle_watchdog.get_status()
             for name,plugin in plugins.items():
 
                 if 'cycle' in plugin['instance'].actions:
                     values[name] = {
                         "active": plugin['instance'].is_alive(),
-                        "last_active": convert_utc_to_local(plugin['instance'].dtUpdated)
+                        "last_active": convert_utc_to_local(plugin['instance'].dtUpdated),
+                        "watchdog": watchdog.get(name),
                     }
+            stalls = self._cycle_watchdog.get_stall_history()[:20]
+            for stall in stalls:
+                stall['started_local'] = _local_time(stall['started'])
+                stall['detected_local'] = _local_time(stall['detected'])
             content = {
                 "count": len(values),
                 "cycles": values,
+                "auto_restart": self._cycle_watchdog.auto_restart,
+                "watchdog_resolution": self._cycle_watchdog.interval,
+                "stalls": stalls,
                 "tab": tab,
             }
             return render_template("xray_cycles.html", **content)
 
     def get_installed_packages(self):
         try:
-            packages = []
-            # for dist in pkg_resources.working_set:
-            #     packages.append({'name': dist.project_name, 'version': dist.version})
-            # packages = sorted(packages, key=lambda x: x["name"])
-            result = subprocess.run([sys.executable, '-m', 'pip', 'list', '--format=freeze'], capture_output=True, text=True)
-            packages = []
-            for line in result.stdout.split('\n'):
-                if line.strip():
-                    name, version = line.split('==') if '==' in line else (line.strip(), '?')
-                    packages.append({'name': name, 'version': version})
-            return packages
+            return self.package_inventory.with_import_times(import_profiler.by_top_level())
         except Exception as e:
             self.logger.exception(e)
             return []
 
     def widget(self):
-        content = {}
-        services_count = 0
-        service_work = 0
-        for name,plugin in plugins.items():
-            if 'cycle' in plugin['instance'].actions:
-                services_count = services_count + 1
-                if plugin['instance'].is_alive():
-                    service_work = service_work + 1
-        content['services'] = {"count": services_count, "alive": service_work, "stopped": services_count - service_work}
-        content['objects'] = len(objects_storage.items())
+        content = self._widget_snapshot.get()
         return render_template("widget_xray.html",**content)
-
-    def __get_table_info(self):
-        """
-        Получает список таблиц с количеством строк и размером таблиц.
-        Работает для PostgreSQL, MySQL и SQLite.
-        """
-        engine = db.engine
-        tables = []
-
-        # Получаем все таблицы, определённые в SQLAlchemy
-        sqlalchemy_tables = {}
-        for class_name, model in db.Model.registry._class_registry.items():
-            if hasattr(model, '__tablename__') and hasattr(model, '__table__'):
-                table_name = model.__tablename__
-                sqlalchemy_tables[table_name] = model.__module__.split(".")[1]
-
-        def format_size(size_bytes):
-            """
-            Преобразует размер в байтах в удобочитаемый формат (например, "2.5 MB", "10 KB").
-            """
-            if size_bytes == 0:
-                return "0 B"
-
-            size_name = ("B", "KB", "MB", "GB", "TB")
-            i = 0
-            while size_bytes >= 1024 and i < len(size_name) - 1:
-                size_bytes /= 1024
-                i += 1
-            return f"{size_bytes:.2f} {size_name[i]}"
-
-        if engine.dialect.name == 'postgresql':
-            # Для PostgreSQL используем pg_total_relation_size для получения размера в байтах
-            query = text("""
-                SELECT
-                    table_name,
-                    (xpath('/row/cnt/text()', xml_count))[1]::text::int AS row_count,
-                    pg_total_relation_size(quote_ident(table_name)) AS size_bytes
-                FROM (
-                    SELECT
-                        table_name,
-                        query_to_xml(format('SELECT COUNT(*) AS cnt FROM %I', table_name), false, true, '') AS xml_count
-                    FROM information_schema.tables
-                    WHERE table_schema = 'public'
-                ) AS subquery;
-            """)
-            result = db.session.execute(query)
-            for row in result:
-                table_name = row.table_name
-                module = sqlalchemy_tables.get(table_name, 'Unknown')
-                tables.append({
-                    'table_name': table_name,
-                    'module': module,
-                    'row_count': row.row_count,
-                    'size': format_size(row.size_bytes)
-                })
-
-        elif engine.dialect.name == 'mysql':
-            # Для MySQL используем information_schema.tables для получения размера в байтах
-            query = text("""
-                SELECT
-                    table_name,
-                    table_rows AS row_count,
-                    (data_length + index_length) AS size_bytes
-                FROM information_schema.tables
-                WHERE table_schema = DATABASE();
-            """)
-            result = db.session.execute(query)
-            for row in result:
-                table_name = row.table_name
-                module = sqlalchemy_tables.get(table_name, 'Unknown')
-                tables.append({
-                    'table_name': table_name,
-                    'module': module,
-                    'row_count': row.row_count,
-                    'size': format_size(row.size_bytes)
-                })
-
-        elif engine.dialect.name == 'sqlite':
-            # Для SQLite используем PRAGMA table_info и COUNT(*)
-            query = text("SELECT name FROM sqlite_master WHERE type='table';")
-            result = db.session.execute(query)
-            for row in result:
-                table_name = row.name
-                module = sqlalchemy_tables.get(table_name, 'Unknown')
-                count_query = text(f"SELECT COUNT(*) AS row_count FROM '{table_name}';")
-                count_result = db.session.execute(count_query).scalar()
-                size_query = text("SELECT page_count * page_size AS size_bytes FROM pragma_page_count(), pragma_page_size();")
-                size_result = db.session.execute(size_query).scalar()
-                tables.append({
-                    'table_name': table_name,
-                    'module': module,
-                    'row_count': count_result,
-                    'size': format_size(size_result)
-                })
-
-        else:
-            raise NotImplementedError(f"Unsupported database dialect: {engine.dialect.name}")
-        return tables
-
-    def __get_db_info(self):
-        """
-        Получает информацию о подключенной СУБД: версия, размер, тип и другие параметры.
-        Работает для PostgreSQL, MySQL и SQLite.
-        """
-        engine = db.engine
-        dialect = engine.dialect.name
-        db_info = {
-            'type': dialect.upper(),
-            'version': 'Unknown',
-            'database_name': 'Unknown',
-            'database_size': 'Unknown',
-            'connection_string': str(engine.url).split('@')[-1] if '@' in str(engine.url) else str(engine.url).replace('sqlite:///', ''),
-            'max_connections': 'Unknown',
-            'active_connections': 'Unknown',
-            'idle_connections': 'Unknown',
-            'tables_count': 0,
-            'indexes_count': 0,
-            'views_count': 0,
-            'connections_usage_percent': 0,
-            'server_uptime': 'Unknown',
-            'charset': 'Unknown',
-            'collation': 'Unknown',
-        }
-
-        def format_size(size_bytes):
-            """Преобразует размер в байтах в удобочитаемый формат."""
-            if size_bytes == 0 or size_bytes is None:
-                return "0 B"
-            size_name = ("B", "KB", "MB", "GB", "TB")
-            i = 0
-            size = float(size_bytes)
-            while size >= 1024 and i < len(size_name) - 1:
-                size /= 1024
-                i += 1
-            return f"{size:.2f} {size_name[i]}"
-
-        try:
-            if dialect == 'postgresql':
-                # Получаем версию PostgreSQL
-                try:
-                    version_query = text("SELECT version();")
-                    result = db.session.execute(version_query).scalar()
-                    db_info['version'] = result.split(',')[0] if result else 'Unknown'
-                except Exception as e:
-                    self.logger.warning("Failed to get PostgreSQL version: %s", e)
-                
-                # Получаем имя базы данных
-                try:
-                    db_name_query = text("SELECT current_database();")
-                    db_name = db.session.execute(db_name_query).scalar()
-                    db_info['database_name'] = db_name if db_name else 'Unknown'
-                except Exception as e:
-                    self.logger.warning("Failed to get database name: %s", e)
-                
-                # Получаем размер базы данных
-                try:
-                    size_query = text("SELECT pg_database_size(current_database());")
-                    size_bytes = db.session.execute(size_query).scalar()
-                    db_info['database_size'] = format_size(size_bytes) if size_bytes is not None else '0 B'
-                except Exception as e:
-                    self.logger.warning("Failed to get database size: %s", e)
-                
-                # Получаем информацию о подключениях
-                try:
-                    conn_query = text("""
-                        SELECT 
-                            setting::int as max_conn,
-                            (SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()) as active_conn,
-                            (SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND state = 'idle') as idle_conn
-                        FROM pg_settings WHERE name = 'max_connections';
-                    """)
-                    conn_result = db.session.execute(conn_query).fetchone()
-                    if conn_result:
-                        db_info['max_connections'] = conn_result.max_conn if conn_result.max_conn is not None else 0
-                        db_info['active_connections'] = conn_result.active_conn if conn_result.active_conn is not None else 0
-                        db_info['idle_connections'] = conn_result.idle_conn if conn_result.idle_conn is not None else 0
-                    else:
-                        # Альтернативный способ получения max_connections
-                        try:
-                            max_conn_query = text("SHOW max_connections;")
-                            max_conn = db.session.execute(max_conn_query).scalar()
-                            db_info['max_connections'] = int(max_conn) if max_conn else 0
-                        except Exception:
-                            pass
-                        # Получаем активные подключения отдельно
-                        try:
-                            active_query = text("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database();")
-                            db_info['active_connections'] = db.session.execute(active_query).scalar() or 0
-                        except Exception:
-                            pass
-                        # Получаем idle подключения отдельно
-                        try:
-                            idle_query = text("SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND state = 'idle';")
-                            db_info['idle_connections'] = db.session.execute(idle_query).scalar() or 0
-                        except Exception:
-                            pass
-                except Exception as e:
-                    self.logger.warning("Failed to get connection info: %s", e)
-                
-                # Количество таблиц
-                try:
-                    tables_query = text("""
-                        SELECT COUNT(*) 
-                        FROM information_schema.tables 
-                        WHERE table_schema = 'public' AND table_type = 'BASE TABLE';
-                    """)
-                    tables_count = db.session.execute(tables_query).scalar()
-                    db_info['tables_count'] = tables_count if tables_count is not None else 0
-                except Exception as e:
-                    self.logger.warning("Failed to get tables count: %s", e)
-                    # Альтернативный способ
-                    try:
-                        alt_tables_query = text("""
-                            SELECT COUNT(*) 
-                            FROM pg_tables 
-                            WHERE schemaname = 'public';
-                        """)
-                        db_info['tables_count'] = db.session.execute(alt_tables_query).scalar() or 0
-                    except Exception:
-                        pass
-                
-                # Дополнительная статистика
-                try:
-                    # Количество индексов
-                    indexes_query = text("""
-                        SELECT COUNT(*) 
-                        FROM pg_indexes 
-                        WHERE schemaname = 'public';
-                    """)
-                    db_info['indexes_count'] = db.session.execute(indexes_query).scalar() or 0
-                except Exception:
-                    db_info['indexes_count'] = 0
-                
-                try:
-                    # Количество представлений (views)
-                    views_query = text("""
-                        SELECT COUNT(*) 
-                        FROM information_schema.views 
-                        WHERE table_schema = 'public';
-                    """)
-                    db_info['views_count'] = db.session.execute(views_query).scalar() or 0
-                except Exception:
-                    db_info['views_count'] = 0
-                
-                try:
-                    # Использование подключений в процентах
-                    if db_info['max_connections'] and db_info['max_connections'] != 'Unknown' and db_info['max_connections'] != 'N/A':
-                        total_conn = db_info['active_connections'] + db_info['idle_connections']
-                        if isinstance(total_conn, int) and isinstance(db_info['max_connections'], int):
-                            db_info['connections_usage_percent'] = round((total_conn / db_info['max_connections']) * 100, 1)
-                        else:
-                            db_info['connections_usage_percent'] = 0
-                    else:
-                        db_info['connections_usage_percent'] = 0
-                except Exception:
-                    db_info['connections_usage_percent'] = 0
-                
-                try:
-                    # Время работы сервера
-                    uptime_query = text("SELECT date_trunc('second', current_timestamp - pg_postmaster_start_time()) as uptime;")
-                    uptime_result = db.session.execute(uptime_query).scalar()
-                    if uptime_result:
-                        # Конвертируем interval в строку
-                        db_info['server_uptime'] = str(uptime_result)
-                    else:
-                        db_info['server_uptime'] = 'Unknown'
-                except Exception:
-                    db_info['server_uptime'] = 'Unknown'
-
-            elif dialect == 'mysql':
-                # Получаем версию MySQL
-                try:
-                    version_query = text("SELECT VERSION();")
-                    version = db.session.execute(version_query).scalar()
-                    db_info['version'] = version if version else 'Unknown'
-                except Exception as e:
-                    self.logger.warning("Failed to get MySQL version: %s", e)
-                
-                # Получаем имя базы данных
-                try:
-                    db_name_query = text("SELECT DATABASE();")
-                    db_name = db.session.execute(db_name_query).scalar()
-                    db_info['database_name'] = db_name if db_name else 'Unknown'
-                except Exception as e:
-                    self.logger.warning("Failed to get database name: %s", e)
-                
-                # Получаем размер базы данных
-                try:
-                    size_query = text("""
-                        SELECT 
-                            SUM(data_length + index_length) AS size_bytes,
-                            @@character_set_database AS charset,
-                            @@collation_database AS collation
-                        FROM information_schema.tables 
-                        WHERE table_schema = DATABASE();
-                    """)
-                    size_result = db.session.execute(size_query).fetchone()
-                    if size_result:
-                        db_info['database_size'] = format_size(size_result.size_bytes) if size_result.size_bytes else '0 B'
-                        db_info['charset'] = size_result.charset or 'Unknown'
-                        db_info['collation'] = size_result.collation or 'Unknown'
-                except Exception as e:
-                    self.logger.warning("Failed to get database size: %s", e)
-                
-                # Получаем информацию о подключениях
-                try:
-                    conn_query = text("""
-                        SELECT 
-                            @@max_connections as max_conn,
-                            (SELECT COUNT(*) FROM information_schema.PROCESSLIST WHERE DB = DATABASE()) as active_conn,
-                            (SELECT COUNT(*) FROM information_schema.PROCESSLIST WHERE DB = DATABASE() AND COMMAND = 'Sleep') as idle_conn
-                    """)
-                    conn_result = db.session.execute(conn_query).fetchone()
-                    if conn_result:
-                        db_info['max_connections'] = conn_result.max_conn if conn_result.max_conn is not None else 0
-                        db_info['active_connections'] = conn_result.active_conn if conn_result.active_conn is not None else 0
-                        db_info['idle_connections'] = conn_result.idle_conn if conn_result.idle_conn is not None else 0
-                except Exception as e:
-                    self.logger.warning("Failed to get connection info: %s", e)
-                
-                # Количество таблиц
-                try:
-                    tables_query = text("""
-                        SELECT COUNT(*) 
-                        FROM information_schema.tables 
-                        WHERE table_schema = DATABASE() AND table_type = 'BASE TABLE';
-                    """)
-                    tables_count = db.session.execute(tables_query).scalar()
-                    db_info['tables_count'] = tables_count if tables_count is not None else 0
-                except Exception as e:
-                    self.logger.warning("Failed to get tables count: %s", e)
-
-            elif dialect == 'sqlite':
-                # Версия SQLite
-                try:
-                    version_query = text("SELECT sqlite_version();")
-                    sqlite_version = db.session.execute(version_query).scalar()
-                    db_info['version'] = f"SQLite {sqlite_version}" if sqlite_version else 'Unknown'
-                except Exception as e:
-                    self.logger.warning("Failed to get SQLite version: %s", e)
-                
-                # Путь к базе данных
-                try:
-                    db_path = str(engine.url).replace('sqlite:///', '')
-                    db_name = db_path.split('/')[-1] if '/' in db_path else db_path.split('\\')[-1]
-                    db_info['database_name'] = db_name if db_name else 'Unknown'
-                except Exception as e:
-                    self.logger.warning("Failed to get database name: %s", e)
-                
-                # Получаем размер файла БД
-                try:
-                    db_path = str(engine.url).replace('sqlite:///', '')
-                    if os.path.exists(db_path):
-                        size_bytes = os.path.getsize(db_path)
-                        db_info['database_size'] = format_size(size_bytes)
-                    else:
-                        db_info['database_size'] = 'Unknown'
-                except Exception as e:
-                    self.logger.warning("Failed to get database size: %s", e)
-                
-                # Количество таблиц
-                try:
-                    tables_query = text("SELECT COUNT(*) FROM sqlite_master WHERE type='table';")
-                    tables_count = db.session.execute(tables_query).scalar()
-                    db_info['tables_count'] = tables_count if tables_count is not None else 0
-                except Exception as e:
-                    self.logger.warning("Failed to get tables count: %s", e)
-                
-                # SQLite не имеет понятия max_connections в том же смысле
-                db_info['max_connections'] = 'N/A'
-                db_info['active_connections'] = 'N/A'
-                db_info['idle_connections'] = 'N/A'
-
-        except Exception as e:
-            self.logger.exception("Error getting database info: %s", e)
-            db_info['error'] = str(e)
-        
-        # Убеждаемся, что все обязательные поля заполнены
-        if not db_info['type'] or db_info['type'] == 'UNKNOWN':
-            db_info['type'] = engine.dialect.name.upper() if engine.dialect.name else 'UNKNOWN'
-        
-        # Обрабатываем числовые значения
-        if db_info['tables_count'] is None or (isinstance(db_info['tables_count'], str) and db_info['tables_count'] in ['Unknown', 'N/A']):
-            db_info['tables_count'] = 0
-        
-        if db_info['indexes_count'] is None:
-            db_info['indexes_count'] = 0
-            
-        if db_info['views_count'] is None:
-            db_info['views_count'] = 0
-        
-        if db_info['connections_usage_percent'] is None:
-            db_info['connections_usage_percent'] = 0
-        
-        # Для подключений: если значение 'Unknown' или None, устанавливаем 0 (кроме SQLite, где 'N/A' нормально)
-        if db_info['active_connections'] == 'Unknown' or db_info['active_connections'] is None:
-            if dialect != 'sqlite':
-                db_info['active_connections'] = 0
-        
-        if db_info['idle_connections'] == 'Unknown' or db_info['idle_connections'] is None:
-            if dialect != 'sqlite':
-                db_info['idle_connections'] = 0
-
-        return db_info
@@ -1,7 +1,8 @@
-from flask import request, jsonify
+from flask import request, jsonify, Response
 from flask_restx import Namespace, Resource
 from app.api.decorators import api_key_required
 from app.authentication.handlers import handle_admin_required
+from app.database import db
 from plugins.xray import xray
 import time
 
@@ -16,6 +17,43 @@ def create_api_ns(instance: xray):
     return _api_ns
 
 
+@_api_ns.route("/stream")
+class stream(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Поток метрик (Server-Sent Events). topics - темы через запятую:
+        pool, thread_pools, batch_writer, analytics"""
+        topics = [t for t in request.args.get("topics", "").split(",") if t]
+        # Поток живёт долго: соединение, взятое при проверке пользователя, возвращаем в пул сразу
+        db.session.remove()
+        response = Response(_instance.event_bus.stream(topics), mimetype="text/event-stream")
+        response.headers["Cache-Control"] = "no-cache"
+        response.headers["X-Accel-Buffering"] = "no"
+        return response
+
+
+@_api_ns.route("/metrics")
+class metrics(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Метрики в формате OpenMetrics (Prometheus).
+        objects - объекты через запятую, для которых отдаются серии по объектам и методам"""
+        from plugins.xray.utils.metrics_exporter import CONTENT_TYPE
+        objects = [name for name in request.args.get("objects", "").split(",") if name]
+        return Response(_instance._metrics_exporter.render(objects), content_type=CONTENT_TYPE)
+
+
+@_api_ns.route("/history/store")
+class history_store(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Состояние хранилища истории на диске: размер, очередь записи, сжатие"""
+        return jsonify(_instance._metrics_store.status())
+
+
 @_api_ns.route("/database/pool/stats")
 class pool_stats(Resource):
     @api_key_required
@@ -35,23 +73,16 @@ class pool_history(Resource):
     def get(self):
         """Получить историю статистики пула"""
         minutes = request.args.get("minutes", 60, type=int)
-        history = _instance.get_pool_history(minutes)
+        resolution = request.args.get("resolution", "auto")
+        try:
+            resolution, history = _instance.get_pool_history(minutes, resolution)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
         return jsonify(
             {
-                "history": [
-                    {
-                        "active_connections": stat.active_connections,
-                        "idle_connections": stat.idle_connections,
-                        "total_connections": stat.total_connections,
-                        "overflow": stat.overflow,
-                        "timestamp": stat.timestamp,
-                        "usage_percent": round(
-                            (stat.active_connections / stat.pool_size) * 100, 1
-                        ),
-                    }
-                    for stat in history
-                ],
+                "history": history,
+                "resolution": resolution,
                 "period_minutes": minutes,
                 "total_records": len(history),
             }
@@ -63,75 +94,438 @@ class pool_health(Resource):
     @api_key_required
     @handle_admin_required
     def get(self):
-        """Получить показатели здоровья пула"""
-        stats = _instance.get_pool_stats()
-        if not stats:
+        """Получить показатели здоровья пула: оценка по окну истории, причины и рекомендации по размеру"""
+        health = _instance.get_pool_health()
+        if not health:
             return jsonify({"error": "Pool monitoring not available"}), 503
+        return jsonify(health)
 
-        health_score = 100
-        warnings = []
+@_api_ns.route("/database/pool/sampling")
+class pool_sampling(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Параметры опроса пула: текущий адаптивный интервал и сэмплы по событиям"""
+        return jsonify(_instance._pool_monitor.get_sampling())
 
-        # Проверки здоровья
-        if stats.pool_usage_percent > 90:
-            health_score -= 80
-            warnings.append("Critical pool usage")
-        elif stats.pool_usage_percent > 80:
-            health_score -= 50
-            warnings.append("High pool usage")
+    @api_key_required
+    @handle_admin_required
+    def post(self):
+        """Включить/выключить адаптивный интервал (adaptive) и сэмплы по событиям пула (event_driven)"""
+        monitor = _instance._pool_monitor
+        adaptive = request.args.get("adaptive", None, type=int)
+        if adaptive is not None:
+            monitor.adaptive = bool(adaptive)
+        event_driven = request.args.get("event_driven", None, type=int)
+        if event_driven is not None:
+            monitor.set_event_driven(bool(event_driven))
+        return jsonify(monitor.get_sampling())
 
-        recommendations = []
-        if stats.pool_usage_percent > 85:
-            recommendations.append("Consider increasing pool size")
 
-        return jsonify(
-            {
-                "health_score": max(health_score, 0),
-                'status': 'healthy' if health_score > 80 else 'warning' if health_score > 50 else 'critical',
-                "warnings": warnings,
-                "recommendations": recommendations,
-            }
-        )
+@_api_ns.route("/database/pool/callers")
+class pool_callers(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Кто берёт соединения пула: время ожидания и удержания по вызывающему коду.
+        sort - total/p99/max/count/wait"""
+        top = request.args.get("top", 50, type=int)
+        sort = request.args.get("sort", "total")
+        try:
+            return jsonify(_instance._pool_tracer.get_callers(top, sort))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+
+@_api_ns.route("/database/pool/checkouts")
+class pool_checkouts(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Выданные сейчас соединения: кто, в каком потоке и сколько держит"""
+        return jsonify(_instance._pool_tracer.get_checkouts())
+
+
+@_api_ns.route("/database/pool/leaks")
+class pool_leaks(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Соединения, удерживаемые дольше порога (возможные утечки)"""
+        return jsonify(_instance._pool_tracer.get_checkouts(leaks_only=True))
+
+
+@_api_ns.route("/database/pool/tracing")
+class pool_tracing(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Состояние трассировки соединений"""
+        return jsonify(_instance._pool_tracer.summary())
+
+    @api_key_required
+    @handle_admin_required
+    def post(self):
+        """Включить/выключить трассировку (enabled) и изменить порог утечки (leak_threshold, секунды)"""
+        tracer = _instance._pool_tracer
+        leak_threshold = request.args.get("leak_threshold", None, type=float)
+        if leak_threshold is not None:
+            if leak_threshold <= 0:
+                return jsonify({"error": "leak_threshold must be positive"}), 400
+            tracer.leak_threshold = leak_threshold
+        enabled = request.args.get("enabled", None, type=int)
+        if enabled:
+            tracer.attach()
+        elif enabled is not None:
+            tracer.detach()
+        return jsonify(tracer.summary())
+
+
+@_api_ns.route("/database/queries")
+class database_queries(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Статистика по нормализованным запросам. sort - total/mean/p95/max/count/rows"""
+        top = request.args.get("top", 50, type=int)
+        sort = request.args.get("sort", "total")
+        try:
+            statements = _instance._query_profiler.get_statements(top, sort)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"status": _instance._query_profiler.status(), "statements": statements})
+
+
+@_api_ns.route("/database/queries/slow")
+class database_queries_slow(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Самые медленные выполнения запросов с параметрами и плагином"""
+        return jsonify(_instance._query_profiler.get_slow())
+
+
+@_api_ns.route("/database/queries/profiler")
+class database_queries_profiler(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Состояние профилировщика запросов"""
+        return jsonify(_instance._query_profiler.status())
+
+    @api_key_required
+    @handle_admin_required
+    def post(self):
+        """Включить/выключить профилировщик (enabled) или сбросить статистику (reset)"""
+        profiler = _instance._query_profiler
+        enabled = request.args.get("enabled", None, type=int)
+        if enabled:
+            profiler.enable()
+        elif enabled is not None:
+            profiler.disable()
+        if request.args.get("reset", 0, type=int):
+            profiler.reset()
+        return jsonify(profiler.status())
+
+
+@_api_ns.route("/database/tables")
+class database_tables(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Получить статистику таблиц: оценка строк и размеры данных/индексов/TOAST"""
+        refresh = request.args.get("refresh", 0, type=int)
+        return jsonify(_instance.get_table_stats(bool(refresh)))
+
+
+@_api_ns.route("/database/tables/<string:table>/count")
+class database_table_count(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self, table):
+        """Точный COUNT(*) для таблицы"""
+        count = _instance.count_table(table)
+        if count is None:
+            return jsonify({"error": f"Unknown table: {table}"}), 404
+        return jsonify({"table": table, "row_count": count})
+
+@_api_ns.route("/cache/keys")
+class cache_keys(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Получить страницу ключей кэша (cursor, count, prefix, limit)"""
+        from app.extensions import cache
+        from plugins.xray.utils.cache_browser import CacheBrowser, DEFAULT_VALUE_LIMIT
+
+        cursor = request.args.get("cursor", 0, type=int)
+        count = min(request.args.get("count", 50, type=int), 1000)
+        prefix = request.args.get("prefix", "")
+        limit = request.args.get("limit", DEFAULT_VALUE_LIMIT, type=int)
+        browser = CacheBrowser(cache)
+        data = browser.page(cursor, count, prefix, limit)
+        data["cache_type"] = browser.cache_type
+        return jsonify(data)
+
+
+@_api_ns.route("/cache/stats")
+class cache_stats(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Статистика размеров и TTL ключей кэша по префиксам (sample, top)"""
+        from app.extensions import cache
+        from plugins.xray.utils.cache_browser import CacheBrowser, DEFAULT_STATS_SAMPLE
+
+        sample = request.args.get("sample", DEFAULT_STATS_SAMPLE, type=int)
+        top = request.args.get("top", 20, type=int)
+        return jsonify(CacheBrowser(cache).stats(sample, top))
+
+
+@_api_ns.route("/cache/value")
+class cache_value(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Получить полное значение ключа кэша"""
+        from app.extensions import cache
+        from plugins.xray.utils.cache_browser import CacheBrowser
+
+        key = request.args.get("key", None)
+        if not key:
+            return jsonify({"error": "Parameter 'key' is required"}), 400
+        return jsonify({"key": key, "value": CacheBrowser(cache).get_value(key)})
+
+@_api_ns.route("/notifications")
+class notifications(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Получить страницу уведомлений (limit, cursor, category, source, read)"""
+        from plugins.xray.utils.notifications import get_notifications_page
+
+        limit = min(request.args.get("limit", 100, type=int), 1000)
+        read = request.args.get("read", None, type=int)
+        try:
+            page = get_notifications_page(
+                limit,
+                request.args.get("cursor", None),
+                request.args.get("category", None),
+                request.args.get("source", None),
+                bool(read) if read is not None else None,
+            )
+        except ValueError as e:
+            return jsonify({"error": f"Invalid cursor: {e}"}), 400
+        return jsonify(page)
+
+
+@_api_ns.route("/notifications/counts")
+class notifications_counts(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Количество уведомлений по категориям и источникам"""
+        from plugins.xray.utils.notifications import get_notification_counts
+
+        return jsonify(get_notification_counts())
 
 @_api_ns.route("/analytics/stats")
 class analytics_stats(Resource):
     @api_key_required
     @handle_admin_required
     def get(self):
-        """Получить сырые данные для аналитики"""
-        from app.core.main.ObjectsStorage import objects_storage
+        """Получить сводку для аналитики (raw=1 - сырые данные getAdvancedStats).
+
+        since - курсор из предыдущего ответа: в режиме raw возвращаются только
+        изменившиеся объекты/свойства/методы, в режиме сводки - флаг unchanged,
+        если с курсора ничего не изменилось.
+        """
+        # Снимок и изменения считаются один раз за такт опроса, а не на каждый запрос
+        snapshot = _instance.analytics
+        if snapshot.stats is None:
+            _instance._stats_poller.poll()
+        since = request.args.get("since", None, type=int)
+
+        if request.args.get("raw", 0, type=int):
+            if since is None:
+                return jsonify({
+                    "stats": snapshot.stats,
+                    "cursor": snapshot.cursor,
+                    "timestamp": snapshot.timestamp
+                })
+            delta = dict(snapshot.changes(since))
+            delta["timestamp"] = snapshot.timestamp
+            return jsonify(delta)
+
+        cursor = snapshot.cursor
+        if since is not None and 0 < since == cursor:
+            return jsonify({
+                "unchanged": True,
+                "cursor": cursor,
+                "timestamp": snapshot.timestamp
+            })
+
+        top = request.args.get("top", 10, type=int)
+        return jsonify({
+            "summary": snapshot.summary(top),
+            "cursor": cursor,
+            "timestamp": snapshot.timestamp
+        })
+
+@_api_ns.route("/properties/rates")
+class properties_rates(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Самые нагруженные свойства (операций в секунду).
+        by - read/write/total, window - 1m/5m/15m, level - property/object"""
+        top = request.args.get("top", 20, type=int)
+        by = request.args.get("by", "write")
+        window = request.args.get("window", "1m")
+        level = request.args.get("level", "property")
+        try:
+            items = _instance.get_hot_properties(top, by, window, level)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        return jsonify({"items": items, "by": by, "window": window, "level": level})
+
+@_api_ns.route("/methods/latency")
+class methods_latency(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Перцентили времени выполнения методов: top - количество, by - p50/p95/p99/max/avg"""
+        top = request.args.get("top", 10, type=int)
+        by = request.args.get("by", "p99")
+        if by not in ("p50", "p95", "p99", "max", "avg", "count"):
+            return jsonify({"error": f"Unknown sort field: {by}"}), 400
+        return jsonify(_instance.get_methods_latency(top, by))
+
+@_api_ns.route("/cycles")
+class cycles(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Состояние циклических плагинов: период, перцентили интервалов, зависания"""
+        return jsonify(_instance.get_cycles_status())
 
-        stats = objects_storage.getAdvancedStats()
+@_api_ns.route("/cycles/stalls")
+class cycles_stalls(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """История зависаний циклов (plugin - фильтр по плагину)"""
+        plugin = request.args.get("plugin", None)
+        return jsonify(_instance._cycle_watchdog.get_stall_history(plugin))
 
-        # Возвращаем сырые данные без обработки
+@_api_ns.route("/cycles/watchdog")
+class cycles_watchdog(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Настройки watchdog"""
+        watchdog = _instance._cycle_watchdog
         return jsonify({
-            "stats": stats,
-            "timestamp": time.time()
+            "auto_restart": watchdog.auto_restart,
+            "stall_factor": watchdog.stall_factor,
+            "min_stall_seconds": watchdog.min_stall_seconds,
+            "restart_cooldown": watchdog.restart_cooldown,
         })
 
+    @api_key_required
+    @handle_admin_required
+    def post(self):
+        """Изменить настройки watchdog (auto_restart, stall_factor, min_stall_seconds, restart_cooldown)"""
+        watchdog = _instance._cycle_watchdog
+        auto_restart = request.args.get("auto_restart", None, type=int)
+        if auto_restart is not None:
+            watchdog.auto_restart = bool(auto_restart)
+        for name in ("stall_factor", "min_stall_seconds", "restart_cooldown"):
+            value = request.args.get(name, None, type=float)
+            if value is not None:
+                if value <= 0:
+                    return jsonify({"error": f"{name} must be positive"}), 400
+                setattr(watchdog, name, value)
+        return self.get()
+
+@_api_ns.route("/startup")
+class startup(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Профиль текущей загрузки: импорт модулей, создание и инициализация плагинов,
+        сравнение с предыдущей загрузкой"""
+        from plugins.xray.utils.startup_profiler import startup_profiler
+        return jsonify(startup_profiler.compare())
+
+@_api_ns.route("/startup/history")
+class startup_history(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Сохранённые профили загрузок"""
+        from plugins.xray.utils.startup_profiler import startup_profiler
+        return jsonify(startup_profiler.history())
+
 @_api_ns.route("/thread_pools/stats")
 class thread_pools_stats(Resource):
     @api_key_required
     @handle_admin_required
     def get(self):
         """Получить статистику всех пулов потоков"""
-        from app.core.main.ObjectManager import _poolLinkedProperty, _batch_writer
-        from app.core.lib.common import _poolSay, _poolPlaysound
-        data = {"linked_pool":_poolLinkedProperty.get_monitoring_stats(),
-                "say_pool": _poolSay.get_monitoring_stats(),
-                "playsound_pool": _poolPlaysound.get_monitoring_stats(),
-                "batch_writer": _batch_writer.get_stats()}
-        return jsonify(data)
+        from plugins.xray.utils.thread_pool_monitor import get_thread_pools_stats
+        return jsonify(get_thread_pools_stats())
 
 @_api_ns.route("/thread_pools/history")
 class thread_pools_history(Resource):
     @api_key_required
     @handle_admin_required
     def get(self):
-        """Получить историю пулов потоков"""
-        from app.core.main.ObjectManager import _poolLinkedProperty, _batch_writer
-        from app.core.lib.common import _poolSay, _poolPlaysound
-        data = {"linked_pool":_poolLinkedProperty.get_monitoring_stats(),
-                "say_pool": _poolSay.get_monitoring_stats(),
-                "playsound_pool": _poolPlaysound.get_monitoring_stats(),
-                "batch_writer": _batch_writer.get_stats()}
+        """Получить историю пулов потоков (minutes, resolution)"""
+        minutes = request.args.get("minutes", 60, type=int)
+        resolution = request.args.get("resolution", "auto")
+        try:
+            data = _instance.get_thread_pools_history(minutes, resolution)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        data["period_minutes"] = minutes
         return jsonify(data)
+
+@_api_ns.route("/threads/profiler")
+class threads_profiler(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Результаты профилирования потоков: самые загруженные потоки и функции (top)"""
+        top = request.args.get("top", 20, type=int)
+        return jsonify(_instance._thread_profiler.results(top))
+
+@_api_ns.route("/threads/profiler/start")
+class threads_profiler_start(Resource):
+    @api_key_required
+    @handle_admin_required
+    def post(self):
+        """Запустить профилирование потоков (duration - секунды, interval - период сэмплирования)"""
+        from plugins.xray.utils.thread_profiler import DEFAULT_INTERVAL
+        duration = request.args.get("duration", 30, type=float)
+        interval = request.args.get("interval", DEFAULT_INTERVAL, type=float)
+        if not _instance._thread_profiler.start(duration, interval):
+            return jsonify({"error": "Profiler is already running"}), 409
+        return jsonify(_instance._thread_profiler.status())
+
+@_api_ns.route("/threads/profiler/stop")
+class threads_profiler_stop(Resource):
+    @api_key_required
+    @handle_admin_required
+    def post(self):
+        """Остановить профилирование потоков"""
+        _instance._thread_profiler.stop()
+        return jsonify(_instance._thread_profiler.status())
+
+@_api_ns.route("/threads/profiler/collapsed")
+class threads_profiler_collapsed(Resource):
+    @api_key_required
+    @handle_admin_required
+    def get(self):
+        """Стеки в collapsed-stack формате для построения flame graph"""
+        return Response(_instance._thread_profiler.collapsed(), mimetype="text/plain")
@@ -0,0 +1,80 @@
+import os
+import sys
+import json
+import types
+import datetime
+import contextlib
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import StaticPool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Утилиты импортируют друг друга как plugins.xray.utils.*; пакет плагина регистрируется
+# без выполнения __init__.py, которому нужно запущенное приложение
+for name, path in (("plugins", os.path.dirname(ROOT)), ("plugins.xray", ROOT)):
+    if name not in sys.modules:
+        module = types.ModuleType(name)
+        module.__path__ = [path]
+        sys.modules[name] = module
+
+
+def host_module(name: str, **attrs) -> types.ModuleType:
+    """Модуль приложения-хоста с заданными атрибутами (родительские пакеты создаются пустыми)"""
+    parts = name.split(".")
+    for index in range(1, len(parts) + 1):
+        module_name = ".".join(parts[:index])
+        if module_name not in sys.modules:
+            module = types.ModuleType(module_name)
+            module.__path__ = []
+            sys.modules[module_name] = module
+    module = sys.modules[name]
+    for key, value in attrs.items():
+        setattr(module, key, value)
+    return module
+
+
+class CustomJSONEncoder(json.JSONEncoder):
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.date)):
+            return o.isoformat()
+        return str(o)
+
+
+class Database:
+    """``app.database.db``: база моделей и движок текущего теста"""
+    Model = declarative_base()
+    engine = None
+
+
+@contextlib.contextmanager
+def session_scope():
+    session = Session(Database.engine)
+    try:
+        yield session
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+try:
+    import app  # noqa: F401
+except ImportError:
+    # Вне приложения - минимальные модули хоста, которые импортируют утилиты
+    host_module("app.core.utils", CustomJSONEncoder=CustomJSONEncoder)
+    host_module("app.database", db=Database, session_scope=session_scope)
+
+
+@pytest.fixture
+def engine():
+    """SQLite в памяти как база приложения"""
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Database.engine = engine
+    yield engine
+    Database.engine = None
+    engine.dispose()
@@ -0,0 +1,173 @@
+import copy
+
+from plugins.xray.utils import analytics
+from plugins.xray.utils.analytics import AnalyticsPublisher, AnalyticsSnapshot, DeltaTracker
+
+
+def make_stats():
+    return {
+        "Light": {
+            "name": "Light",
+            "count_get": 1,
+            "stat_properties": {"status": {"count_read": 1, "count_write": 0},
+                                "level": {"count_read": 0, "count_write": 0}},
+            "stat_methods": {"turnOn": {"count_executed": 0}},
+        },
+        "Sensor": {
+            "name": "Sensor",
+            "count_get": 0,
+            "stat_properties": {"value": {"count_read": 0, "count_write": 5}},
+            "stat_methods": {},
+        },
+    }
+
+
+def test_cursor_advances_only_on_changes():
+    tracker = DeltaTracker()
+    stats = make_stats()
+    first = tracker.update(stats)
+    assert first == tracker.cursor == 1
+    assert tracker.update(copy.deepcopy(stats)) == first
+
+    stats["Light"]["stat_properties"]["status"]["count_read"] = 2
+    assert tracker.update(stats) == first + 1
+
+
+def test_full_snapshot_for_initial_or_future_cursor():
+    tracker = DeltaTracker()
+    stats = make_stats()
+    result = tracker.changes(stats, 0)
+    assert result["full"] is True
+    assert result["stats"] is stats
+
+    # Курсор из будущего (например после перезапуска сервера) - тоже полный снимок
+    assert tracker.changes(stats, result["cursor"] + 10)["full"] is True
+
+
+def test_changes_contain_only_changed_entries():
+    tracker = DeltaTracker()
+    stats = make_stats()
+    cursor = tracker.changes(stats, 0)["cursor"]
+
+    stats["Light"]["stat_properties"]["level"]["count_write"] = 1
+    stats["Light"]["stat_methods"]["turnOn"]["count_executed"] = 3
+    result = tracker.changes(stats, cursor)
+
+    assert result["full"] is False
+    assert result["cursor"] == cursor + 1
+    assert list(result["stats"]) == ["Light"]
+    light = result["stats"]["Light"]
+    assert light["name"] == "Light"
+    assert list(light["stat_properties"]) == ["level"]
+    assert list(light["stat_methods"]) == ["turnOn"]
+
+    nothing = tracker.changes(stats, result["cursor"])
+    assert nothing["stats"] == {}
+    assert nothing["removed"] == []
+
+
+def test_changes_across_several_updates():
+    tracker = DeltaTracker()
+    stats = make_stats()
+    cursor = tracker.changes(stats, 0)["cursor"]
+
+    stats["Light"]["stat_properties"]["status"]["count_read"] = 5
+    tracker.update(stats)
+    stats["Sensor"]["stat_properties"]["value"]["count_write"] = 6
+    result = tracker.changes(stats, cursor)
+
+    assert sorted(result["stats"]) == ["Light", "Sensor"]
+    assert list(result["stats"]["Light"]["stat_properties"]) == ["status"]
+
+
+def test_removed_and_readded_objects():
+    tracker = DeltaTracker()
+    stats = make_stats()
+    cursor = tracker.changes(stats, 0)["cursor"]
+
+    sensor = stats.pop("Sensor")
+    result = tracker.changes(stats, cursor)
+    assert result["removed"] == ["Sensor"]
+    assert result["stats"] == {}
+
+    stats["Sensor"] = sensor
+    readded = tracker.changes(stats, result["cursor"])
+    assert readded["removed"] == []
+    assert list(readded["stats"]) == ["Sensor"]
+    # Клиент со старым курсором видит объект как изменённый, а не удалённый
+    assert tracker.changes(stats, cursor)["removed"] == []
+
+
+def test_removed_history_is_bounded():
+    tracker = DeltaTracker()
+    tracker.MAX_REMOVED = 2
+    stats = {f"obj{i}": {"count_get": 0} for i in range(4)}
+    tracker.update(stats)
+    for i in range(4):
+        del stats[f"obj{i}"]
+        tracker.update(stats)
+
+    result = tracker.changes(stats, 1)
+    assert result["removed"] == ["obj2", "obj3"]
+
+
+def test_snapshot_computes_once_per_poll(monkeypatch):
+    calls = []
+    aggregate = analytics.aggregate_stats
+    monkeypatch.setattr(analytics, "aggregate_stats", lambda stats, top: calls.append(top) or aggregate(stats, top=top))
+    snapshot = AnalyticsSnapshot(DeltaTracker())
+    stats = make_stats()
+    snapshot.observe(stats)
+    cursor = snapshot.cursor
+
+    # Любое число клиентов получает одну и ту же сводку
+    assert snapshot.summary() is snapshot.summary()
+    assert snapshot.summary()["totals"]["objects"] == 2
+    assert calls == [10]
+
+    # Снимок без изменений - курсор и сводка прежние
+    snapshot.observe(copy.deepcopy(stats))
+    assert snapshot.cursor == cursor
+    snapshot.summary()
+    assert calls == [10]
+
+    stats = copy.deepcopy(stats)
+    stats["Sensor"]["stat_properties"]["value"]["count_write"] = 9
+    snapshot.observe(stats)
+    assert snapshot.cursor == cursor + 1
+    delta = snapshot.changes(cursor)
+    assert delta is snapshot.changes(cursor)
+    assert list(delta["stats"]) == ["Sensor"]
+    assert snapshot.summary()["totals"]["writes"] == 9
+    assert calls == [10, 10]
+
+
+def test_publisher_uses_snapshot():
+    class Bus:
+        def __init__(self):
+            self.subscribed = False
+            self.events = []
+
+        def has_subscribers(self, topic):
+            return self.subscribed
+
+        def publish(self, topic, data):
+            self.events.append((topic, data))
+
+    bus = Bus()
+    snapshot = AnalyticsSnapshot(DeltaTracker())
+    publisher = AnalyticsPublisher(bus, snapshot)
+    stats = make_stats()
+    for consumer in (snapshot, publisher):
+        consumer.observe(stats)
+    assert bus.events == []
+
+    bus.subscribed = True
+    for _ in range(2):
+        for consumer in (snapshot, publisher):
+            consumer.observe(stats)
+    assert len(bus.events) == 1
+    topic, data = bus.events[0]
+    assert topic == "analytics"
+    assert data["cursor"] == snapshot.cursor
+    assert data["summary"] is snapshot.summary()
@@ -0,0 +1,183 @@
+import json
+import pickle
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from plugins.xray.utils.cache_browser import CacheBrowser, key_group
+
+fakeredis = pytest.importorskip("fakeredis")
+
+
+class RedisCache:
+    """Flask-Caching с бэкендом redis: ключи хранятся с CACHE_KEY_PREFIX, значения - pickle"""
+
+    def __init__(self, key_prefix=""):
+        self.client = fakeredis.FakeRedis()
+        self.app = SimpleNamespace(config={"CACHE_TYPE": "redis", "CACHE_KEY_PREFIX": key_prefix})
+        self.cache = SimpleNamespace(_read_client=self.client, serializer=SimpleNamespace(loads=pickle.loads))
+        self.key_prefix = key_prefix
+
+    def set(self, key, value, timeout=None):
+        self.client.set(self.key_prefix + key, pickle.dumps(value), ex=timeout)
+
+    def get(self, key):
+        raw = self.client.get(self.key_prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+
+class SimpleCache:
+    """Flask-Caching с бэкендом simple: словарь ключ -> (время истечения, pickle)"""
+
+    def __init__(self):
+        self.app = SimpleNamespace(config={"CACHE_TYPE": "simple"})
+        self.cache = SimpleNamespace(_cache={}, serializer=SimpleNamespace(loads=pickle.loads))
+
+    def set(self, key, value, timeout=None):
+        self.cache._cache[key] = (time.time() + timeout if timeout else 0, pickle.dumps(value))
+
+    def get(self, key):
+        entry = self.cache._cache.get(key)
+        return pickle.loads(entry[1]) if entry else None
+
+
+def fill(cache, count=25):
+    for index in range(count):
+        cache.set(f"user:{index}", {"id": index})
+    cache.set("page:home", "x" * 2000, timeout=60)
+
+
+def all_pages(browser, count, **kwargs):
+    keys = []
+    cursor = 0
+    for _ in range(1000):
+        page = browser.page(cursor, count, **kwargs)
+        keys.extend(item["key"] for item in page["items"])
+        cursor = page["cursor"]
+        if page["done"]:
+            assert cursor == 0
+            return keys
+    raise AssertionError("cursor never finished")
+
+
+@pytest.fixture(params=["redis", "simple"])
+def cache(request):
+    return RedisCache() if request.param == "redis" else SimpleCache()
+
+
+def test_key_group():
+    assert key_group("user:1") == "user"
+    assert key_group("view//index") == "view"
+    assert key_group(":x") == ":x"
+
+
+def test_pages_cover_all_keys_once(cache):
+    fill(cache)
+    keys = all_pages(CacheBrowser(cache), 7)
+    assert sorted(keys) == sorted([f"user:{i}" for i in range(25)] + ["page:home"])
+    assert len(keys) == len(set(keys))
+
+
+def test_prefix_filter(cache):
+    fill(cache)
+    keys = all_pages(CacheBrowser(cache), 10, prefix="page")
+    assert keys == ["page:home"]
+
+
+def test_truncated_value_and_full_value(cache):
+    fill(cache, count=1)
+    browser = CacheBrowser(cache)
+    item = next(item for item in browser.page(0, 100)["items"] if item["key"] == "page:home")
+
+    assert item["truncated"] is True
+    assert len(item["value"]) == 512
+    assert 0 < item["ttl"] <= 60
+    # Полное значение (/cache/value) - отдельным запросом
+    assert json.loads(browser.get_value("page:home")) == "x" * 2000
+    small = next(item for item in browser.page(0, 100, value_limit=4096)["items"] if item["key"] == "page:home")
+    assert small["truncated"] is False
+
+
+def test_unknown_backend():
+    cache = SimpleNamespace(app=SimpleNamespace(config={"CACHE_TYPE": "filesystem"}))
+    browser = CacheBrowser(cache)
+    assert browser.count() is None
+    assert browser.page() == {"items": [], "cursor": 0, "done": True}
+    assert browser.stats()["total_keys"] == 0
+
+
+def test_count_without_key_scan(cache):
+    fill(cache, count=3)
+    assert CacheBrowser(cache).count() == 4
+
+
+def test_redis_key_prefix():
+    cache = RedisCache(key_prefix="app_")
+    fill(cache, count=3)
+    cache.client.set("foreign:key", b"1")
+    browser = CacheBrowser(cache)
+
+    # С префиксом число ключей не считается при открытии вкладки - его даёт stats()
+    assert browser.count() is None
+    assert sorted(all_pages(browser, 2)) == ["page:home", "user:0", "user:1", "user:2"]
+    assert all_pages(browser, 2, prefix="user:1") == ["user:1"]
+    stats = browser.stats()
+    assert stats["total_keys"] == 4
+    assert {group["prefix"]: group["keys"] for group in stats["prefixes"]} == {"user": 3, "page": 1}
+
+
+def test_stats_sample(cache):
+    fill(cache, count=30)
+    stats = CacheBrowser(cache).stats(max_keys=10, top=3)
+
+    assert stats["scanned"] == 10
+    assert stats["total_keys"] == 31
+    assert stats["sampled"] is True
+    assert stats["estimated_total_bytes"] == round(stats["total_bytes"] * 31 / 10)
+    assert len(stats["largest"]) == 3
+
+
+def test_stats_groups_by_prefix(cache):
+    cache.set("user:1", "a", timeout=100)
+    cache.set("user:2", "b" * 100, timeout=300)
+    cache.set("user:3", "c")
+    cache.set("view/index", "x" * 1000)
+    stats = CacheBrowser(cache).stats(top=2)
+
+    groups = {group["prefix"]: group for group in stats["prefixes"]}
+    user = groups["user"]
+    assert (user["keys"], user["no_ttl"]) == (3, 1)
+    assert 90 < user["min_ttl"] <= 100 and 290 < user["max_ttl"] <= 300
+    assert groups["view"]["min_ttl"] is None
+    # Группы и самые большие ключи - по убыванию размера
+    assert [group["prefix"] for group in stats["prefixes"]] == ["view", "user"]
+    assert [key["key"] for key in stats["largest"]] == ["view/index", "user:2"]
+    assert stats["sampled"] is False
+    assert stats["estimated_total_bytes"] == stats["total_bytes"] == sum(g["bytes"] for g in groups.values())
+    assert stats["sample_method"] == "first_scan_keys"
+
+
+def test_redis_stats_size_without_memory_usage():
+    cache = RedisCache()
+    cache.client.set("raw", b"12345")
+    browser = CacheBrowser(cache)
+    pipeline = cache.client.pipeline
+
+    class NoMemoryUsage:
+        """Pipeline, на котором MEMORY USAGE недоступна (старый Redis или ACL)"""
+
+        def __init__(self, *args, **kwargs):
+            self.pipe = pipeline(*args, **kwargs)
+
+        def execute_command(self, *args):
+            if args[0] == "MEMORY USAGE":
+                return self.pipe.execute_command("NO-SUCH-COMMAND")
+            return self.pipe.execute_command(*args)
+
+        def __getattr__(self, name):
+            return getattr(self.pipe, name)
+
+    cache.client.pipeline = NoMemoryUsage
+    # Размер - длина значения и ключа
+    assert browser.stats()["largest"] == [{"key": "raw", "size": 8, "ttl": None}]
@@ -0,0 +1,126 @@
+import logging
+
+from plugins.xray.utils.cycle_watchdog import CycleWatchdog
+
+
+class CyclePlugin:
+    def __init__(self):
+        self.actions = ["cycle"]
+        self.dtUpdated = None
+        self.alive = True
+        self.restarts = 0
+
+    def is_alive(self):
+        return self.alive
+
+    def stop_cycle(self):
+        self.alive = False
+
+    def start_cycle(self):
+        self.alive = True
+        self.restarts += 1
+
+
+def make_watchdog(**kwargs):
+    plugin = CyclePlugin()
+    registry = {"Cycle": {"instance": plugin}, "Plain": {"instance": type("Plain", (), {"actions": []})()}}
+    return CycleWatchdog(logging.getLogger("test"), registry, **kwargs), plugin
+
+
+def beat(watchdog, plugin, start, count, period):
+    """Цикл с заданным периодом: dtUpdated обновляется, watchdog проверяет каждую секунду"""
+    now = start
+    for _ in range(count):
+        plugin.dtUpdated = now
+        for second in range(period):
+            watchdog.check(now + second)
+        now += period
+    return now
+
+
+def test_period_and_heartbeat_interval():
+    watchdog, plugin = make_watchdog()
+    beat(watchdog, plugin, 1000, 6, 2)
+
+    status = watchdog.get_status()
+    assert list(status) == ["Cycle"]
+    cycle = status["Cycle"]
+    assert cycle["status"] == "ok"
+    assert cycle["period"] == 2
+    assert cycle["heartbeats"] == 5
+    assert cycle["heartbeat_interval"]["max"] == 2
+    assert cycle["resolution"] == 1
+
+
+def test_unknown_period_never_stalls():
+    watchdog, plugin = make_watchdog()
+    plugin.dtUpdated = 1000
+    watchdog.check(1000)
+    watchdog.check(10000)
+    assert watchdog.get_status()["Cycle"]["status"] == "unknown"
+    assert watchdog.stalled() == []
+
+
+def test_stall_detection_and_recovery():
+    watchdog, plugin = make_watchdog(stall_factor=5, min_stall_seconds=30)
+    now = beat(watchdog, plugin, 1000, 5, 10)
+    last = plugin.dtUpdated
+
+    # Порог - max(5 * 10, 30) = 50 секунд без активности
+    watchdog.check(last + 50)
+    assert watchdog.stalled() == []
+    watchdog.check(last + 51)
+    assert watchdog.stalled() == ["Cycle"]
+    assert watchdog.get_status()["Cycle"]["status"] == "stalled"
+    # Повторная проверка не создаёт второе событие
+    watchdog.check(last + 60)
+    assert watchdog.get_status()["Cycle"]["stalls"] == 1
+
+    plugin.dtUpdated = now + 100
+    watchdog.check(now + 100)
+    assert watchdog.stalled() == []
+    event = watchdog.get_stall_history("Cycle")[0]
+    assert event["started"] == last
+    assert event["ended"] == now + 100
+    assert event["restarted"] is False
+
+
+def test_auto_restart_is_off_by_default():
+    watchdog, plugin = make_watchdog()
+    assert watchdog.auto_restart is False
+    beat(watchdog, plugin, 1000, 5, 10)
+    watchdog.check(plugin.dtUpdated + 1000)
+    assert watchdog.stalled() == ["Cycle"]
+    assert plugin.restarts == 0
+
+
+def test_auto_restart_respects_cooldown():
+    watchdog, plugin = make_watchdog(auto_restart=True, restart_cooldown=300)
+    now = beat(watchdog, plugin, 1000, 5, 10)
+
+    watchdog.check(now + 100)
+    assert plugin.restarts == 1
+    assert watchdog.get_stall_history()[0]["restarted"] is True
+
+    # Перезапуск не помог: новое зависание в пределах cooldown - без перезапуска
+    plugin.dtUpdated = now + 110
+    watchdog.check(now + 110)
+    watchdog.check(now + 200)
+    assert watchdog.get_status()["Cycle"]["stalls"] == 2
+    assert plugin.restarts == 1
+
+    # После cooldown - снова перезапуск
+    plugin.dtUpdated = now + 500
+    watchdog.check(now + 500)
+    watchdog.check(now + 600)
+    assert plugin.restarts == 2
+    assert watchdog.get_status()["Cycle"]["restarts"] == 2
+
+
+def test_stopped_cycle_is_not_stalled():
+    watchdog, plugin = make_watchdog()
+    beat(watchdog, plugin, 1000, 5, 10)
+    plugin.alive = False
+    watchdog.check(plugin.dtUpdated + 1000)
+    assert watchdog.stalled() == []
+    assert watchdog.get_status()["Cycle"]["status"] == "stopped"
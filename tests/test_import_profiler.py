@@ -0,0 +1,111 @@
+import importlib
+import importlib.machinery
+import sys
+
+import pytest
+
+from plugins.xray.utils import packages
+from plugins.xray.utils.import_profiler import ImportProfiler
+from plugins.xray.utils.packages import PackageInventory
+
+
+@pytest.fixture
+def demo_package(tmp_path, monkeypatch):
+    """Пакет с вложенным импортом: xray_demo -> xray_demo.child (с задержкой)"""
+    root = tmp_path / "xray_demo"
+    root.mkdir()
+    (root / "__init__.py").write_text("from xray_demo import child\n")
+    (root / "child.py").write_text("import time\ntime.sleep(0.05)\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield
+    for name in ("xray_demo", "xray_demo.child"):
+        sys.modules.pop(name, None)
+
+
+@pytest.fixture
+def profiler():
+    profiler = ImportProfiler()
+    profiler.install()
+    yield profiler
+    profiler.uninstall()
+
+
+def test_nested_import_timing(demo_package, profiler):
+    importlib.import_module("xray_demo")
+    records = {rec["module"]: rec for rec in profiler.records}
+
+    parent, child = records["xray_demo"], records["xray_demo.child"]
+    assert (parent["depth"], child["depth"]) == (0, 1)
+    assert child["self"] >= 0.05
+    # Вложенный импорт входит в суммарное время родителя, но не в собственное
+    assert parent["cumulative"] >= child["cumulative"]
+    assert parent["self"] < child["self"]
+    assert parent["self"] == pytest.approx(parent["cumulative"] - child["cumulative"], abs=1e-5)
+    assert parent["start"] <= child["start"]
+
+
+def test_module_sees_original_loader(demo_package, profiler):
+    module = importlib.import_module("xray_demo")
+    assert isinstance(module.__loader__, importlib.machinery.SourceFileLoader)
+    assert module.__spec__.loader is module.__loader__
+
+
+def test_install_is_idempotent(profiler):
+    profiler.install()
+    assert sys.meta_path.count(profiler._finder) == 1
+    profiler.uninstall()
+    assert not profiler.installed
+
+
+def test_by_top_level():
+    profiler = ImportProfiler()
+    profiler.record("requests", 0, 0.1, 0.3, 0)
+    profiler.record("requests.adapters", 0, 0.2, 0.2, 1)
+    profiler.record("plugins.zigbee", 0, 0.5, 0.5, 0)
+    profiler.record("plugins.zigbee.models", 0, 0.25, 0.25, 1)
+    profiler.record("plugins", 0, 0.01, 0.01, 0)
+
+    result = profiler.by_top_level()
+    assert result["requests"] == {"name": "requests", "time": 0.3, "modules": 2}
+    assert result["plugins.zigbee"] == {"name": "plugins.zigbee", "time": 0.75, "modules": 2}
+    assert result["plugins"]["modules"] == 1
+
+
+def test_inventory_lists_installed_packages():
+    inventory = PackageInventory()
+    assert inventory.version("PyTest") == pytest.__version__
+    assert inventory.version("missing-package-xyz") is None
+    names = [item["name"].lower() for item in inventory.get()]
+    assert names == sorted(names)
+
+
+def test_inventory_cached_until_site_changes(monkeypatch):
+    calls = []
+    signature = [("site", 1)]
+    monkeypatch.setattr(packages, "_site_signature", lambda: tuple(signature))
+    monkeypatch.setattr(PackageInventory, "_collect",
+                        staticmethod(lambda: calls.append(1) or [{"name": "demo", "version": "1.0",
+                                                                  "top_level": ["demo"]}]))
+    inventory = PackageInventory()
+    inventory.get()
+    inventory.get()
+    assert len(calls) == 1
+
+    signature[0] = ("site", 2)
+    inventory.get()
+    assert len(calls) == 2
+    inventory.invalidate()
+    inventory.get()
+    assert len(calls) == 3
+
+
+def test_with_import_times(monkeypatch):
+    inventory = PackageInventory()
+    monkeypatch.setattr(inventory, "get", lambda: [
+        {"name": "Pillow", "version": "10.0", "top_level": ["PIL"]},
+        {"name": "pyyaml", "version": "6.0", "top_level": ["_yaml", "yaml"]},
+        {"name": "unused", "version": "1.0", "top_level": ["unused"]},
+    ])
+    times = {"PIL": {"time": 0.5}, "yaml": {"time": 0.25}, "_yaml": {"time": 0.125}}
+    result = {item["name"]: item["import_time"] for item in inventory.with_import_times(times)}
+    assert result == {"Pillow": 0.5, "pyyaml": 0.375, "unused": None}
@@ -0,0 +1,94 @@
+import pytest
+
+from plugins.xray.utils.latency import HIST_GROWTH, HIST_MAX, HIST_MIN, LogHistogram, MethodLatencyTracker
+
+
+def test_empty_histogram():
+    histogram = LogHistogram()
+    assert histogram.percentile(99) == 0
+    assert histogram.summary() == {"count": 0, "avg": 0, "min": 0, "p50": 0, "p95": 0, "p99": 0, "max": 0}
+
+
+@pytest.mark.parametrize("percent", [50, 90, 95, 99])
+def test_quantile_relative_error(percent):
+    histogram = LogHistogram()
+    values = [0.001 * i for i in range(1, 1001)]
+    for value in values:
+        histogram.record(value)
+
+    exact = values[int(percent / 100 * len(values)) - 1]
+    # Верхняя граница корзины: не меньше точного значения и не больше чем на шаг корзины
+    assert exact <= histogram.percentile(percent) <= exact * HIST_GROWTH
+
+
+def test_quantile_never_exceeds_max():
+    histogram = LogHistogram()
+    for _ in range(10):
+        histogram.record(0.0123)
+    assert histogram.percentile(99) == 0.0123
+    assert histogram.summary()["min"] == 0.0123
+
+
+def test_out_of_range_values():
+    histogram = LogHistogram()
+    histogram.record(0)
+    histogram.record(HIST_MAX * 10)
+    assert histogram.counts[0] == 1
+    assert histogram.counts[-1] == 1
+    assert LogHistogram.bucket(HIST_MIN) == 0
+    assert histogram.percentile(100) == HIST_MAX * 10
+
+
+def test_merge_matches_single_histogram():
+    left, right, both = LogHistogram(), LogHistogram(), LogHistogram()
+    for i in range(1, 101):
+        value = i / 1000
+        (left if i % 2 else right).record(value)
+        both.record(value)
+
+    left.merge(right)
+    assert list(left.counts) == list(both.counts)
+    assert left.summary() == pytest.approx(both.summary())
+
+
+def test_tracker_hook_records_every_call():
+    class Object:
+        name = "Light"
+
+        def callMethod(self, name, value=None):
+            if value == "fail":
+                raise RuntimeError(value)
+            return value
+
+    tracker = MethodLatencyTracker()
+    assert tracker.hook(Object)
+    # Повторный перехват не оборачивает метод ещё раз
+    assert tracker.hook(Object)
+
+    obj = Object()
+    assert obj.callMethod("turnOn", 1) == 1
+    obj.callMethod("turnOn")
+    with pytest.raises(RuntimeError):
+        obj.callMethod("turnOn", "fail")
+
+    method = tracker.get_method("Light.turnOn")
+    assert method["count"] == 3
+    assert method["missed"] == 0
+    assert not tracker.hook(Object, "missing")
+
+
+def test_tracker_observe_counts_missed_executions():
+    tracker = MethodLatencyTracker()
+
+    def snapshot(count, exec_time):
+        return {"Light": {"stat_methods": {"turnOn": {"count_executed": count, "exec_time": exec_time}}}}
+
+    tracker.observe(snapshot(5, 0.1))
+    assert tracker.get_method("Light.turnOn") is None
+
+    tracker.observe(snapshot(8, 0.2))
+    tracker.observe(snapshot(8, 0.2))
+    method = tracker.get_method("Light.turnOn")
+    assert method["count"] == 1
+    assert method["missed"] == 2
+    assert method["max"] == 0.2
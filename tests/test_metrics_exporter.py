@@ -0,0 +1,142 @@
+import logging
+import re
+from types import SimpleNamespace
+
+from plugins.xray.utils.latency import MethodLatencyTracker
+from plugins.xray.utils.metrics_exporter import MetricsExporter, OpenMetricsWriter
+
+SAMPLE = re.compile(r'^([a-z_]+)(\{[^}]*\})? (\S+)$')
+
+
+def parse(text):
+    """Разобрать текст OpenMetrics: семейства (имя -> тип) и сэмплы (имя, метки, значение)"""
+    assert text.endswith("# EOF\n")
+    families = {}
+    samples = []
+    for line in text.splitlines()[:-1]:
+        if line.startswith("# TYPE "):
+            _, _, name, metric_type = line.split(" ")
+            assert name not in families
+            families[name] = metric_type
+        elif line.startswith("#"):
+            assert line.split(" ")[2] in families
+        else:
+            name, labels, value = SAMPLE.match(line).groups()
+            samples.append((name, labels or "", float(value)))
+    return families, samples
+
+
+def family_of(name, families):
+    for suffix in ("", "_total", "_sum", "_count"):
+        if suffix and not name.endswith(suffix):
+            continue
+        base = name[:len(name) - len(suffix)] if suffix else name
+        if base in families:
+            return base, suffix
+    raise AssertionError(f"sample {name} without family")
+
+
+def make_exporter(latency=None, registry=None, pool_stats=None):
+    pool = SimpleNamespace(active_connections=3, idle_connections=2, pool_size=5, max_overflow=10, overflow=0)
+    thread_stats = {
+        "linked_pool": {"thread_pool": {"active_tasks": {"a": 1}, "max_workers": 4, "queue_size": 2,
+                                        "pool_utilization": 25.0, "completed_tasks": 10},
+                        "execution_time": {"avg_execution_time": 0.5}},
+        "say_pool": None,
+        "batch_writer": {"current_batch_size": 1, "total_added": 7, "total_flushed": 6,
+                         "execution_time": {"avg_seconds": 0.002}},
+    }
+    objects = {
+        "Light": {"stat_properties": {"status": {"count_read": 4, "count_write": 1}},
+                  "stat_methods": {"turnOn": {"count_executed": 2}}},
+        "Sensor": {"stat_properties": {"value": {"count_read": 1, "count_write": 3}}, "stat_methods": {}},
+    }
+    return MetricsExporter(
+        logging.getLogger("test"),
+        SimpleNamespace(get_pool_stats=lambda: pool),
+        SimpleNamespace(last_stats=thread_stats),
+        SimpleNamespace(last_stats=objects, last_poll=1700000000.0),
+        latency or MethodLatencyTracker(),
+        registry or {},
+    )
+
+
+def test_writer_escapes_labels_and_formats_values():
+    writer = OpenMetricsWriter()
+    writer.family("xray_test", "gauge", "Test", "seconds")
+    writer.sample("xray_test", 1.5, {"name": 'a"b\\c\nd'})
+    writer.sample("xray_test", True)
+    writer.sample("xray_test", 3)
+    writer.sample("xray_test", None)
+
+    assert writer.render().splitlines() == [
+        "# TYPE xray_test gauge",
+        "# UNIT xray_test seconds",
+        "# HELP xray_test Test",
+        'xray_test{name="a\\"b\\\\c\\nd"} 1.5',
+        "xray_test 1",
+        "xray_test 3",
+        "# EOF",
+    ]
+
+
+def test_writer_special_float_values():
+    writer = OpenMetricsWriter()
+    writer.family("xray_test", "gauge", "Test")
+    for value in (float("inf"), float("-inf"), float("nan"), 0.25):
+        writer.sample("xray_test", value)
+    assert writer.render().splitlines()[2:6] == ["xray_test +Inf", "xray_test -Inf", "xray_test NaN", "xray_test 0.25"]
+
+
+def test_render_is_valid_openmetrics():
+    latency = MethodLatencyTracker()
+    latency.record("Light.turnOn", 0.01)
+    text = make_exporter(latency).render(["Light"])
+    families, samples = parse(text)
+
+    for name, _, _ in samples:
+        base, suffix = family_of(name, families)
+        if families[base] == "counter":
+            assert suffix == "_total"
+        elif families[base] == "gauge":
+            assert suffix == ""
+    assert families["xray_thread_pool_completed_tasks"] == "counter"
+    assert ("xray_thread_pool_completed_tasks_total", '{pool="linked_pool"}', 10) in samples
+    assert ("xray_thread_pool_avg_execution_seconds", '{pool="linked_pool"}', 0.5) in samples
+    assert ("xray_db_pool_active_connections", "", 3) in samples
+    assert ("xray_batch_writer_added_total", "", 7) in samples
+    assert ("xray_method_exec_time_count", '{method="Light.turnOn"}', 1) in samples
+
+
+def test_objects_series_only_for_allow_list():
+    exporter = make_exporter()
+    _, samples = parse(exporter.render())
+    # Общие счётчики - по всем объектам, серии по объектам - только по запросу
+    assert ("xray_property_reads_total", "", 5) in samples
+    assert ("xray_property_writes_total", "", 4) in samples
+    assert not [s for s in samples if s[0].startswith("xray_object_")]
+    assert not [s for s in samples if s[0].startswith("xray_method_exec_time")]
+
+    _, samples = parse(exporter.render(["Sensor", "Missing"]))
+    assert ("xray_object_property_writes_total", '{object="Sensor"}', 3) in samples
+    assert not [s for s in samples if 'object="Light"' in s[1]]
+
+
+def test_render_is_cached_per_object_list():
+    calls = []
+    exporter = make_exporter()
+    get_pool_stats = exporter.pool_monitor.get_pool_stats
+    exporter.pool_monitor.get_pool_stats = lambda: calls.append(1) or get_pool_stats()
+
+    assert exporter.render(["Light"]) == exporter.render(["Light", "Light"])
+    assert len(calls) == 1
+    exporter.render()
+    assert len(calls) == 2
+
+
+def test_failing_collector_does_not_break_export():
+    registry = {"broken": {"instance": None}}
+    text = make_exporter(registry=registry).render()
+    families, _ = parse(text)
+    assert "xray_db_pool_active_connections" in families
+    assert "xray_plugin_cycle_up" not in families
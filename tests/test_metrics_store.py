@@ -0,0 +1,155 @@
+import functools
+import logging
+import time
+
+import pytest
+
+from plugins.xray.utils import metrics_store
+from plugins.xray.utils.metrics_store import MetricsStore, RAW_RETENTION, ROLLUP_RETENTION
+from plugins.xray.utils.rollup import MetricSeries
+
+COLUMNS = {"active": "i"}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MetricsStore(logging.getLogger("test"), path=str(tmp_path / "metrics.db"), flush_interval=0.05)
+
+
+def make_series(store, capacity=100):
+    return MetricSeries(COLUMNS, ("active",), capacity=capacity,
+                        on_bucket=functools.partial(store.append_rollup, "pool"))
+
+
+def record(store, series, start, stop, step):
+    for index, timestamp in enumerate(range(int(start), int(stop), step)):
+        series.add(timestamp, active=index % 7)
+        store.append("pool", timestamp, {"active": index % 7})
+
+
+def flush(store):
+    conn = store._connect()
+    try:
+        store.flush(conn)
+    finally:
+        conn.close()
+
+
+def tier_rows(series, name, since=0):
+    tier = next(tier for tier in series.rollups if tier.name == name)
+    return tier.since(since)
+
+
+def test_background_flush_on_stop(store):
+    store.start()
+    store.append("pool", 1.0, {"active": 1})
+    store.append_rollup("pool", "1m", 0.0, {"samples": 1, "active_avg": 1.0})
+    store.stop()
+
+    assert store.written == 2
+    assert store.load_samples("pool", count=10) == [(1.0, {"active": 1})]
+    assert store.load_rollups("pool") == {"1m": [{"samples": 1, "active_avg": 1.0, "timestamp": 0.0}]}
+    assert store.series() == ["pool"]
+    assert store.status()["running"] is False
+
+
+def test_queue_overflow_drops_samples(store, monkeypatch):
+    monkeypatch.setattr(metrics_store, "MAX_QUEUE", 2)
+    small = MetricsStore(logging.getLogger("test"), path=store.path)
+    for timestamp in range(3):
+        small.append("pool", timestamp, {"active": 0})
+    assert small.dropped == 1
+
+
+def test_round_trip_restore(store):
+    now = time.time()
+    start = now - now % 3600 - 2 * 3600
+    original = make_series(store)
+    record(store, original, start, now, 10)
+    flush(store)
+
+    restored = make_series(store)
+    count = store.restore("pool", restored)
+
+    assert count >= 100
+    assert restored.raw.since(0) == original.raw.since(0)
+    for name in ("1m", "1h"):
+        assert tier_rows(restored, name) == tier_rows(original, name)
+
+
+def test_restore_after_downtime_longer_than_bucket(store):
+    # Остановка в середине часа, перезапуск через 3 часа: незакрытая часовая корзина
+    # восстанавливается по всем сырым сэмплам, а не только по ёмкости буфера
+    now = time.time()
+    hour = now - now % 3600 - 4 * 3600
+    crash = hour + 3600 + 2426
+    original = make_series(store, capacity=100)
+    record(store, original, hour, crash, 1)
+    flush(store)
+
+    restored = make_series(store, capacity=100)
+    store.restore("pool", restored)
+
+    crash_bucket = [row for row in tier_rows(restored, "1h") if row["timestamp"] == hour + 3600]
+    assert crash_bucket[0]["samples"] == 2426
+    assert crash_bucket == [row for row in tier_rows(original, "1h") if row["timestamp"] == hour + 3600]
+    assert len(restored.raw) == 100
+
+    # Следующий сэмпл закрывает корзину и сохраняет её с полным числом сэмплов
+    restored.add(now, active=1)
+    flush(store)
+    saved = {row["timestamp"]: row for row in store.load_rollups("pool")["1h"]}
+    assert saved[hour + 3600]["samples"] == 2426
+
+
+def test_compact_keeps_hour_buckets_of_expired_raw_samples(store):
+    now = time.time()
+    series = make_series(store)
+    record(store, series, now - RAW_RETENTION - 3 * 3600, now - RAW_RETENTION + 3600, 60)
+    flush(store)
+
+    conn = store._connect()
+    try:
+        store.compact(conn, now)
+    finally:
+        conn.close()
+
+    samples = store.load_samples("pool", since=0)
+    assert samples and min(timestamp for timestamp, _ in samples) >= now - RAW_RETENTION
+    # Сырые сэмплы старше суток удалены, их часовые корзины остаются
+    hours = store.load_rollups("pool")["1h"]
+    assert min(row["timestamp"] for row in hours) < now - RAW_RETENTION
+    assert sum(row["samples"] for row in hours) >= 3 * 60
+
+
+def test_compact_deletes_expired_rollups(store):
+    now = time.time()
+    for days in (40, 31, 29, 2):
+        store.append_rollup("pool", "1h", now - days * 86400, {"samples": 1})
+        store.append_rollup("pool", "1m", now - days * 86400, {"samples": 1})
+    store.append_rollup("pool", "1m", now - 60, {"samples": 1})
+    flush(store)
+
+    conn = store._connect()
+    try:
+        store.compact(conn, now)
+    finally:
+        conn.close()
+
+    rollups = store.load_rollups("pool")
+    assert [round((now - row["timestamp"]) / 86400) for row in rollups["1h"]] == [29, 2]
+    assert len(rollups["1m"]) == 1
+    assert ROLLUP_RETENTION["1h"] == 30 * 86400
+    assert store.last_compaction == now
+
+
+def test_load_samples_modes(store):
+    for timestamp in range(10):
+        store.append("pool", float(timestamp), {"active": timestamp})
+    store.append("other", 5.0, {"active": 0})
+    flush(store)
+
+    assert [ts for ts, _ in store.load_samples("pool", count=3)] == [7.0, 8.0, 9.0]
+    assert [ts for ts, _ in store.load_samples("pool", since=8)] == [8.0, 9.0]
+    assert store.series("po") == ["pool"]
+    assert MetricsStore(logging.getLogger("test"), path=store.path + ".missing").load_samples("pool", count=1) == []
@@ -0,0 +1,113 @@
+import datetime
+import enum
+
+import pytest
+from sqlalchemy import Boolean, Column, DateTime, Integer, String
+
+from conftest import Database, host_module
+
+
+class CategoryNotify(str, enum.Enum):
+    Debug = "Debug"
+    Info = "Info"
+    Warning = "Warning"
+    Error = "Error"
+
+
+class Notify(Database.Model):
+    __tablename__ = "notify"
+    __module__ = "app.core.models.Plugins"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100))
+    category = Column(String(20))
+    source = Column(String(50))
+    read = Column(Boolean, default=False)
+    created = Column(DateTime)
+
+
+def row2dict(row):
+    return {column.name: getattr(row, column.name) for column in row.__table__.columns}
+
+
+host_module("app.core.lib.constants", CategoryNotify=CategoryNotify)
+host_module("app.core.models.Plugins", Notify=Notify)
+host_module("app.database", row2dict=row2dict)
+
+from plugins.xray.utils.notifications import (  # noqa: E402
+    get_notification_counts, get_notifications_page, notify_color,
+)
+
+
+@pytest.fixture
+def notifications(engine):
+    Database.Model.metadata.create_all(engine, tables=[Notify.__table__])
+    start = datetime.datetime(2024, 1, 1)
+    rows = []
+    for index in range(1, 26):
+        rows.append({
+            "id": index,
+            "name": f"n{index}",
+            "category": CategoryNotify.Warning.value if index % 5 == 0 else CategoryNotify.Info.value,
+            "source": "zigbee" if index % 2 else "system",
+            "read": index <= 10,
+            # created может быть пустым - порядок страниц задаёт только id
+            "created": start + datetime.timedelta(minutes=index) if index != 7 else None,
+        })
+    with engine.begin() as conn:
+        conn.execute(Notify.__table__.insert(), rows)
+    return rows
+
+
+def all_pages(limit, **filters):
+    pages = []
+    cursor = None
+    while True:
+        page = get_notifications_page(limit, cursor, **filters)
+        pages.append([item["id"] for item in page["items"]])
+        if not page["has_more"]:
+            assert page["cursor"] is None
+            return pages
+        cursor = page["cursor"]
+        assert cursor == str(pages[-1][-1])
+
+
+def test_notify_color():
+    assert notify_color(CategoryNotify.Debug) == "secondary"
+    assert notify_color(CategoryNotify.Warning) == "warning"
+    assert notify_color(CategoryNotify.Info) == "success"
+    assert notify_color(CategoryNotify.Error) == "danger"
+
+
+def test_pages_newest_first(notifications):
+    pages = all_pages(10)
+    assert pages == [list(range(25, 15, -1)), list(range(15, 5, -1)), list(range(5, 0, -1))]
+    assert get_notifications_page(10)["items"][0]["color"] == "warning"
+
+
+def test_exact_page_boundary(notifications):
+    pages = all_pages(25)
+    assert pages == [list(range(25, 0, -1))]
+
+
+def test_filters(notifications):
+    assert all_pages(3, category="Warning") == [[25, 20, 15], [10, 5]]
+    assert sum(all_pages(4, source="system"), []) == list(range(24, 0, -2))
+    assert sum(all_pages(100, read=False), []) == list(range(25, 10, -1))
+    assert all_pages(10, category="Warning", read=True) == [[10, 5]]
+
+
+def test_cursor_formats(notifications):
+    page = get_notifications_page(5, "20")
+    assert [item["id"] for item in page["items"]] == [19, 18, 17, 16, 15]
+    # Курсор старого формата <created>_<id>
+    legacy = get_notifications_page(5, "2024-01-01T00:20:00_20")
+    assert legacy["items"] == page["items"]
+    with pytest.raises(ValueError):
+        get_notifications_page(5, "bad")
+
+
+def test_counts(notifications):
+    counts = get_notification_counts()
+    assert (counts["total"], counts["unread"]) == (25, 15)
+    assert counts["categories"]["Warning"] == {"total": 5, "unread": 3}
+    assert counts["sources"]["zigbee"] == {"total": 13, "unread": 8}
@@ -0,0 +1,96 @@
+import pytest
+
+from plugins.xray.utils.pool_health import evaluate_pool_health
+
+
+def rows_for(active_values, pool_size=10, max_overflow=5, step=5):
+    rows = []
+    for index, active in enumerate(active_values):
+        overflow = max(active - pool_size, 0)
+        rows.append({
+            "timestamp": index * step,
+            "active_connections": active,
+            "overflow": overflow,
+            "pool_usage_percent": round(min(active, pool_size) / pool_size * 100, 1),
+            "overflow_usage_percent": round(overflow / max_overflow * 100, 1) if max_overflow else 0,
+        })
+    return rows
+
+
+def signals(result):
+    return [reason["signal"] for reason in result["reasons"]]
+
+
+def test_healthy_pool():
+    result = evaluate_pool_health(rows_for([2, 3, 2, 3] * 10), 10, 5)
+    assert result["health_score"] == 100
+    assert result["status"] == "healthy"
+    assert result["warnings"] == [] and result["recommendations"] == []
+    assert result["signals"]["active_max"] == 3
+
+
+def test_no_samples_or_empty_pool():
+    assert evaluate_pool_health([], 10, 5)["health_score"] == 100
+    assert evaluate_pool_health(rows_for([1, 1, 1]), 0, 0)["suggested"] is None
+
+
+def test_single_spike_is_not_sustained_saturation():
+    result = evaluate_pool_health(rows_for([2] * 59 + [10]), 10, 5)
+    assert signals(result) == ["Critical pool usage"]
+    assert result["health_score"] == 90
+
+
+@pytest.mark.parametrize("saturated, signal, score", [
+    (30, "Sustained pool saturation", 60),
+    (15, "Frequent pool saturation", 80),
+])
+def test_sustained_saturation(saturated, signal, score):
+    result = evaluate_pool_health(rows_for([10] * saturated + [2] * (60 - saturated)), 10, 5)
+    assert signals(result)[0] == signal
+    assert result["health_score"] == score
+
+
+def test_overflow_exhausted_with_recommendations():
+    result = evaluate_pool_health(rows_for([12] * 20 + [15] * 20), 10, 5)
+    assert "Overflow exhausted" in signals(result)
+    assert result["status"] == "critical"
+    # p95 = 15 -> pool_size ceil(15 * 1.25) = 19; пик покрывает новый pool_size
+    assert result["suggested"] == {"pool_size": 19, "max_overflow": 0, "peak_concurrency": 15}
+    assert result["recommendations"][0].startswith("Increase pool_size from 10 to 19")
+
+
+def test_peak_outside_window_raises_overflow():
+    result = evaluate_pool_health(rows_for([4] * 40), 10, 2, peak=20)
+    assert result["suggested"]["peak_concurrency"] == 20
+    assert result["recommendations"] == ["Increase max_overflow from 2 to 15 (peak concurrency 20)"]
+
+
+def test_growing_usage_trend():
+    result = evaluate_pool_health(rows_for(range(1, 11), step=60), 10, 5)
+    assert "Growing pool usage" in signals(result)
+    assert result["signals"]["trend_per_minute"] == pytest.approx(1)
+
+
+def test_checkout_wait_penalties():
+    rows = rows_for([2] * 20)
+    warning = evaluate_pool_health(rows, 10, 5, wait={"count": 5, "p95": 0.2, "max": 0.3})
+    critical = evaluate_pool_health(rows, 10, 5, wait={"count": 5, "p95": 1.5, "max": 2.0})
+    ignored = evaluate_pool_health(rows, 10, 5, wait={"count": 0, "p95": 5.0, "max": 5.0})
+
+    assert (warning["health_score"], critical["health_score"], ignored["health_score"]) == (85, 70, 100)
+    # Ожидание при свободном пуле - держатели соединений, а не размер пула
+    assert "callers" in warning["recommendations"][0]
+
+
+def test_oversized_pool():
+    result = evaluate_pool_health(rows_for([1, 2] * 20, pool_size=20), 20, 10, peak=3)
+    assert result["health_score"] == 100
+    assert result["recommendations"] == ["Pool is oversized: peak concurrency 3, pool_size 3 would be enough"]
+
+
+def test_score_is_clamped():
+    rows = rows_for([10] * 30 + [15] * 5 + [11, 12, 13, 14])
+    result = evaluate_pool_health(rows, 10, 5, wait={"count": 10, "p95": 3.0, "max": 5.0})
+    assert sum(reason["penalty"] for reason in result["reasons"]) > 100
+    assert result["health_score"] == 0
+    assert result["status"] == "critical"
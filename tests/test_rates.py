@@ -0,0 +1,81 @@
+import math
+
+import pytest
+
+from plugins.xray.utils.rates import PropertyRateTracker, ewma
+
+
+def snapshot(reads, writes=0, obj="Light", prop="status"):
+    return {obj: {"stat_properties": {prop: {"count_read": reads, "count_write": writes}}}}
+
+
+def test_ewma_converges_to_constant_rate():
+    rate = 0.0
+    for _ in range(100):
+        rate = ewma(rate, 10.0, 5, 60)
+    assert rate == pytest.approx(10.0, rel=1e-3)
+
+
+def test_ewma_decay_independent_of_sampling():
+    # Одинаковое затухание при одном шаге в минуту и при 12 шагах по 5 секунд
+    coarse = ewma(10.0, 0.0, 60, 60)
+    fine = 10.0
+    for _ in range(12):
+        fine = ewma(fine, 0.0, 5, 60)
+    assert coarse == pytest.approx(10.0 / math.e)
+    assert fine == pytest.approx(coarse)
+
+
+def test_first_snapshot_has_zero_rate():
+    tracker = PropertyRateTracker()
+    tracker.observe(snapshot(1000), now=0)
+    assert tracker.get_property("Light", "status")["read_1m"] == 0
+
+
+def test_rates_decay_after_activity_stops():
+    tracker = PropertyRateTracker()
+    tracker.observe(snapshot(0), now=0)
+    reads = 0
+    for second in range(5, 605, 5):
+        reads += 50
+        tracker.observe(snapshot(reads), now=second)
+    busy = tracker.get_property("Light", "status")
+    assert busy["read_1m"] == pytest.approx(10, rel=0.01)
+    assert busy["read_1m"] > busy["read_15m"]
+
+    tracker.observe(snapshot(reads), now=660)
+    idle = tracker.get_property("Light", "status")
+    # Минута без чтений: окно 1m затухает в e раз, длинные окна - медленнее
+    assert idle["read_1m"] == pytest.approx(busy["read_1m"] / math.e, rel=0.01)
+    assert idle["read_15m"] / busy["read_15m"] > idle["read_1m"] / busy["read_1m"]
+
+
+def test_counter_reset_and_non_increasing_time():
+    tracker = PropertyRateTracker()
+    tracker.observe(snapshot(100), now=0)
+    tracker.observe(snapshot(100), now=0)
+    # Счётчик сброшен до 6: это 6 новых чтений за 60 секунд
+    tracker.observe(snapshot(6), now=60)
+    assert tracker.get_property("Light", "status")["read_1m"] == pytest.approx(0.1 * (1 - 1 / math.e), abs=1e-3)
+
+
+def test_hottest_and_removed_properties():
+    tracker = PropertyRateTracker()
+    stats = {"Light": {"stat_properties": {"status": {"count_write": 0}, "level": {"count_write": 0}}},
+             "Sensor": {"stat_properties": {"value": {"count_write": 0}}}}
+    tracker.observe(stats, now=0)
+    stats["Light"]["stat_properties"]["status"]["count_write"] = 60
+    stats["Light"]["stat_properties"]["level"]["count_write"] = 30
+    stats["Sensor"]["stat_properties"]["value"]["count_write"] = 120
+    tracker.observe(stats, now=60)
+
+    assert [row["name"] for row in tracker.hottest(by="write")] == ["Sensor.value", "Light.status", "Light.level"]
+    assert [row["name"] for row in tracker.hottest(by="write", top=1)] == ["Sensor.value"]
+    objects = tracker.hottest(by="write", level="object")
+    assert [row["name"] for row in objects] == ["Sensor", "Light"]
+    assert tracker.hottest(by="read") == []
+    with pytest.raises(ValueError):
+        tracker.hottest(window="2m")
+
+    tracker.observe({"Sensor": stats["Sensor"]}, now=120)
+    assert tracker.get_property("Light", "status") is None
@@ -0,0 +1,68 @@
+import pytest
+
+from plugins.xray.utils.ring_buffer import RingBuffer
+
+
+def make_buffer(capacity=4):
+    return RingBuffer(capacity, {"active": "i", "usage": "d"})
+
+
+def test_capacity_must_be_positive():
+    with pytest.raises(ValueError):
+        RingBuffer(0, {"active": "i"})
+
+
+def test_append_and_read_in_order():
+    buffer = make_buffer()
+    buffer.append(1.0, active=1, usage=10.5)
+    buffer.append(2.0, active=2)
+
+    assert len(buffer) == 2
+    assert buffer.since(0) == [
+        {"active": 1, "usage": 10.5, "timestamp": 1.0},
+        {"active": 2, "usage": 0.0, "timestamp": 2.0},
+    ]
+
+
+def test_wraparound_keeps_newest_records():
+    buffer = make_buffer(capacity=3)
+    for ts in range(1, 6):
+        buffer.append(float(ts), active=ts)
+
+    assert len(buffer) == 3
+    assert [row["active"] for row in buffer.since(0)] == [3, 4, 5]
+    assert buffer.first()["timestamp"] == 3.0
+    assert buffer.last()["timestamp"] == 5.0
+
+
+def test_since_and_between_after_wraparound():
+    buffer = make_buffer(capacity=4)
+    for ts in range(1, 8):
+        buffer.append(float(ts), active=ts)
+
+    # В буфере 4..7: since - строго после метки, between - интервал (start, end]
+    assert [row["active"] for row in buffer.since(5)] == [6, 7]
+    assert [row["active"] for row in buffer.since(5.5)] == [6, 7]
+    assert [row["active"] for row in buffer.between(4, 6)] == [5, 6]
+    assert buffer.since(7) == []
+    assert [row["active"] for row in buffer.since(-1)] == [4, 5, 6, 7]
+
+
+def test_empty_and_clear():
+    buffer = make_buffer()
+    assert buffer.first() is None
+    assert buffer.last() is None
+    assert buffer.since(0) == []
+
+    buffer.append(1.0, active=1)
+    buffer.clear()
+    assert len(buffer) == 0
+    assert buffer.last() is None
+
+
+def test_memory_usage_is_fixed():
+    buffer = make_buffer(capacity=10)
+    before = buffer.memory_usage()
+    for ts in range(100):
+        buffer.append(float(ts), active=ts, usage=ts / 2)
+    assert buffer.memory_usage() == before == 10 * (8 + 4 + 8)
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from plugins.xray.utils.rollup import MetricSeries, RollupTier, percentile, select_resolution
+
+
+def test_percentile_nearest_rank():
+    assert percentile([], 95) == 0
+    assert percentile([5], 95) == 5
+    assert percentile(list(range(1, 101)), 95) == 95
+    assert percentile([3, 1, 2], 50) == 2
+
+
+def test_tier_closes_bucket_on_rollover():
+    closed = []
+    tier = RollupTier("1m", 60, 10, ("active",), ("total",),
+                      on_bucket=lambda name, ts, row: closed.append((name, ts, row)))
+    for ts, active in ((0, 1), (20, 5), (59, 3)):
+        tier.add(ts, active=active, total=ts)
+    assert len(tier.history) == 0
+
+    tier.add(60, active=7, total=60)
+
+    assert len(tier.history) == 1
+    name, bucket, row = closed[0]
+    assert (name, bucket) == ("1m", 0)
+    assert row["samples"] == 3
+    assert row["total"] == 59
+    assert (row["active_min"], row["active_max"], row["active_p95"]) == (1, 5, 5)
+    assert row["active_avg"] == pytest.approx(3)
+
+
+def test_tier_since_includes_open_bucket():
+    tier = RollupTier("1m", 60, 10, ("active",))
+    tier.add(0, active=1)
+    tier.add(61, active=2)
+    tier.add(62, active=4)
+
+    rows = tier.since(0)
+    assert [row["timestamp"] for row in rows] == [0, 60]
+    assert rows[-1]["samples"] == 2
+    assert rows[-1]["active_avg"] == 3
+
+
+def test_tier_capacity_drops_oldest_buckets():
+    tier = RollupTier("1m", 60, 3, ("active",))
+    for minute in range(6):
+        tier.add(minute * 60, active=minute)
+    # Закрыты корзины 0..4, в буфере остаются три последние
+    assert [row["timestamp"] for row in tier.history.since(-1)] == [120, 180, 240]
+
+
+def test_tier_load_returns_resume_time():
+    tier = RollupTier("1m", 60, 2, ("active",))
+    rows = [{"timestamp": ts, "samples": 1, "active_avg": 1.0} for ts in (0, 60, 120)]
+
+    assert tier.load(rows) == 180
+    assert [row["timestamp"] for row in tier.history.since(-1)] == [60, 120]
+    assert tier.load([]) == 0
+
+
+def test_select_resolution():
+    candidates = [("raw", 1, 1000), ("1m", 60, 86400), ("1h", 3600, 30 * 86400)]
+    assert select_resolution(300, candidates) == "raw"
+    # Сырых сэмплов больше max_points - берётся более грубое разрешение
+    assert select_resolution(900, candidates) == "1m"
+    assert select_resolution(900, candidates, max_points=1000) == "raw"
+    assert select_resolution(2 * 86400, candidates) == "1h"
+    # Период длиннее всех уровней - самое грубое
+    assert select_resolution(90 * 86400, candidates) == "1h"
+
+
+def test_series_history_auto_resolution():
+    series = MetricSeries({"active": "i"}, ("active",), capacity=100)
+    now = time.time()
+    for offset in range(100, 0, -1):
+        series.add(now - offset, active=offset % 5)
+
+    resolution, points = series.history(1, interval=1)
+    assert resolution == "raw"
+    assert len(points) == 59
+
+    resolution, points = series.history(60, interval=1)
+    assert resolution == "1m"
+    assert all(point["active"] == point["active_avg"] for point in points)
+    assert sum(point["samples"] for point in points) == 100
+
+
+def test_series_history_unknown_resolution():
+    series = MetricSeries({"active": "i"}, ("active",))
+    with pytest.raises(ValueError):
+        series.history(5, resolution="5m")
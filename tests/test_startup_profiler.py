@@ -0,0 +1,125 @@
+import json
+
+import pytest
+
+from plugins.xray.utils.import_profiler import ImportProfiler
+from plugins.xray.utils.startup_profiler import StartupProfiler
+
+
+class BasePlugin:
+    def __init__(self):
+        self.initialized = False
+
+    def initialization(self):
+        self.initialized = True
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    imports = ImportProfiler()
+    imports.record("plugins.Zigbee", 0.1, 0.2, 0.5, 0)
+    imports.record("plugins.Zigbee.models", 0.2, 0.3, 0.3, 1)
+    imports.record("plugins.Mqtt", 0.6, 0.1, 0.1, 0)
+    imports.record("requests", 0.0, 0.05, 0.05, 0)
+    return StartupProfiler(imports, path=str(tmp_path / "data" / "startup_history.json"), keep=3)
+
+
+def test_plugin_class_phases_are_timed(profiler):
+    profiler.hook_plugin_class(BasePlugin)
+
+    class Zigbee(BasePlugin):
+        __module__ = "plugins.Zigbee"
+
+        def __init__(self):
+            super().__init__()
+
+        def initialization(self):
+            super().initialization()
+
+    plugin = Zigbee()
+    plugin.initialization()
+    assert plugin.initialized
+    assert Zigbee.__init__.__name__ == "__init__"
+    assert [(rec["plugin"], rec["phase"]) for rec in profiler.plugins] == [
+        ("Zigbee", "__init__"), ("Zigbee", "initialization")]
+
+    # Повторная установка хука не оборачивает методы дважды
+    profiler.hook_plugin_class(BasePlugin)
+    func = Zigbee.__dict__["initialization"]
+    Zigbee.__init_subclass__()
+    assert Zigbee.__dict__["initialization"] is func
+
+
+def test_registry_initialization_is_timed(profiler):
+    plugin = BasePlugin()
+    registry = {"Early": {"instance": plugin}, "Empty": {"instance": None}}
+    profiler.hook_registry(registry)
+    profiler.hook_registry(registry)
+    plugin.initialization()
+    assert plugin.initialized
+    assert [(rec["plugin"], rec["phase"]) for rec in profiler.plugins] == [("Early", "initialization")]
+
+
+def test_current_aggregates_phases(profiler):
+    profiler.record("Zigbee", "__init__", profiler.imports.origin + 0.7, 0.25)
+    profiler.record("Zigbee", "initialization", profiler.imports.origin + 0.8, 1.0)
+    profiler.record("Zigbee", "initialization", profiler.imports.origin + 0.9, 0.5)
+    profiler.record("Early", "initialization", profiler.imports.origin + 0.05, 0.125)
+
+    current = profiler.current()
+    plugins = {item["name"]: item for item in current["plugins"]}
+    zigbee = plugins["Zigbee"]
+    # Импорт плагина - суммарное время вместе с вложенными модулями
+    assert zigbee["import"] == 0.5
+    assert zigbee["initialization"] == 1.5
+    assert zigbee["total"] == 2.25
+    assert zigbee["start"] == 0.1
+    assert plugins["Early"] == {"name": "Early", "initialization": 0.125, "start": 0.05, "total": 0.125}
+    assert [item["name"] for item in current["plugins"]] == ["Zigbee", "Early", "Mqtt"]
+
+    assert [rec["module"] for rec in current["modules"]] == ["requests", "plugins.Zigbee", "plugins.Mqtt"]
+    assert current["imports_total"] == pytest.approx(0.65)
+    assert current["packages"][0]["name"] == "plugins.Zigbee"
+
+
+def test_save_keeps_last_boots(profiler):
+    assert profiler.history() == []
+    for boot in range(5):
+        profiler.imports.started = boot
+        profiler.save()
+    # Повторное сохранение той же загрузки заменяет её
+    profiler.save()
+
+    assert profiler.saved
+    assert [item["boot"] for item in profiler.history()] == [2, 3, 4]
+    with open(profiler.path, encoding="utf-8") as f:
+        assert len(json.load(f)) == 3
+
+
+def test_broken_history_is_ignored(profiler):
+    profiler.save()
+    with open(profiler.path, "w", encoding="utf-8") as f:
+        f.write("{broken")
+    assert profiler.history() == []
+    profiler.save()
+    assert len(profiler.history()) == 1
+
+
+def test_compare_with_previous_boot(profiler):
+    result = profiler.compare()
+    assert result["previous"] is None
+    assert all(item["delta"] is None for item in result["current"]["plugins"])
+
+    profiler.imports.started = 1
+    profiler.save()
+    profiler.imports.started = 2
+    profiler.record("Zigbee", "initialization", profiler.imports.origin, 1.0)
+    profiler.save()
+
+    result = profiler.compare()
+    assert result["previous"]["boot"] == 1
+    assert result["boots"] == [1, 2]
+    plugins = {item["name"]: item for item in result["current"]["plugins"]}
+    assert plugins["Zigbee"]["previous"] == 0.5
+    assert plugins["Zigbee"]["delta"] == 1.0
+    assert plugins["Mqtt"]["delta"] == 0
@@ -0,0 +1,96 @@
+import logging
+
+import pytest
+from sqlalchemy import Column, Integer, String, text
+
+from conftest import Database
+from plugins.xray.utils.table_stats import TableStatsCollector, format_size
+
+
+class Item(Database.Model):
+    __tablename__ = "stats_items"
+    __module__ = "plugins.Demo.models"
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50), index=True)
+
+
+@pytest.fixture
+def collector(engine):
+    Database.Model.metadata.create_all(engine, tables=[Item.__table__])
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE plain (value TEXT)"))
+        conn.execute(Item.__table__.insert(), [{"id": i, "name": f"item{i}"} for i in range(1, 101)])
+        conn.execute(text("DELETE FROM stats_items WHERE id <= 40"))
+        conn.execute(text("INSERT INTO plain (value) VALUES ('a'), ('b')"))
+    return TableStatsCollector(engine, logging.getLogger("test"), ttl=300)
+
+
+def tables(collector):
+    return {item["table_name"]: item for item in collector.get_tables()}
+
+
+def test_format_size():
+    assert format_size(0) == "0 B"
+    assert format_size(None) == "0 B"
+    assert format_size(1536) == "1.50 KB"
+    assert format_size(5 * 1024 ** 3) == "5.00 GB"
+
+
+def test_sqlite_estimates_without_analyze(collector):
+    items = tables(collector)
+    # Без ANALYZE - max(rowid): верхняя граница, удалённые строки не вычитаются
+    assert items["stats_items"]["row_count"] == 100
+    assert items["stats_items"]["estimated"] is True
+    assert items["plain"]["row_count"] == 2
+    assert items["stats_items"]["module"] == "Demo"
+    assert items["plain"]["module"] == "Unknown"
+
+
+def test_sqlite_estimates_from_analyze(collector, engine):
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    collector.refresh()
+    assert tables(collector)["stats_items"]["row_count"] == 60
+
+
+def test_sqlite_sizes(collector):
+    item = tables(collector)["stats_items"]
+    assert item["size_bytes"] > 0
+    assert item["size"] == format_size(item["size_bytes"])
+    if item["size_exact"]:
+        # С dbstat - размер каждого индекса отдельно
+        assert [index["name"] for index in item["indexes"]] == ["ix_stats_items_name"]
+        assert item["index_bytes"] == item["indexes"][0]["size_bytes"]
+
+
+def test_exact_count_survives_refresh_within_ttl(collector):
+    tables(collector)
+    assert collector.exact_count("stats_items") == 60
+    assert collector.exact_count("missing") is None
+
+    collector.refresh()
+    item = tables(collector)["stats_items"]
+    assert (item["row_count"], item["estimated"]) == (60, False)
+
+    # После TTL точный подсчёт снова заменяется оценкой
+    collector.ttl = 0
+    collector.refresh()
+    collector.ttl = 300
+    assert tables(collector)["stats_items"]["estimated"] is True
+
+
+def test_stale_cache_refreshes_in_background(collector, engine, monkeypatch):
+    tables(collector)
+    started = []
+    monkeypatch.setattr(collector, "refresh_async", lambda: started.append(True))
+    collector._updated -= collector.ttl + 1
+
+    # Устаревший кэш отдаётся сразу, обновление - в фоне
+    assert "stats_items" in tables(collector)
+    assert started == [True]
+
+
+def test_unsupported_dialect(collector, monkeypatch):
+    monkeypatch.setattr(collector.engine.dialect, "name", "oracle")
+    with pytest.raises(NotImplementedError):
+        collector._collect()
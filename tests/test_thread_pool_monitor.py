@@ -0,0 +1,27 @@
+import logging
+import time
+
+from plugins.xray.utils.thread_pool_monitor import ThreadPoolMonitor
+
+
+def test_history_uses_one_resolution_for_all_series():
+    monitor = ThreadPoolMonitor(logging.getLogger("test"), max_history=10)
+    monitor.interval = 60
+    now = time.time()
+    # batch writer: 3 сэмпла с шагом опроса - сырых данных хватает на 5 минут
+    for offset in (120, 60, 0):
+        monitor.batch_writer.add(now - offset, batch_size=1)
+    # Пул: буфер заполнен за последние 10 секунд (например после восстановления) -
+    # сырые данные покрывают только 10 секунд, нужен уровень 1m
+    pool = monitor._pool_series("linked_pool")
+    for offset in range(10):
+        pool.add(now - offset, active_tasks=2, utilization=50.0)
+
+    assert monitor.batch_writer.resolve(5, 60) == "raw"
+    assert pool.resolve(5, 60) == "1m"
+    history = monitor.get_history(5)
+    assert history["resolution"] == "1m"
+    assert history["pools"]["linked_pool"][-1]["active_tasks_avg"] == 2
+    assert history["batch_writer"][-1]["batch_size"] == history["batch_writer"][-1]["batch_size_avg"]
+
+    assert monitor.get_history(5, resolution="raw")["resolution"] == "raw"
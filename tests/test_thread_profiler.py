@@ -0,0 +1,103 @@
+import logging
+import threading
+
+import pytest
+
+from plugins.xray.utils import thread_profiler
+from plugins.xray.utils.thread_profiler import ThreadProfiler, read_thread_cpu
+
+
+def idle(event):
+    event.wait()
+
+
+@pytest.fixture
+def workers():
+    """Два потока, ждущих события - стабильные стеки для сэмплов"""
+    event = threading.Event()
+    threads = [threading.Thread(target=idle, args=(event,), name=f"worker{i}", daemon=True) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    yield threads
+    event.set()
+    for thread in threads:
+        thread.join()
+
+
+def sampled(count):
+    profiler = ThreadProfiler(logging.getLogger("test"))
+    profiler.started = profiler.finished = 1.0
+    for _ in range(count):
+        profiler._sample()
+    return profiler
+
+
+def worker_lines(profiler):
+    return [line for line in profiler.collapsed().splitlines() if line.startswith("worker")]
+
+
+def test_collapsed_stack_format(workers):
+    profiler = sampled(3)
+    lines = worker_lines(profiler)
+    assert len(lines) == 2
+
+    for line in lines:
+        stack, count = line.rsplit(" ", 1)
+        frames = stack.split(";")
+        assert count == "3"
+        # Поток, затем кадры от корня к листу
+        assert frames[0] in ("worker0", "worker1")
+        assert frames[1] == "threading:_bootstrap"
+        assert f"{__name__}:idle" in frames
+        assert frames.index(f"{__name__}:idle") < len(frames) - 1
+
+
+def test_collapsed_sorted_by_count(workers):
+    profiler = sampled(1)
+    profiler.stacks["main;a"] += 10
+    assert profiler.collapsed().splitlines()[0] == "main;a 10"
+
+
+def test_stacks_are_capped(workers, monkeypatch):
+    monkeypatch.setattr(thread_profiler, "MAX_STACKS", 1)
+    profiler = sampled(2)
+
+    # Известный стек продолжает считаться, новые отбрасываются
+    assert len(profiler.stacks) == 1
+    assert list(profiler.stacks.values()) == [2]
+    assert profiler.dropped > 0
+    assert profiler.status()["dropped_stacks"] == profiler.dropped
+
+
+def test_stack_depth_is_limited(workers, monkeypatch):
+    monkeypatch.setattr(thread_profiler, "MAX_DEPTH", 2)
+    profiler = sampled(1)
+    for line in worker_lines(profiler):
+        assert len(line.rsplit(" ", 1)[0].split(";")) == 3
+
+
+def test_results_count_samples(workers):
+    profiler = sampled(4)
+    result = profiler.results(top=5)
+    names = {thread["name"]: thread["samples"] for thread in result["threads"]}
+    assert names["worker0"] == names["worker1"] == 4
+    assert result["samples"] == 4
+    assert len(result["functions"]) <= 5
+    # Собственный поток профилировщика не сэмплируется
+    assert threading.current_thread().name not in names
+
+
+def test_start_runs_for_limited_time():
+    profiler = ThreadProfiler(logging.getLogger("test"))
+    assert profiler.start(duration=0, interval=0.001) is True
+    assert profiler.duration == 1
+    assert profiler.start() is False
+    profiler.stop()
+    assert not profiler.running
+    assert profiler.finished is not None
+
+
+def test_read_thread_cpu():
+    value = read_thread_cpu(threading.get_native_id())
+    assert value is None or value >= 0
+    assert read_thread_cpu(-1) is None
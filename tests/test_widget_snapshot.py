@@ -0,0 +1,80 @@
+import logging
+import time
+from types import SimpleNamespace
+
+from plugins.xray.utils.widget_snapshot import WidgetSnapshotter
+
+
+class Plugin:
+    def __init__(self, actions, alive=True):
+        self.actions = actions
+        self.alive = alive
+
+    def is_alive(self):
+        return self.alive
+
+
+def make_registry():
+    return {
+        "Zigbee": {"instance": Plugin(["cycle"])},
+        "Mqtt": {"instance": Plugin(["cycle", "widget"])},
+        "Broken": {"instance": Plugin(["cycle"], alive=False)},
+        "Plain": {"instance": Plugin([])},
+    }
+
+
+def make_snapshotter(**kwargs):
+    return WidgetSnapshotter(logging.getLogger("test"), make_registry(), {"a": 1, "b": 2, "c": 3}, **kwargs)
+
+
+def test_snapshot_contents():
+    pool = SimpleNamespace(active_connections=3, pool_size=10, pool_usage_percent=30.0, overflow=1)
+    threads = SimpleNamespace(last_stats={
+        "batch_writer": {"current_batch_size": 4, "total_errors": 2, "execution_time": {"avg_seconds": 0.1}},
+    })
+    watchdog = SimpleNamespace(stalled=lambda: ["Mqtt"])
+    snapshot = make_snapshotter(pool_monitor=SimpleNamespace(get_pool_stats=lambda: pool),
+                                thread_pool_monitor=threads, cycle_watchdog=watchdog).build()
+
+    assert snapshot["services"] == {"count": 3, "alive": 2, "stopped": 1, "stalled": 1, "stalled_names": ["Mqtt"]}
+    assert snapshot["objects"] == 3
+    assert snapshot["pool"] == {"active": 3, "size": 10, "usage_percent": 30.0, "overflow": 1}
+    assert snapshot["batch_writer"] == {"queue": 4, "errors": 2}
+    assert snapshot["timestamp"] <= time.time()
+
+
+def test_snapshot_without_monitors():
+    snapshot = make_snapshotter(thread_pool_monitor=SimpleNamespace(last_stats=None)).build()
+    assert snapshot["services"]["stalled"] == 0
+    assert snapshot["services"]["stalled_names"] == []
+    assert snapshot["pool"] is None
+    assert snapshot["batch_writer"] is None
+
+
+def test_get_reuses_snapshot():
+    snapshotter = make_snapshotter()
+    first = snapshotter.get()
+    assert snapshotter.get() is first
+
+    # Рендер не видит изменений до следующего обновления
+    snapshotter.plugins_registry["Zigbee"]["instance"].alive = False
+    assert snapshotter.get()["services"]["alive"] == 2
+    assert snapshotter.refresh()["services"]["alive"] == 1
+    assert snapshotter.get() is not first
+
+
+def test_background_refresh():
+    snapshotter = make_snapshotter(interval=0.01)
+    snapshotter.start()
+    try:
+        thread = snapshotter._thread
+        snapshotter.start()
+        assert snapshotter._thread is thread
+        deadline = time.time() + 2
+        while snapshotter._snapshot is None and time.time() < deadline:
+            time.sleep(0.01)
+        assert snapshotter._snapshot["objects"] == 3
+    finally:
+        snapshotter.stop()
+        thread.join(timeout=2)
+    assert not thread.is_alive()
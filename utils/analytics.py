@@ -0,0 +1,349 @@
+import heapq
+import threading
+import time
+import datetime
+from typing import Optional
+
+# Границы уровней нагрузки объектов (количество операций)
+HIGH_LOAD_OPS = 1000
+MEDIUM_LOAD_OPS = 100
+
+
+def to_timestamp(value) -> Optional[float]:
+    """Привести datetime/строку/число к unix timestamp (naive datetime считается UTC)"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime.datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return value.timestamp()
+    return None
+
+
+def _time_bucket(hours: float) -> str:
+    if hours <= 1:
+        return "last_hour"
+    if hours <= 24:
+        return "last_day"
+    if hours <= 168:
+        return "last_week"
+    return "older"
+
+
+def aggregate_stats(stats: dict, top: int = 10, now: Optional[float] = None) -> dict:
+    """Свести результат ``objects_storage.getAdvancedStats()`` в компактную сводку
+    для вкладки аналитики: итоги, топ объектов и методов, распределение по времени,
+    уровням нагрузки и источникам.
+    """
+    if now is None:
+        now = time.time()
+
+    totals = {
+        "objects": 0,
+        "objects_active": 0,
+        "properties": 0,
+        "methods": 0,
+        "reads": 0,
+        "writes": 0,
+        "executions": 0,
+    }
+    time_buckets = {"last_hour": 0, "last_day": 0, "last_week": 0, "older": 0}
+    load_tiers = {"high": 0, "medium": 0, "low": 0}
+    sources = {}
+    objects_ops = []
+    methods = []
+
+    for key, obj in stats.items():
+        if not obj or not isinstance(obj, dict):
+            continue
+        totals["objects"] += 1
+        obj_name = obj.get("name") or obj.get("description") or key
+        count_read = 0
+        count_write = 0
+        count_exec = 0
+
+        for prop in (obj.get("stat_properties") or {}).values():
+            if not isinstance(prop, dict):
+                continue
+            totals["properties"] += 1
+            count_read += prop.get("count_read") or 0
+            count_write += prop.get("count_write") or 0
+            last_write = to_timestamp(prop.get("last_write"))
+            if last_write is not None:
+                time_buckets[_time_bucket((now - last_write) / 3600)] += 1
+            source = prop.get("source") or "unknown"
+            sources.setdefault(source, {"properties": 0, "methods": 0})["properties"] += 1
+
+        for method_name, method in (obj.get("stat_methods") or {}).items():
+            if not isinstance(method, dict):
+                continue
+            totals["methods"] += 1
+            count_executed = method.get("count_executed") or 0
+            count_exec += count_executed
+            if count_executed > 0:
+                methods.append((f"{obj_name}.{method_name}", count_executed, method.get("exec_time") or 0))
+            source = method.get("source") or "unknown"
+            sources.setdefault(source, {"properties": 0, "methods": 0})["methods"] += 1
+
+        totals["reads"] += count_read
+        totals["writes"] += count_write
+        totals["executions"] += count_exec
+
+        total_ops = (obj.get("count_get") or 0) + count_read + count_write + count_exec
+        if total_ops > 0:
+            totals["objects_active"] += 1
+            objects_ops.append((obj_name, total_ops))
+            if total_ops > HIGH_LOAD_OPS:
+                load_tiers["high"] += 1
+            elif total_ops > MEDIUM_LOAD_OPS:
+                load_tiers["medium"] += 1
+            else:
+                load_tiers["low"] += 1
+
+    top_objects = heapq.nlargest(top, objects_ops, key=lambda item: item[1])
+    top_methods = heapq.nlargest(top, methods, key=lambda item: item[1])
+    slow_methods = heapq.nlargest(top, methods, key=lambda item: item[2])
+
+    return {
+        "totals": totals,
+        "top_objects": [{"name": name, "ops": ops} for name, ops in top_objects],
+        "other_objects_ops": sum(ops for _, ops in objects_ops) - sum(ops for _, ops in top_objects),
+        "top_methods": [{"name": name, "count": count, "exec_time": exec_time}
+                        for name, count, exec_time in top_methods],
+        "slow_methods": [{"name": name, "count": count, "exec_time": exec_time}
+                         for name, count, exec_time in slow_methods],
+        "time_buckets": time_buckets,
+        "load_tiers": load_tiers,
+        "sources": sources,
+    }
+
+
+class DeltaTracker:
+    """Отслеживание изменений между снимками ``getAdvancedStats()``.
+
+    Каждому объекту, свойству и методу присваивается номер последовательности,
+    на котором изменились его счётчики или время последнего обращения.
+    Клиент передаёт полученный курсор и получает только изменившиеся записи.
+    """
+
+    # Поля, изменение которых считается изменением записи
+    PROPERTY_FIELDS = ("count_read", "count_write", "last_read", "last_write")
+    METHOD_FIELDS = ("count_executed", "last_executed", "exec_time")
+    MAX_REMOVED = 10000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seq = 0
+        # (obj_key, kind, name) -> (fingerprint, seq)
+        self._versions = {}
+        # obj_key -> seq последнего изменения чего-либо в объекте
+        self._object_versions = {}
+        # obj_key -> seq удаления
+        self._removed = {}
+
+    @property
+    def cursor(self) -> int:
+        return self._seq
+
+    def update(self, stats: dict) -> int:
+        """Сравнить снимок с предыдущим и пометить изменения. Возвращает курсор"""
+        with self._lock:
+            changed = []
+            seen = set()
+            for key, obj in stats.items():
+                if not isinstance(obj, dict):
+                    continue
+                seen.add(key)
+                entries = [((key, "object", None), (obj.get("count_get"),))]
+                for name, prop in (obj.get("stat_properties") or {}).items():
+                    if isinstance(prop, dict):
+                        entries.append(((key, "property", name), tuple(prop.get(f) for f in self.PROPERTY_FIELDS)))
+                for name, method in (obj.get("stat_methods") or {}).items():
+                    if isinstance(method, dict):
+                        entries.append(((key, "method", name), tuple(method.get(f) for f in self.METHOD_FIELDS)))
+                for entry_key, fingerprint in entries:
+                    known = self._versions.get(entry_key)
+                    if known is None or known[0] != fingerprint:
+                        changed.append((entry_key, fingerprint))
+
+            removed = [key for key in self._object_versions if key not in seen]
+            if not changed and not removed:
+                return self._seq
+
+            self._seq += 1
+            for entry_key, fingerprint in changed:
+                self._versions[entry_key] = (fingerprint, self._seq)
+                self._object_versions[entry_key[0]] = self._seq
+                self._removed.pop(entry_key[0], None)
+            if removed:
+                removed_set = set(removed)
+                self._versions = {k: v for k, v in self._versions.items() if k[0] not in removed_set}
+                for key in removed:
+                    del self._object_versions[key]
+                    self._removed[key] = self._seq
+                if len(self._removed) > self.MAX_REMOVED:
+                    oldest = sorted(self._removed.items(), key=lambda item: item[1])
+                    self._removed = dict(oldest[-self.MAX_REMOVED:])
+            return self._seq
+
+    def changes(self, stats: dict, since: int) -> dict:
+        """Изменения с курсора ``since``.
+
+        Если курсор из будущего (например, после перезапуска сервера) - возвращается
+        полный снимок с флагом ``full``.
+        """
+        return self.delta(stats, since, self.update(stats))
+
+    def delta(self, stats: dict, since: int, cursor: int) -> dict:
+        """Изменения с курсора ``since`` в снимке, уже учтённом через ``update()`` (курсор ``cursor``)"""
+        with self._lock:
+            if since <= 0 or since > cursor:
+                return {"stats": stats, "removed": [], "cursor": cursor, "full": True}
+
+            result = {}
+            for key, version in self._object_versions.items():
+                if version <= since or key not in stats:
+                    continue
+                obj = stats[key]
+                item = {k: v for k, v in obj.items() if k not in ("stat_properties", "stat_methods")}
+                item["stat_properties"] = {
+                    name: prop for name, prop in (obj.get("stat_properties") or {}).items()
+                    if self._versions.get((key, "property", name), (None, 0))[1] > since
+                }
+                item["stat_methods"] = {
+                    name: method for name, method in (obj.get("stat_methods") or {}).items()
+                    if self._versions.get((key, "method", name), (None, 0))[1] > since
+                }
+                result[key] = item
+            removed = [key for key, version in self._removed.items() if version > since]
+            return {"stats": result, "removed": removed, "cursor": cursor, "full": False}
+
+
+class AnalyticsSnapshot:
+    """Последний снимок ``getAdvancedStats()`` для вкладки аналитики (потребитель ``StatsPoller``).
+
+    Трекер изменений обновляется один раз за такт опроса, сводка и изменения
+    с курсора считаются один раз на курсор - все клиенты получают готовый результат.
+    """
+
+    # Сколько разных курсоров клиентов хранить для одного снимка
+    MAX_DELTAS = 32
+
+    def __init__(self, tracker: DeltaTracker):
+        self.tracker = tracker
+        self.stats: Optional[dict] = None
+        self.cursor = 0
+        self.timestamp: Optional[float] = None
+        self._summaries = {}
+        self._deltas = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stats: dict):
+        with self._lock:
+            cursor = self.tracker.update(stats)
+            self.stats = stats
+            self.timestamp = time.time()
+            if cursor != self.cursor:
+                self.cursor = cursor
+                self._summaries = {}
+                self._deltas = {}
+
+    def summary(self, top: int = 10) -> dict:
+        """Сводка ``aggregate_stats()`` по снимку"""
+        with self._lock:
+            summary = self._summaries.get(top)
+            if summary is None:
+                summary = self._summaries[top] = aggregate_stats(self.stats or {}, top=top)
+            return summary
+
+    def changes(self, since: int) -> dict:
+        """Изменения снимка с курсора ``since`` (см. ``DeltaTracker.changes``)"""
+        with self._lock:
+            delta = self._deltas.get(since)
+            if delta is None:
+                if len(self._deltas) >= self.MAX_DELTAS:
+                    self._deltas.clear()
+                delta = self._deltas[since] = self.tracker.delta(self.stats or {}, since, self.cursor)
+            return delta
+
+
+class AnalyticsPublisher:
+    """Публикация сводки аналитики в шину событий (потребитель ``StatsPoller`` после ``AnalyticsSnapshot``).
+
+    Сводка публикуется, только если есть подписчики темы ``analytics``
+    и с прошлой публикации что-то изменилось.
+    """
+
+    TOPIC = "analytics"
+
+    def __init__(self, event_bus, snapshot: AnalyticsSnapshot):
+        self.event_bus = event_bus
+        self.snapshot = snapshot
+        self._published_cursor = None
+
+    def observe(self, stats: dict):
+        if not self.event_bus.has_subscribers(self.TOPIC):
+            # Новый подписчик должен получить сводку сразу
+            self._published_cursor = None
+            return
+        cursor = self.snapshot.cursor
+        if cursor == self._published_cursor:
+            return
+        self._published_cursor = cursor
+        self.event_bus.publish(self.TOPIC, {
+            "summary": self.snapshot.summary(),
+            "cursor": cursor,
+            "timestamp": self.snapshot.timestamp,
+        })
+
+
+class StatsPoller:
+    """Периодический опрос ``getAdvancedStats()``: один снимок раздаётся всем трекерам
+    с методом ``observe(stats)``"""
+
+    def __init__(self, logger, get_stats, consumers):
+        self.logger = logger
+        self.get_stats = get_stats
+        self.consumers = list(consumers)
+        self.interval = 5
+        self.last_stats: Optional[dict] = None
+        self.last_poll: Optional[float] = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def poll(self):
+        stats = self.get_stats()
+        self.last_stats = stats
+        self.last_poll = time.time()
+        for consumer in self.consumers:
+            consumer.observe(stats)
+
+    def start_monitoring(self, interval: int = 5):
+        """Запуск периодического опроса"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.interval = interval
+
+        def monitor_loop():
+            while not self._stop_event.is_set():
+                try:
+                    self.poll()
+                except Exception as e:
+                    self.logger.error(f"Stats polling error: {e}")
+                self._stop_event.wait(interval)
+
+        self._thread = threading.Thread(target=monitor_loop, name="xray_stats", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Stats polling started with {interval}s interval")
+
+    def stop_monitoring(self):
+        """Остановка опроса"""
+        self._stop_event.set()
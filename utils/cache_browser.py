@@ -0,0 +1,251 @@
+import re
+import json
+import time
+import heapq
+import pickle
+from typing import Optional
+from app.core.utils import CustomJSONEncoder
+
+# Сколько символов значения отдавать в списке ключей
+DEFAULT_VALUE_LIMIT = 512
+# Сколько ключей максимум анализировать при сборе статистики
+DEFAULT_STATS_SAMPLE = 10000
+# Префикс ключа - часть до первого разделителя
+_PREFIX_SPLIT = re.compile(r"[:/.]")
+
+
+def key_group(key: str) -> str:
+    """Группа ключа для агрегации (часть до первого ``:``, ``/`` или ``.``)"""
+    return _PREFIX_SPLIT.split(key, 1)[0] or key
+
+
+class CacheBrowser:
+    """Постраничный просмотр ключей кэша Flask-Caching (бэкенды ``redis`` и ``simple``).
+
+    Для Redis используется курсорный SCAN, а тип, TTL, размер и значения
+    ключей страницы запрашиваются одним pipeline. Большие значения
+    обрезаются, полное значение загружается отдельным запросом.
+    """
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    @property
+    def cache_type(self) -> str:
+        return self.cache.app.config.get('CACHE_TYPE', 'unknown')
+
+    @property
+    def key_prefix(self) -> str:
+        return self.cache.app.config.get('CACHE_KEY_PREFIX', '') or ''
+
+    def count(self) -> Optional[int]:
+        """Количество ключей кэша, если его можно узнать без перебора ключей.
+
+        Для Redis с CACHE_KEY_PREFIX возвращается ``None``: ключи с префиксом
+        пришлось бы перебирать целиком, их число считает ``stats()``.
+        """
+        if self.cache_type == 'redis':
+            if self.key_prefix:
+                return None
+            return self.cache.cache._read_client.dbsize()
+        if self.cache_type == 'simple':
+            return len(self.cache.cache._cache)
+        return None
+
+    def page(self, cursor: int = 0, count: int = 50, prefix: str = "",
+             value_limit: int = DEFAULT_VALUE_LIMIT) -> dict:
+        """Страница ключей.
+
+        :param cursor: курсор из предыдущего ответа (0 - начало)
+        :param count: желаемый размер страницы
+        :param prefix: фильтр по началу ключа (без CACHE_KEY_PREFIX)
+        :param value_limit: максимальная длина значения в ответе
+        :return: ``{"items": [...], "cursor": int, "done": bool}``
+        """
+        if self.cache_type == 'redis':
+            return self._redis_page(cursor, count, prefix, value_limit)
+        if self.cache_type == 'simple':
+            return self._simple_page(cursor, count, prefix, value_limit)
+        return {"items": [], "cursor": 0, "done": True}
+
+    def stats(self, max_keys: int = DEFAULT_STATS_SAMPLE, top: int = 20) -> dict:
+        """Размер и TTL ключей, агрегированные по префиксам, и топ самых больших ключей.
+
+        Анализируются первые ``max_keys`` ключей в порядке SCAN (это не случайная выборка),
+        остальные ключи кэша только считаются; оценка общего объёма - экстраполяция
+        среднего размера проанализированных ключей.
+        """
+        if self.cache_type == 'redis':
+            entries, total_keys = self._redis_entries(max_keys)
+        elif self.cache_type == 'simple':
+            entries = self._simple_entries(max_keys)
+            total_keys = len(self.cache.cache._cache)
+        else:
+            entries, total_keys = [], 0
+
+        groups = {}
+        total_bytes = 0
+        for key, size, ttl in entries:
+            size = size or 0
+            total_bytes += size
+            group = groups.setdefault(key_group(key), {
+                "prefix": key_group(key), "keys": 0, "bytes": 0,
+                "no_ttl": 0, "min_ttl": None, "max_ttl": None,
+            })
+            group["keys"] += 1
+            group["bytes"] += size
+            if ttl is None:
+                group["no_ttl"] += 1
+            else:
+                group["min_ttl"] = ttl if group["min_ttl"] is None else min(group["min_ttl"], ttl)
+                group["max_ttl"] = ttl if group["max_ttl"] is None else max(group["max_ttl"], ttl)
+        for group in groups.values():
+            group["avg_bytes"] = round(group["bytes"] / group["keys"]) if group["keys"] else 0
+
+        scanned = len(entries)
+        sampled = scanned < total_keys
+        largest = heapq.nlargest(top, entries, key=lambda entry: entry[1] or 0)
+        return {
+            "cache_type": self.cache_type,
+            "total_keys": total_keys,
+            "scanned": scanned,
+            "sampled": sampled,
+            "sample_method": "first_scan_keys",
+            "total_bytes": total_bytes,
+            "estimated_total_bytes": round(total_bytes * total_keys / scanned) if sampled and scanned else total_bytes,
+            "prefixes": sorted(groups.values(), key=lambda group: group["bytes"], reverse=True),
+            "largest": [{"key": key, "size": size, "ttl": ttl} for key, size, ttl in largest],
+        }
+
+    def _redis_entries(self, max_keys: int):
+        """(ключ, размер, ttl) для первых ``max_keys`` ключей кэша - SCAN пачками с pipeline на пачку.
+
+        :return: (записи, количество всех ключей с CACHE_KEY_PREFIX)
+        """
+        client = self.cache.cache._read_client
+        key_prefix = self.key_prefix
+        entries = []
+        total = 0
+        cursor = 0
+        while True:
+            cursor, raw_keys = client.scan(cursor=cursor, match=f"{key_prefix}*", count=1000)
+            total += len(raw_keys)
+            raw_keys = raw_keys[:max(max_keys - len(entries), 0)]
+            if raw_keys:
+                pipe = client.pipeline(transaction=False)
+                for raw_key in raw_keys:
+                    pipe.execute_command("MEMORY USAGE", raw_key)
+                    pipe.strlen(raw_key)
+                    pipe.pttl(raw_key)
+                results = pipe.execute(raise_on_error=False)
+                for i, raw_key in enumerate(raw_keys):
+                    memory, length, pttl = results[i * 3: i * 3 + 3]
+                    # Без MEMORY USAGE (старый Redis, ограничения ACL) - длина значения и ключа
+                    if not isinstance(memory, int):
+                        memory = length + len(raw_key) if isinstance(length, int) else None
+                    key = raw_key[len(key_prefix):]
+                    if isinstance(key, bytes):
+                        key = key.decode('utf-8', 'replace')
+                    entries.append((
+                        key,
+                        memory,
+                        round(pttl / 1000, 1) if isinstance(pttl, int) and pttl >= 0 else None,
+                    ))
+            if int(cursor) == 0:
+                break
+        return entries, total
+
+    def _simple_entries(self, max_keys: int):
+        """(ключ, размер сериализованного значения, ttl) для simple-кэша"""
+        now = time.time()
+        entries = []
+        for key, entry in list(self.cache.cache._cache.items())[:max_keys]:
+            expires, raw_value = entry
+            size = len(raw_value) + len(key) if isinstance(raw_value, (bytes, str)) else None
+            entries.append((key, size, round(expires - now, 1) if expires else None))
+        return entries
+
+    def get_value(self, key: str) -> Optional[str]:
+        """Полное значение ключа в JSON"""
+        return self._dumps(self.cache.get(key))
+
+    @staticmethod
+    def _dumps(value) -> str:
+        return json.dumps(value, cls=CustomJSONEncoder, ensure_ascii=False)
+
+    def _item(self, key: str, value, value_limit: int, **fields) -> dict:
+        dumped = self._dumps(value)
+        item = {
+            "key": key,
+            "value": dumped[:value_limit],
+            "truncated": len(dumped) > value_limit,
+        }
+        item.update(fields)
+        return item
+
+    def _loads(self, raw):
+        """Десериализация значения так же, как это делает бэкенд кэша"""
+        backend = self.cache.cache
+        serializer = getattr(backend, "serializer", None)
+        if serializer is not None:
+            return serializer.loads(raw)
+        if hasattr(backend, "load_object"):
+            return backend.load_object(raw)
+        return pickle.loads(raw)
+
+    def _redis_page(self, cursor, count, prefix, value_limit) -> dict:
+        client = self.cache.cache._read_client
+        key_prefix = self.key_prefix
+        next_cursor, raw_keys = client.scan(cursor=cursor, match=f"{key_prefix}{prefix}*", count=count)
+        items = []
+        if raw_keys:
+            pipe = client.pipeline(transaction=False)
+            pipe.mget(raw_keys)
+            for raw_key in raw_keys:
+                pipe.type(raw_key)
+                pipe.pttl(raw_key)
+                pipe.execute_command("MEMORY USAGE", raw_key)
+            results = pipe.execute(raise_on_error=False)
+            values = results[0]
+            for i, raw_key in enumerate(raw_keys):
+                key_type, pttl, memory = results[1 + i * 3: 4 + i * 3]
+                if isinstance(key_type, bytes):
+                    key_type = key_type.decode()
+                raw_value = values[i] if not isinstance(values, Exception) else None
+                try:
+                    value = self._loads(raw_value) if raw_value is not None else None
+                except Exception:
+                    value = repr(raw_value)
+                key = raw_key[len(key_prefix):] if isinstance(raw_key, str) else raw_key[len(key_prefix):].decode('utf-8', 'replace')
+                items.append(self._item(
+                    key, value, value_limit,
+                    type=key_type if not isinstance(key_type, Exception) else None,
+                    ttl=round(pttl / 1000, 1) if isinstance(pttl, int) and pttl >= 0 else None,
+                    size=memory if isinstance(memory, int) else (len(raw_value) if raw_value else None),
+                ))
+        return {"items": items, "cursor": int(next_cursor), "done": int(next_cursor) == 0}
+
+    def _simple_page(self, cursor, count, prefix, value_limit) -> dict:
+        # Для simple курсор - смещение в отсортированном списке ключей
+        storage = self.cache.cache._cache
+        keys = sorted(k for k in list(storage.keys()) if k.startswith(prefix))
+        now = time.time()
+        items = []
+        for key in keys[cursor:cursor + count]:
+            entry = storage.get(key)
+            if entry is None:
+                continue
+            expires, raw_value = entry
+            try:
+                value = self._loads(raw_value)
+            except Exception:
+                value = repr(raw_value)
+            items.append(self._item(
+                key, value, value_limit,
+                type="string",
+                ttl=round(expires - now, 1) if expires else None,
+                size=len(raw_value) if isinstance(raw_value, (bytes, str)) else None,
+            ))
+        next_cursor = cursor + count
+        done = next_cursor >= len(keys)
+        return {"items": items, "cursor": 0 if done else next_cursor, "done": done}
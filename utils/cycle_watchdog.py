@@ -0,0 +1,199 @@
+import time
+import threading
+from collections import deque
+from statistics import median
+from typing import Dict, Optional
+from plugins.xray.utils.analytics import to_timestamp
+from plugins.xray.utils.latency import LogHistogram
+
+# Сколько последних интервалов хранится для оценки нормального периода цикла
+PERIOD_WINDOW = 50
+# Период считается известным после стольких интервалов
+MIN_INTERVALS = 3
+MAX_STALL_EVENTS = 200
+
+
+class _CycleState:
+    """Состояние наблюдения за одним циклическим плагином"""
+
+    def __init__(self):
+        self.last_update: Optional[float] = None
+        self.intervals = deque(maxlen=PERIOD_WINDOW)
+        self.histogram = LogHistogram()
+        self.stall: Optional[dict] = None
+        self.stalls = 0
+        self.restarts = 0
+        self.last_restart: Optional[float] = None
+
+    @property
+    def period(self) -> Optional[float]:
+        if len(self.intervals) < MIN_INTERVALS:
+            return None
+        return median(self.intervals)
+
+
+class CycleWatchdog:
+    """Наблюдение за циклическими плагинами.
+
+    По продвижению ``dtUpdated`` считаются интервалы между отметками активности
+    (heartbeat): длительность итерации цикла вместе с паузой, без их разделения.
+    ``dtUpdated`` опрашивается раз в ``interval`` секунд, поэтому интервалы
+    квантуются с этой точностью. По интервалам считается нормальный период (медиана).
+    Если ``dtUpdated`` не меняется дольше ``stall_factor`` периодов (но не меньше
+    ``min_stall_seconds``), цикл считается зависшим; при ``auto_restart`` он
+    перезапускается через ``stop_cycle()``/``start_cycle()`` не чаще ``restart_cooldown``.
+    """
+
+    def __init__(self, logger, plugins_registry, stall_factor: float = 5, min_stall_seconds: float = 30,
+                 auto_restart: bool = False, restart_cooldown: float = 300):
+        self.logger = logger
+        self.plugins_registry = plugins_registry
+        self.stall_factor = stall_factor
+        self.min_stall_seconds = min_stall_seconds
+        self.auto_restart = auto_restart
+        self.restart_cooldown = restart_cooldown
+        self.interval = 1
+        self.cycles: Dict[str, _CycleState] = {}
+        self.stall_history = deque(maxlen=MAX_STALL_EVENTS)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _cycle_plugins(self) -> dict:
+        return {name: plugin["instance"] for name, plugin in list(self.plugins_registry.items())
+                if "cycle" in plugin["instance"].actions}
+
+    def check(self, now: Optional[float] = None):
+        """Проверить все циклические плагины"""
+        now = time.time() if now is None else now
+        restart = []
+        with self._lock:
+            instances = self._cycle_plugins()
+            for name in list(self.cycles):
+                if name not in instances:
+                    del self.cycles[name]
+            for name, instance in instances.items():
+                state = self.cycles.get(name)
+                if state is None:
+                    state = self.cycles[name] = _CycleState()
+                updated = to_timestamp(getattr(instance, "dtUpdated", None))
+                if updated is not None and state.last_update is not None and updated > state.last_update:
+                    interval = updated - state.last_update
+                    state.intervals.append(interval)
+                    state.histogram.record(interval)
+                if updated is not None and (state.last_update is None or updated > state.last_update):
+                    state.last_update = updated
+                    if state.stall:
+                        self._end_stall(name, state, now)
+
+                if state.stall or not instance.is_alive():
+                    continue
+                threshold = self._threshold(state)
+                if threshold is None or state.last_update is None:
+                    continue
+                if now - state.last_update > threshold:
+                    state.stall = {
+                        "plugin": name,
+                        "started": state.last_update,
+                        "detected": now,
+                        "ended": None,
+                        "period": round(state.period, 3),
+                        "restarted": False,
+                    }
+                    state.stalls += 1
+                    self.stall_history.append(state.stall)
+                    self.logger.warning(f"Cycle '{name}' stalled: no activity for {now - state.last_update:.0f}s "
+                                        f"(normal period {state.period:.1f}s)")
+                    if self.auto_restart and (state.last_restart is None
+                                              or now - state.last_restart > self.restart_cooldown):
+                        state.last_restart = now
+                        state.restarts += 1
+                        state.stall["restarted"] = True
+                        restart.append((name, instance))
+
+        # Перезапуск вне блокировки: stop_cycle() может ждать завершения потока
+        for name, instance in restart:
+            try:
+                self.logger.warning(f"Restarting stalled cycle '{name}'")
+                instance.stop_cycle()
+                instance.start_cycle()
+            except Exception as e:
+                self.logger.exception(e)
+
+    def _threshold(self, state: _CycleState) -> Optional[float]:
+        period = state.period
+        if period is None:
+            return None
+        return max(period * self.stall_factor, self.min_stall_seconds)
+
+    def _end_stall(self, name: str, state: _CycleState, now: float):
+        state.stall["ended"] = now
+        state.stall["duration"] = round(now - state.stall["started"], 3)
+        self.logger.info(f"Cycle '{name}' recovered after {state.stall['duration']:.0f}s")
+        state.stall = None
+
+    def get_status(self) -> dict:
+        """Состояние циклов: период, перцентили интервалов между heartbeat, зависания"""
+        now = time.time()
+        instances = self._cycle_plugins()
+        result = {}
+        with self._lock:
+            for name, state in self.cycles.items():
+                instance = instances.get(name)
+                alive = instance.is_alive() if instance else False
+                if not alive:
+                    status = "stopped"
+                elif state.stall:
+                    status = "stalled"
+                elif state.period is None:
+                    status = "unknown"
+                else:
+                    status = "ok"
+                summary = state.histogram.summary()
+                result[name] = {
+                    "status": status,
+                    "alive": alive,
+                    "last_update": state.last_update,
+                    "heartbeat_age": round(now - state.last_update, 3) if state.last_update else None,
+                    "period": round(state.period, 3) if state.period is not None else None,
+                    "stall_threshold": self._threshold(state),
+                    "heartbeat_interval": {key: round(value, 3) for key, value in summary.items() if key != "count"},
+                    "heartbeats": summary["count"],
+                    "resolution": self.interval,
+                    "stalls": state.stalls,
+                    "restarts": state.restarts,
+                }
+        return result
+
+    def get_stall_history(self, plugin: Optional[str] = None) -> list:
+        with self._lock:
+            events = [dict(event) for event in self.stall_history if plugin is None or event["plugin"] == plugin]
+        return events[::-1]
+
+    def stalled(self) -> list:
+        """Имена зависших циклов"""
+        with self._lock:
+            return [name for name, state in self.cycles.items() if state.stall]
+
+    def start_monitoring(self, interval: int = 1):
+        """Запуск периодической проверки"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.interval = interval
+
+        def monitor_loop():
+            while not self._stop_event.is_set():
+                try:
+                    self.check()
+                except Exception as e:
+                    self.logger.error(f"Cycle watchdog error: {e}")
+                self._stop_event.wait(interval)
+
+        self._thread = threading.Thread(target=monitor_loop, name="xray_watchdog", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Cycle watchdog started with {interval}s interval")
+
+    def stop_monitoring(self):
+        """Остановка проверки"""
+        self._stop_event.set()
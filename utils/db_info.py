@@ -0,0 +1,237 @@
+import os
+import time
+import threading
+from typing import Optional
+from sqlalchemy import text
+from app.database import session_scope
+from plugins.xray.utils.table_stats import format_size
+
+# Все показатели одним запросом для каждой СУБД
+_BATCH_QUERIES = {
+    'postgresql': """
+        SELECT
+            version() AS version,
+            current_database() AS database_name,
+            pg_database_size(current_database()) AS size_bytes,
+            (SELECT setting::int FROM pg_settings WHERE name = 'max_connections') AS max_conn,
+            (SELECT count(*) FROM pg_stat_activity WHERE datname = current_database()) AS active_conn,
+            (SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND state = 'idle') AS idle_conn,
+            (SELECT count(*) FROM information_schema.tables
+              WHERE table_schema = 'public' AND table_type = 'BASE TABLE') AS tables_count,
+            (SELECT count(*) FROM pg_indexes WHERE schemaname = 'public') AS indexes_count,
+            (SELECT count(*) FROM information_schema.views WHERE table_schema = 'public') AS views_count,
+            date_trunc('second', current_timestamp - pg_postmaster_start_time()) AS uptime;
+    """,
+    'mysql': """
+        SELECT
+            VERSION() AS version,
+            DATABASE() AS database_name,
+            (SELECT SUM(data_length + index_length) FROM information_schema.tables
+              WHERE table_schema = DATABASE()) AS size_bytes,
+            @@character_set_database AS charset,
+            @@collation_database AS collation,
+            @@max_connections AS max_conn,
+            (SELECT COUNT(*) FROM information_schema.PROCESSLIST WHERE DB = DATABASE()) AS active_conn,
+            (SELECT COUNT(*) FROM information_schema.PROCESSLIST
+              WHERE DB = DATABASE() AND COMMAND = 'Sleep') AS idle_conn,
+            (SELECT COUNT(*) FROM information_schema.tables
+              WHERE table_schema = DATABASE() AND table_type = 'BASE TABLE') AS tables_count,
+            (SELECT COUNT(*) FROM information_schema.views WHERE table_schema = DATABASE()) AS views_count;
+    """,
+    'sqlite': """
+        SELECT
+            sqlite_version() AS version,
+            (SELECT COUNT(*) FROM sqlite_master WHERE type = 'table') AS tables_count,
+            (SELECT COUNT(*) FROM sqlite_master WHERE type = 'index') AS indexes_count,
+            (SELECT COUNT(*) FROM sqlite_master WHERE type = 'view') AS views_count;
+    """,
+}
+
+# Запасные запросы по одному показателю - выполняются, только если общий запрос не удался
+_FALLBACK_QUERIES = {
+    'postgresql': {
+        'version': "SELECT version();",
+        'database_name': "SELECT current_database();",
+        'size_bytes': "SELECT pg_database_size(current_database());",
+        'max_conn': "SHOW max_connections;",
+        'active_conn': "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database();",
+        'idle_conn': "SELECT count(*) FROM pg_stat_activity WHERE datname = current_database() AND state = 'idle';",
+        'tables_count': "SELECT COUNT(*) FROM pg_tables WHERE schemaname = 'public';",
+        'indexes_count': "SELECT COUNT(*) FROM pg_indexes WHERE schemaname = 'public';",
+        'views_count': "SELECT COUNT(*) FROM information_schema.views WHERE table_schema = 'public';",
+        'uptime': "SELECT date_trunc('second', current_timestamp - pg_postmaster_start_time());",
+    },
+    'mysql': {
+        'version': "SELECT VERSION();",
+        'database_name': "SELECT DATABASE();",
+        'size_bytes': "SELECT SUM(data_length + index_length) FROM information_schema.tables WHERE table_schema = DATABASE();",
+        'charset': "SELECT @@character_set_database;",
+        'collation': "SELECT @@collation_database;",
+        'max_conn': "SELECT @@max_connections;",
+        'active_conn': "SELECT COUNT(*) FROM information_schema.PROCESSLIST WHERE DB = DATABASE();",
+        'idle_conn': "SELECT COUNT(*) FROM information_schema.PROCESSLIST WHERE DB = DATABASE() AND COMMAND = 'Sleep';",
+        'tables_count': "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = DATABASE() AND table_type = 'BASE TABLE';",
+    },
+    'sqlite': {
+        'version': "SELECT sqlite_version();",
+        'tables_count': "SELECT COUNT(*) FROM sqlite_master WHERE type='table';",
+    },
+}
+
+
+class DatabaseInfoCollector:
+    """Сведения о СУБД (версия, размер, подключения, количество объектов).
+
+    Собираются фоновым потоком одним запросом на СУБД и отдаются из снимка,
+    поэтому вкладка DB не занимает соединения пула на каждый запрос.
+    """
+
+    def __init__(self, engine, logger, interval: int = 60):
+        self.engine = engine
+        self.logger = logger
+        self.interval = interval
+        self._snapshot: Optional[dict] = None
+        self._updated: Optional[float] = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def age(self) -> Optional[float]:
+        """Возраст снимка в секундах"""
+        if self._updated is None:
+            return None
+        return time.time() - self._updated
+
+    def get_info(self) -> dict:
+        """Последний снимок. Если сбор ещё не выполнялся - собирается синхронно"""
+        if self._snapshot is None:
+            self.refresh()
+        with self._lock:
+            info = dict(self._snapshot)
+        info['age'] = self.age
+        return info
+
+    def refresh(self):
+        info = self._collect()
+        with self._lock:
+            self._snapshot = info
+            self._updated = time.time()
+
+    def start(self):
+        """Запуск периодического сбора"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def collect_loop():
+            while not self._stop_event.is_set():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    self.logger.error(f"Database info collector error: {e}")
+                self._stop_event.wait(self.interval)
+
+        self._thread = threading.Thread(target=collect_loop, name="xray_db_info", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _query(self, dialect: str) -> dict:
+        """Выполнить общий запрос, при ошибке - запасные запросы по одному"""
+        try:
+            with session_scope() as session:
+                row = session.execute(text(_BATCH_QUERIES[dialect])).fetchone()
+                return dict(row._mapping) if row else {}
+        except Exception as e:
+            self.logger.warning("Batched database info query failed, using fallbacks: %s", e)
+
+        values = {}
+        for field, sql in _FALLBACK_QUERIES[dialect].items():
+            # Отдельная сессия, чтобы ошибка не прерывала транзакцию остальных запросов
+            try:
+                with session_scope() as session:
+                    values[field] = session.execute(text(sql)).scalar()
+            except Exception as e:
+                self.logger.warning("Failed to get %s: %s", field, e)
+        return values
+
+    def _collect(self) -> dict:
+        engine = self.engine
+        dialect = engine.dialect.name
+        db_info = {
+            'type': dialect.upper() if dialect else 'UNKNOWN',
+            'version': 'Unknown',
+            'database_name': 'Unknown',
+            'database_size': 'Unknown',
+            'connection_string': str(engine.url).split('@')[-1] if '@' in str(engine.url) else str(engine.url).replace('sqlite:///', ''),
+            'max_connections': 'Unknown',
+            'active_connections': 'Unknown',
+            'idle_connections': 'Unknown',
+            'tables_count': 0,
+            'indexes_count': 0,
+            'views_count': 0,
+            'connections_usage_percent': 0,
+            'server_uptime': 'Unknown',
+            'charset': 'Unknown',
+            'collation': 'Unknown',
+        }
+        if dialect not in _BATCH_QUERIES:
+            db_info['error'] = f"Unsupported database dialect: {dialect}"
+            return db_info
+
+        try:
+            values = self._query(dialect)
+        except Exception as e:
+            self.logger.exception("Error getting database info: %s", e)
+            db_info['error'] = str(e)
+            return db_info
+
+        version = values.get('version')
+        if version:
+            if dialect == 'postgresql':
+                version = version.split(',')[0]
+            elif dialect == 'sqlite':
+                version = f"SQLite {version}"
+            db_info['version'] = version
+
+        if dialect == 'sqlite':
+            db_path = str(engine.url).replace('sqlite:///', '')
+            db_name = db_path.split('/')[-1] if '/' in db_path else db_path.split('\\')[-1]
+            db_info['database_name'] = db_name if db_name else 'Unknown'
+            try:
+                if os.path.exists(db_path):
+                    db_info['database_size'] = format_size(os.path.getsize(db_path))
+            except Exception as e:
+                self.logger.warning("Failed to get database size: %s", e)
+            # SQLite не имеет понятия max_connections в том же смысле
+            db_info['max_connections'] = 'N/A'
+            db_info['active_connections'] = 'N/A'
+            db_info['idle_connections'] = 'N/A'
+        else:
+            if values.get('database_name'):
+                db_info['database_name'] = values['database_name']
+            if 'size_bytes' in values:
+                db_info['database_size'] = format_size(values['size_bytes'])
+            if values.get('max_conn') is not None:
+                db_info['max_connections'] = int(values['max_conn'])
+            db_info['active_connections'] = values.get('active_conn') or 0
+            db_info['idle_connections'] = values.get('idle_conn') or 0
+            if values.get('uptime'):
+                db_info['server_uptime'] = str(values['uptime'])
+            if values.get('charset'):
+                db_info['charset'] = values['charset']
+            if values.get('collation'):
+                db_info['collation'] = values['collation']
+
+            # Использование подключений в процентах
+            max_conn = db_info['max_connections']
+            if isinstance(max_conn, int) and max_conn > 0:
+                total_conn = db_info['active_connections'] + db_info['idle_connections']
+                db_info['connections_usage_percent'] = round((total_conn / max_conn) * 100, 1)
+
+        for field in ('tables_count', 'indexes_count', 'views_count'):
+            db_info[field] = values.get(field) or 0
+
+        return db_info
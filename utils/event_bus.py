@@ -0,0 +1,77 @@
+import json
+import queue
+import threading
+from typing import Iterable, Optional, Set
+from app.core.utils import CustomJSONEncoder
+
+# Интервал пустых сообщений, чтобы прокси не закрывали соединение
+KEEPALIVE_SECONDS = 15
+
+
+class Subscriber:
+    """Подписчик шины: очередь событий ограниченного размера и фильтр по темам"""
+
+    def __init__(self, topics: Optional[Set[str]], max_queue: int = 100):
+        self.topics = topics
+        self.queue = queue.Queue(maxsize=max_queue)
+
+    def accepts(self, topic: str) -> bool:
+        return not self.topics or topic in self.topics
+
+    def put(self, item):
+        # Медленный клиент теряет самые старые события, а не тормозит публикацию
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+
+class EventBus:
+    """Шина событий xray: фоновые сборщики публикуют снимок один раз,
+    шина раздаёт его всем подключённым клиентам (Server-Sent Events)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers: Set[Subscriber] = set()
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None) -> Subscriber:
+        subscriber = Subscriber(set(topics) if topics else None)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def has_subscribers(self, topic: str) -> bool:
+        with self._lock:
+            return any(s.accepts(topic) for s in self._subscribers)
+
+    def publish(self, topic: str, data):
+        """Опубликовать событие. Данные сериализуются один раз для всех подписчиков"""
+        with self._lock:
+            subscribers = [s for s in self._subscribers if s.accepts(topic)]
+        if not subscribers:
+            return
+        message = f"event: {topic}\ndata: {json.dumps(data, cls=CustomJSONEncoder, ensure_ascii=False)}\n\n"
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def stream(self, topics: Optional[Iterable[str]] = None):
+        """Генератор SSE-потока для подписчика"""
+        subscriber = self.subscribe(topics)
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    yield subscriber.queue.get(timeout=KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+        finally:
+            self.unsubscribe(subscriber)
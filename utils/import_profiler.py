@@ -0,0 +1,138 @@
+import sys
+import time
+import threading
+from importlib.abc import Loader, MetaPathFinder
+from typing import Dict, List
+
+
+class _TimingFinder(MetaPathFinder):
+    """Finder в начале ``sys.meta_path``: находит спецификацию остальными finder'ами
+    и оборачивает ``exec_module`` загрузчика замером времени"""
+
+    def __init__(self, profiler: "ImportProfiler"):
+        self.profiler = profiler
+        self._local = threading.local()
+
+    def find_spec(self, fullname, path=None, target=None):
+        if getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        loader = spec.loader
+        # Загрузчик может быть общим для многих модулей (zipimporter, finder-загрузчики) -
+        # не меняем его, а подставляем в спецификацию обёртку для этого модуля
+        if loader is not None and not isinstance(loader, (type, _TimedLoader)) and hasattr(loader, "exec_module"):
+            spec.loader = _TimedLoader(loader, self.profiler.wrap(fullname, loader.exec_module))
+        return spec
+
+
+class _TimedLoader(Loader):
+    """Загрузчик одного модуля: замеряет ``exec_module``, остальное делегирует исходному"""
+
+    def __init__(self, loader, timed_exec_module):
+        self.loader = loader
+        self._timed_exec_module = timed_exec_module
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        # Модуль должен видеть исходный загрузчик (pkgutil, importlib.resources)
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        self._timed_exec_module(module)
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+
+class ImportProfiler:
+    """Замер времени импорта модулей в процессе (аналог ``-X importtime``).
+
+    Для каждого модуля записывается собственное время выполнения и суммарное
+    вместе с вложенными импортами. Учитываются модули, импортированные после ``install()``.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.records: List[dict] = []
+        self.origin = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._finder = None
+
+    @property
+    def installed(self) -> bool:
+        return self._finder is not None and self._finder in sys.meta_path
+
+    def install(self):
+        if self.installed:
+            return
+        self._finder = _TimingFinder(self)
+        sys.meta_path.insert(0, self._finder)
+
+    def uninstall(self):
+        if self.installed:
+            sys.meta_path.remove(self._finder)
+
+    def wrap(self, fullname: str, exec_module):
+        profiler = self
+
+        def timed_exec_module(module):
+            stack = getattr(profiler._local, "stack", None)
+            if stack is None:
+                stack = profiler._local.stack = []
+            start = time.perf_counter()
+            stack.append(0.0)
+            try:
+                exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - start
+                children = stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+                profiler.record(fullname, start - profiler.origin, elapsed - children, elapsed, len(stack))
+
+        return timed_exec_module
+
+    def record(self, name: str, start: float, self_time: float, cumulative: float, depth: int):
+        with self._lock:
+            self.records.append({
+                "module": name,
+                "start": round(start, 6),
+                "self": round(self_time, 6),
+                "cumulative": round(cumulative, 6),
+                "depth": depth,
+            })
+
+    def by_top_level(self) -> Dict[str, dict]:
+        """Время импорта по пакетам верхнего уровня (сумма собственного времени модулей),
+        плагины - по ``plugins.<имя>``"""
+        result = {}
+        with self._lock:
+            records = list(self.records)
+        for rec in records:
+            parts = rec["module"].split(".")
+            # Плагины - отдельные пакеты внутри plugins
+            top = ".".join(parts[:2]) if parts[0] == "plugins" else parts[0]
+            item = result.setdefault(top, {"name": top, "time": 0.0, "modules": 0})
+            item["time"] += rec["self"]
+            item["modules"] += 1
+        for item in result.values():
+            item["time"] = round(item["time"], 6)
+        return result
+
+
+# Единственный экземпляр на процесс: устанавливается при загрузке плагина
+import_profiler = ImportProfiler()
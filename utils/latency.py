@@ -0,0 +1,188 @@
+import math
+import time
+import functools
+import threading
+from array import array
+from typing import Dict, Optional, Tuple
+
+# Диапазон и шаг логарифмических корзин: относительная погрешность перцентиля не более 10%
+HIST_MIN = 1e-6
+HIST_MAX = 1e6
+HIST_GROWTH = 1.1
+_LOG_GROWTH = math.log(HIST_GROWTH)
+_BUCKETS = int(math.ceil(math.log(HIST_MAX / HIST_MIN) / _LOG_GROWTH)) + 2
+
+
+class LogHistogram:
+    """Гистограмма с логарифмическими корзинами фиксированного размера.
+
+    Корзина 0 - значения не больше ``HIST_MIN``, последняя - больше ``HIST_MAX``.
+    Гистограммы с одинаковыми границами складываются через ``merge``.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = array("Q", bytes(8 * _BUCKETS))
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    @staticmethod
+    def bucket(value: float) -> int:
+        if value <= HIST_MIN:
+            return 0
+        if value > HIST_MAX:
+            return _BUCKETS - 1
+        return min(int(math.ceil(math.log(value / HIST_MIN) / _LOG_GROWTH)), _BUCKETS - 2)
+
+    @staticmethod
+    def upper_bound(index: int) -> float:
+        return HIST_MIN * HIST_GROWTH ** index
+
+    def record(self, value: float, count: int = 1):
+        self.counts[self.bucket(value)] += count
+        self.count += count
+        self.total += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: "LogHistogram"):
+        for index, value in enumerate(other.counts):
+            if value:
+                self.counts[index] += value
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percent: float) -> float:
+        """Верхняя граница корзины, в которую попадает перцентиль (не больше max)"""
+        if not self.count:
+            return 0
+        rank = max(math.ceil(percent / 100 * self.count), 1)
+        seen = 0
+        for index, value in enumerate(self.counts):
+            seen += value
+            if seen >= rank:
+                # У последней корзины нет верхней границы
+                return self.max if index == _BUCKETS - 1 else min(self.upper_bound(index), self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0,
+            "min": self.min or 0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max or 0,
+        }
+
+
+class MethodLatencyTracker:
+    """Гистограммы времени выполнения методов (секунды).
+
+    После ``hook()`` замеряется каждое выполнение метода объекта. Без перехвата
+    гистограмма пополняется из снимков ``getAdvancedStats()`` (см. ``StatsPoller``),
+    где есть только ``exec_time`` последнего выполнения: остальные выполнения
+    между опросами не наблюдаются - их число отдаётся как ``missed``.
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, LogHistogram] = {}
+        self.hooked = False
+        self._last: Dict[str, Tuple[int, object]] = {}
+        self._missed: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LogHistogram()
+            histogram.record(seconds)
+
+    def hook(self, object_cls, method: str = "callMethod") -> bool:
+        """Замерять каждый вызов ``object_cls.<method>(name, ...)``, имя метода - первый аргумент"""
+        original = getattr(object_cls, method, None)
+        if original is None:
+            return False
+        if not getattr(original, "__xray_timed__", False):
+            tracker = self
+
+            @functools.wraps(original)
+            def timed(obj, name, *args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return original(obj, name, *args, **kwargs)
+                finally:
+                    tracker.record(f"{getattr(obj, 'name', '?')}.{name}", time.perf_counter() - start)
+
+            timed.__xray_timed__ = True
+            setattr(object_cls, method, timed)
+        self.hooked = True
+        return True
+
+    def observe(self, stats: dict):
+        """Учесть новые выполнения методов из снимка статистики (если вызовы не перехвачены)"""
+        if self.hooked:
+            return
+        with self._lock:
+            for obj_name, obj in stats.items():
+                for method_name, method in (obj.get("stat_methods") or {}).items():
+                    count = method.get("count_executed") or 0
+                    exec_time = method.get("exec_time")
+                    key = f"{obj_name}.{method_name}"
+                    last = self._last.get(key)
+                    self._last[key] = (count, method.get("last_executed"))
+                    # Первый снимок - только запоминаем счётчик, прошлые выполнения неизвестны
+                    if last is None or exec_time is None:
+                        continue
+                    executed = count - last[0]
+                    if executed <= 0:
+                        continue
+                    histogram = self.histograms.get(key)
+                    if histogram is None:
+                        histogram = self.histograms[key] = LogHistogram()
+                    histogram.record(exec_time)
+                    if executed > 1:
+                        self._missed[key] = self._missed.get(key, 0) + executed - 1
+
+    def get_method(self, name: str) -> Optional[dict]:
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                return None
+            result = histogram.summary()
+            result["name"] = name
+            result["missed"] = self._missed.get(name, 0)
+            return result
+
+    def get_all(self) -> Dict[str, dict]:
+        """Перцентили по всем методам"""
+        with self._lock:
+            names = list(self.histograms)
+        return {name: self.get_method(name) for name in names}
+
+    def top(self, count: int = 10, by: str = "p99") -> list:
+        """Методы с наибольшим перцентилем ``by`` (p50/p95/p99/max/avg)"""
+        methods = list(self.get_all().values())
+        methods.sort(key=lambda item: item.get(by, 0), reverse=True)
+        return methods[:count]
+
+    def merged(self) -> dict:
+        """Общая гистограмма по всем методам"""
+        total = LogHistogram()
+        with self._lock:
+            for histogram in self.histograms.values():
+                total.merge(histogram)
+        return total.summary()
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self._missed.clear()
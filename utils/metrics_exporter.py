@@ -0,0 +1,208 @@
+import math
+import time
+import threading
+from typing import Dict, Optional, Sequence, Tuple
+from plugins.xray.utils.analytics import to_timestamp
+from plugins.xray.utils.thread_pool_monitor import _pool_values, _batch_writer_values
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+# Серии по объектам и методам - только для явно перечисленных объектов: постоянный набор
+# серий сохраняет монотонность счётчиков (топ-N менялся бы между опросами)
+MAX_OBJECTS_LIMIT = 500
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value) -> str:
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    value = float(value)
+    # В OpenMetrics бесконечность и NaN записываются как +Inf/-Inf/NaN
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value)
+
+
+class OpenMetricsWriter:
+    """Построение текста в формате OpenMetrics"""
+
+    def __init__(self):
+        self.lines = []
+
+    def family(self, name: str, metric_type: str, help_text: str, unit: Optional[str] = None):
+        self.lines.append(f"# TYPE {name} {metric_type}")
+        if unit:
+            self.lines.append(f"# UNIT {name} {unit}")
+        self.lines.append(f"# HELP {name} {help_text}")
+
+    def sample(self, name: str, value, labels: Optional[Dict[str, str]] = None):
+        if value is None:
+            return
+        if labels:
+            label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+            name = f"{name}{{{label_text}}}"
+        self.lines.append(f"{name} {_format_value(value)}")
+
+    def render(self) -> str:
+        return "\n".join(self.lines + ["# EOF", ""])
+
+
+class MetricsExporter:
+    """Экспорт метрик xray в формате OpenMetrics (Prometheus).
+
+    Метрики строятся из уже собранных снимков фоновых мониторов, сам текст
+    кешируется на ``ttl`` секунд, поэтому частый scrape не пересчитывает статистику.
+    """
+
+    def __init__(self, logger, pool_monitor, thread_pool_monitor, stats_poller, method_latency,
+                 plugins_registry, ttl: int = 5):
+        self.logger = logger
+        self.pool_monitor = pool_monitor
+        self.thread_pool_monitor = thread_pool_monitor
+        self.stats_poller = stats_poller
+        self.method_latency = method_latency
+        self.plugins_registry = plugins_registry
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache: Dict[Tuple[str, ...], Tuple[float, str]] = {}
+
+    def render(self, objects: Sequence[str] = ()) -> str:
+        """Текст метрик (из кеша, если он не старше ttl).
+
+        :param objects: объекты, для которых отдаются отдельные серии (не больше ``MAX_OBJECTS_LIMIT``)
+        """
+        objects = tuple(sorted(set(objects)))[:MAX_OBJECTS_LIMIT]
+        with self._lock:
+            cached = self._cache.get(objects)
+            if cached and time.time() - cached[0] < self.ttl:
+                return cached[1]
+            writer = OpenMetricsWriter()
+            for collect in (self._collect_pool, self._collect_thread_pools,
+                            self._collect_plugins, self._collect_objects):
+                try:
+                    collect(writer, objects)
+                except Exception as e:
+                    self.logger.error(f"Metrics export error in {collect.__name__}: {e}")
+            text = writer.render()
+            self._cache = {objects: (time.time(), text)}
+            return text
+
+    def _collect_pool(self, writer: OpenMetricsWriter, objects: Sequence[str]):
+        stats = self.pool_monitor.get_pool_stats()
+        for field, help_text in (("active_connections", "Connections checked out from the pool"),
+                                 ("idle_connections", "Connections idle in the pool"),
+                                 ("pool_size", "Configured pool size"),
+                                 ("max_overflow", "Configured pool max overflow"),
+                                 ("overflow", "Current pool overflow")):
+            name = f"xray_db_pool_{field}"
+            writer.family(name, "gauge", help_text)
+            writer.sample(name, getattr(stats, field))
+
+    def _collect_thread_pools(self, writer: OpenMetricsWriter, objects: Sequence[str]):
+        stats = self.thread_pool_monitor.last_stats
+        if not stats:
+            return
+        pools = {name: _pool_values(pool) for name, pool in stats.items()
+                 if name != "batch_writer" and pool and pool.get("thread_pool")}
+        families = (
+            ("active_tasks", "gauge", "Tasks running in the thread pool", None),
+            ("max_workers", "gauge", "Thread pool size", None),
+            ("queue_size", "gauge", "Tasks waiting in the thread pool queue", None),
+            ("utilization", "gauge", "Thread pool utilization, percent", None),
+            ("completed_tasks", "counter", "Tasks completed by the thread pool", None),
+            ("failed_tasks", "counter", "Tasks failed in the thread pool", None),
+            ("rejected_tasks", "counter", "Tasks rejected by the thread pool", None),
+        )
+        for field, metric_type, help_text, unit in families:
+            name = f"xray_thread_pool_{field}"
+            writer.family(name, metric_type, help_text, unit)
+            suffix = "_total" if metric_type == "counter" else ""
+            for pool_name, values in pools.items():
+                writer.sample(name + suffix, values[field], {"pool": pool_name})
+        name = "xray_thread_pool_avg_execution_seconds"
+        writer.family(name, "gauge", "Average task execution time", "seconds")
+        for pool_name, values in pools.items():
+            writer.sample(name, values["avg_exec_ms"] / 1000, {"pool": pool_name})
+
+        batch_writer = stats.get("batch_writer")
+        if not batch_writer:
+            return
+        values = _batch_writer_values(batch_writer)
+        for field, metric_type, help_text in (("batch_size", "gauge", "Items waiting in the batch writer"),
+                                              ("total_added", "counter", "Items added to the batch writer"),
+                                              ("total_flushed", "counter", "Items flushed by the batch writer"),
+                                              ("total_errors", "counter", "Batch writer flush errors")):
+            name = "xray_batch_writer_" + field.replace("total_", "")
+            writer.family(name, metric_type, help_text)
+            writer.sample(name + ("_total" if metric_type == "counter" else ""), values[field])
+        name = "xray_batch_writer_avg_flush_seconds"
+        writer.family(name, "gauge", "Average batch flush time", "seconds")
+        writer.sample(name, values["avg_flush_ms"] / 1000)
+
+    def _collect_plugins(self, writer: OpenMetricsWriter, objects: Sequence[str]):
+        cycles = {name: plugin["instance"] for name, plugin in list(self.plugins_registry.items())
+                  if "cycle" in plugin["instance"].actions}
+        writer.family("xray_plugin_cycle_up", "gauge", "Cycle plugin thread is alive")
+        for name, instance in cycles.items():
+            writer.sample("xray_plugin_cycle_up", instance.is_alive(), {"plugin": name})
+        name = "xray_plugin_cycle_last_active_timestamp_seconds"
+        writer.family(name, "gauge", "Last cycle plugin activity", "seconds")
+        for plugin_name, instance in cycles.items():
+            writer.sample(name, to_timestamp(getattr(instance, "dtUpdated", None)), {"plugin": plugin_name})
+
+    def _collect_objects(self, writer: OpenMetricsWriter, objects: Sequence[str]):
+        stats = self.stats_poller.last_stats
+        if stats is None:
+            return
+        totals = {"objects": 0, "properties": 0, "methods": 0}
+        per_object = []
+        for key, obj in stats.items():
+            if not isinstance(obj, dict):
+                continue
+            properties = obj.get("stat_properties") or {}
+            methods = obj.get("stat_methods") or {}
+            totals["objects"] += 1
+            totals["properties"] += len(properties)
+            totals["methods"] += len(methods)
+            reads = sum(p.get("count_read") or 0 for p in properties.values())
+            writes = sum(p.get("count_write") or 0 for p in properties.values())
+            executions = sum(m.get("count_executed") or 0 for m in methods.values())
+            per_object.append((key, reads, writes, executions))
+
+        for field, count in totals.items():
+            name = f"xray_{field}"
+            writer.family(name, "gauge", f"Number of {field} in the object storage")
+            writer.sample(name, count)
+        name = "xray_stats_snapshot_timestamp_seconds"
+        writer.family(name, "gauge", "Time of the object statistics snapshot", "seconds")
+        writer.sample(name, self.stats_poller.last_poll)
+
+        selected = [item for item in per_object if item[0] in objects]
+        for index, (field, help_text) in enumerate((("property_reads", "Property reads"),
+                                                    ("property_writes", "Property writes"),
+                                                    ("method_executions", "Method executions")),
+                                                   start=1):
+            name = f"xray_{field}"
+            writer.family(name, "counter", help_text)
+            writer.sample(f"{name}_total", sum(item[index] for item in per_object))
+            name = f"xray_object_{field}"
+            writer.family(name, "counter", f"{help_text} by object")
+            for item in selected:
+                writer.sample(f"{name}_total", item[index], {"object": item[0]})
+
+        methods = [method for method in self.method_latency.get_all().values()
+                   if method["name"].rpartition(".")[0] in objects]
+        if methods:
+            name = "xray_method_exec_time"
+            writer.family(name, "summary", "Method execution time")
+            for method in methods:
+                for quantile, field in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+                    writer.sample(name, method[field], {"method": method["name"], "quantile": quantile})
+                writer.sample(f"{name}_sum", method["avg"] * method["count"], {"method": method["name"]})
+                writer.sample(f"{name}_count", method["count"], {"method": method["name"]})
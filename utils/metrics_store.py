@@ -0,0 +1,195 @@
+import os
+import json
+import functools
+import time
+import queue
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Tuple
+
+# Хранилище истории рядом с плагином (каталог data/ не попадает в git), отдельно от базы приложения
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "metrics.db")
+# Сырые сэмплы нужны только для буфера и незакрытых корзин - храним сутки.
+# Корзины уровней хранятся столько же, сколько покрывает уровень в памяти
+RAW_RETENTION = 86400
+ROLLUP_RETENTION = {"1m": 86400, "1h": 30 * 86400}
+FLUSH_INTERVAL = 5
+COMPACT_INTERVAL = 3600
+MAX_QUEUE = 10000
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS samples (series TEXT NOT NULL, timestamp REAL NOT NULL, data TEXT NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS samples_series_timestamp ON samples (series, timestamp)",
+    "CREATE TABLE IF NOT EXISTS rollups (series TEXT NOT NULL, resolution TEXT NOT NULL, timestamp REAL NOT NULL, "
+    "data TEXT NOT NULL, PRIMARY KEY (series, resolution, timestamp))",
+)
+
+
+def _dumps(values: dict) -> str:
+    return json.dumps(values, separators=(",", ":"))
+
+
+class MetricsStore:
+    """Хранилище истории метрик на диске (отдельный файл SQLite).
+
+    Данные только добавляются: ``append()`` и ``append_rollup()`` кладут сырой сэмпл
+    или закрытую корзину уровня агрегации в очередь, фоновый поток записывает очередь
+    пачками раз в ``flush_interval`` секунд. Раз в час удаляются сырые сэмплы старше
+    ``raw_retention`` (их уже покрывают корзины) и корзины старше срока хранения уровня.
+    """
+
+    def __init__(self, logger, path: str = DEFAULT_PATH, raw_retention: int = RAW_RETENTION,
+                 rollup_retention: Optional[Dict[str, int]] = None, flush_interval: float = FLUSH_INTERVAL):
+        self.logger = logger
+        self.path = path
+        self.raw_retention = raw_retention
+        self.rollup_retention = dict(rollup_retention or ROLLUP_RETENTION)
+        self.flush_interval = flush_interval
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_flush: Optional[float] = None
+        self.last_compaction: Optional[float] = None
+        self._queue = queue.Queue(MAX_QUEUE)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _put(self, item: tuple):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def append(self, series: str, timestamp: float, values: dict):
+        """Добавить сырой сэмпл в очередь записи. Не блокирует: при переполнении очереди сэмпл теряется"""
+        self._put((series, None, timestamp, values))
+
+    def append_rollup(self, series: str, resolution: str, timestamp: float, row: dict):
+        """Добавить закрытую корзину уровня агрегации (подходит как ``on_bucket`` для ``MetricSeries``)"""
+        self._put((series, resolution, timestamp, row))
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        return conn
+
+    def flush(self, conn: sqlite3.Connection) -> int:
+        """Записать накопленные данные одной транзакцией"""
+        samples = []
+        rollups = []
+        while True:
+            try:
+                series, resolution, timestamp, values = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if resolution is None:
+                samples.append((series, timestamp, _dumps(values)))
+            else:
+                rollups.append((series, resolution, timestamp, _dumps(values)))
+        if samples or rollups:
+            with conn:
+                conn.executemany("INSERT INTO samples (series, timestamp, data) VALUES (?, ?, ?)", samples)
+                conn.executemany("INSERT OR REPLACE INTO rollups (series, resolution, timestamp, data) "
+                                 "VALUES (?, ?, ?, ?)", rollups)
+            self.written += len(samples) + len(rollups)
+        self.last_flush = time.time()
+        return len(samples) + len(rollups)
+
+    def compact(self, conn: sqlite3.Connection, now: Optional[float] = None):
+        """Удалить данные за пределами сроков хранения"""
+        now = now or time.time()
+        with conn:
+            conn.execute("DELETE FROM samples WHERE timestamp < ?", (now - self.raw_retention,))
+            for resolution, retention in self.rollup_retention.items():
+                conn.execute("DELETE FROM rollups WHERE resolution = ? AND timestamp < ?",
+                             (resolution, now - retention))
+        self.last_compaction = now
+
+    def _read(self, query: str, params: tuple) -> list:
+        if not os.path.exists(self.path):
+            return []
+        conn = self._connect()
+        try:
+            return conn.execute(query, params).fetchall()
+        finally:
+            conn.close()
+
+    def load_rollups(self, series: str) -> Dict[str, List[dict]]:
+        """Сохранённые корзины ряда по уровням, от старых к новым"""
+        result: Dict[str, List[dict]] = {}
+        for resolution, timestamp, data in self._read(
+                "SELECT resolution, timestamp, data FROM rollups WHERE series = ? ORDER BY timestamp", (series,)):
+            result.setdefault(resolution, []).append(dict(json.loads(data), timestamp=timestamp))
+        return result
+
+    def load_samples(self, series: str, count: Optional[int] = None,
+                     since: Optional[float] = None) -> List[Tuple[float, dict]]:
+        """Последние ``count`` сырых сэмплов ряда или все сэмплы начиная с ``since``, от старых к новым"""
+        if count is not None:
+            rows = self._read("SELECT timestamp, data FROM samples WHERE series = ? "
+                              "ORDER BY timestamp DESC LIMIT ?", (series, count))[::-1]
+        else:
+            rows = self._read("SELECT timestamp, data FROM samples WHERE series = ? AND timestamp >= ? "
+                              "ORDER BY timestamp", (series, since or 0))
+        return [(timestamp, json.loads(data)) for timestamp, data in rows]
+
+    def restore(self, series_name: str, series) -> int:
+        """Восстановить ``MetricSeries`` из сохранённых данных, возвращает число загруженных сэмплов"""
+        return series.restore(self.load_rollups(series_name), functools.partial(self.load_samples, series_name))
+
+    def series(self, prefix: str = "") -> List[str]:
+        """Имена сохранённых рядов"""
+        rows = self._read("SELECT DISTINCT series FROM samples WHERE series LIKE ? UNION "
+                          "SELECT DISTINCT series FROM rollups WHERE series LIKE ?", (prefix + "%", prefix + "%"))
+        return sorted(row[0] for row in rows)
+
+    def start(self):
+        """Запуск фоновой записи"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def write_loop():
+            conn = self._connect()
+            try:
+                while not self._stop_event.wait(self.flush_interval):
+                    try:
+                        self.flush(conn)
+                        if self.last_compaction is None or time.time() - self.last_compaction >= COMPACT_INTERVAL:
+                            self.compact(conn)
+                    except Exception as e:
+                        self.errors += 1
+                        self.logger.error(f"Metrics store error: {e}")
+                self.flush(conn)
+            finally:
+                conn.close()
+
+        self._thread = threading.Thread(target=write_loop, name="xray_metrics_store", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        """Остановка с записью оставшихся данных"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def status(self) -> dict:
+        counts = {table: (self._read(f"SELECT COUNT(*) FROM {table}", ()) or [(0,)])[0][0]
+                  for table in ("samples", "rollups")}
+        return {
+            "path": self.path,
+            "size": os.path.getsize(self.path) if os.path.exists(self.path) else 0,
+            "running": bool(self._thread and self._thread.is_alive()),
+            "raw_retention": self.raw_retention,
+            "rollup_retention": self.rollup_retention,
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "last_flush": self.last_flush,
+            "last_compaction": self.last_compaction,
+            **counts,
+        }
@@ -0,0 +1,84 @@
+from typing import Optional
+from sqlalchemy import func, case
+from app.database import row2dict, session_scope
+from app.core.models.Plugins import Notify
+from app.core.lib.constants import CategoryNotify
+
+
+def notify_color(category) -> str:
+    if category == CategoryNotify.Debug:
+        return "secondary"
+    if category == CategoryNotify.Warning:
+        return "warning"
+    if category == CategoryNotify.Info:
+        return "success"
+    return "danger"
+
+
+def _decode_cursor(cursor: str) -> int:
+    # Принимается и старый формат курсора <created>_<id>
+    return int(cursor.rpartition("_")[2])
+
+
+def get_notifications_page(limit: int = 100, cursor: Optional[str] = None,
+                           category: Optional[str] = None, source: Optional[str] = None,
+                           read: Optional[bool] = None) -> dict:
+    """Страница уведомлений от новых к старым (keyset по первичному ключу: id растёт вместе с created).
+
+    :param cursor: курсор из предыдущей страницы (``id`` последней записи)
+    :raises ValueError: некорректный курсор
+    """
+    with session_scope() as session:
+        query = session.query(Notify)
+        if category:
+            query = query.filter(Notify.category == category)
+        if source:
+            query = query.filter(Notify.source == source)
+        if read is not None:
+            query = query.filter(Notify.read == read)
+        if cursor:
+            query = query.filter(Notify.id < _decode_cursor(cursor))
+        # Запрашиваем на одну запись больше, чтобы понять, есть ли следующая страница
+        records = query.order_by(Notify.id.desc()).limit(limit + 1).all()
+
+        items = []
+        for rec in records[:limit]:
+            item = row2dict(rec)
+            item['color'] = notify_color(rec.category)
+            items.append(item)
+        has_more = len(records) > limit
+        return {
+            "items": items,
+            "cursor": str(records[limit - 1].id) if has_more else None,
+            "has_more": has_more,
+        }
+
+
+def get_notification_counts() -> dict:
+    """Количество уведомлений (всего и непрочитанных) по категориям и источникам одним GROUP BY"""
+    with session_scope() as session:
+        rows = session.query(
+            Notify.category,
+            Notify.source,
+            func.count(Notify.id),
+            func.sum(case((Notify.read == False, 1), else_=0)),  # noqa: E712
+        ).group_by(Notify.category, Notify.source).all()
+
+    categories = {}
+    sources = {}
+    total = 0
+    unread = 0
+    for category, source, count, count_unread in rows:
+        count_unread = int(count_unread or 0)
+        total += count
+        unread += count_unread
+        for groups, name in ((categories, str(getattr(category, "value", category))), (sources, source or "")):
+            group = groups.setdefault(name, {"total": 0, "unread": 0})
+            group["total"] += count
+            group["unread"] += count_unread
+    return {
+        "total": total,
+        "unread": unread,
+        "categories": categories,
+        "sources": sources,
+    }
@@ -0,0 +1,89 @@
+import os
+import sys
+import threading
+from importlib import metadata
+from typing import List, Optional, Tuple
+
+
+def _normalize(name: str) -> str:
+    return name.lower().replace("_", "-").replace(".", "-")
+
+
+def _site_signature() -> Tuple:
+    """Время изменения каталогов sys.path: установка и удаление пакетов меняют mtime каталога"""
+    signature = []
+    for path in sys.path:
+        try:
+            if os.path.isdir(path):
+                signature.append((path, os.stat(path).st_mtime_ns))
+        except OSError:
+            continue
+    return tuple(signature)
+
+
+class PackageInventory:
+    """Список установленных пакетов через ``importlib.metadata``.
+
+    Список кешируется и пересобирается только при изменении каталогов site-packages.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple] = None
+        self._packages: List[dict] = []
+
+    def get(self) -> List[dict]:
+        """Пакеты ``{name, version, top_level}``, отсортированные по имени"""
+        signature = _site_signature()
+        with self._lock:
+            if signature != self._signature:
+                self._packages = self._collect()
+                self._signature = signature
+            return self._packages
+
+    def invalidate(self):
+        with self._lock:
+            self._signature = None
+
+    @staticmethod
+    def _collect() -> List[dict]:
+        try:
+            top_levels = {}
+            for module, dists in metadata.packages_distributions().items():
+                for dist in dists:
+                    top_levels.setdefault(_normalize(dist), set()).add(module)
+        except AttributeError:
+            # packages_distributions() появился в Python 3.10
+            top_levels = {}
+        packages = {}
+        for dist in metadata.distributions():
+            name = dist.metadata["Name"]
+            if not name:
+                continue
+            key = _normalize(name)
+            # Первое вхождение в sys.path - то, что реально импортируется
+            if key in packages:
+                continue
+            packages[key] = {
+                "name": name,
+                "version": dist.version,
+                "top_level": sorted(top_levels.get(key, ())),
+            }
+        return sorted(packages.values(), key=lambda item: item["name"].lower())
+
+    def version(self, name: str) -> Optional[str]:
+        key = _normalize(name)
+        for package in self.get():
+            if _normalize(package["name"]) == key:
+                return package["version"]
+        return None
+
+    def with_import_times(self, import_times: dict) -> List[dict]:
+        """Пакеты с временем импорта их модулей верхнего уровня (секунды, None - не импортировался)"""
+        result = []
+        for package in self.get():
+            times = [import_times[module] for module in package["top_level"] if module in import_times]
+            item = dict(package)
+            item["import_time"] = round(sum(t["time"] for t in times), 6) if times else None
+            result.append(item)
+        return result
@@ -0,0 +1,131 @@
+import math
+import time
+from typing import List, Optional
+from plugins.xray.utils.rollup import percentile
+
+# Окно оценки (секунды) и пороги сигналов
+HEALTH_WINDOW = 300
+SATURATION_PERCENT = 90
+SUSTAINED_CRITICAL = 0.5
+SUSTAINED_WARNING = 0.2
+WAIT_CRITICAL = 1.0
+WAIT_WARNING = 0.1
+TREND_MINUTES = 15
+# Запас при расчёте рекомендуемого размера пула
+HEADROOM = 1.25
+
+
+def _slope_per_minute(rows: List[dict], field: str) -> float:
+    """Наклон линейной регрессии значения по времени (единиц в минуту)"""
+    if len(rows) < 3:
+        return 0.0
+    xs = [row["timestamp"] for row in rows]
+    ys = [row[field] for row in rows]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    denominator = sum((x - mean_x) ** 2 for x in xs)
+    if not denominator:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / denominator * 60
+
+
+def evaluate_pool_health(rows: List[dict], pool_size: int, max_overflow: int,
+                         wait: Optional[dict] = None, peak: Optional[int] = None,
+                         window: int = HEALTH_WINDOW) -> dict:
+    """Оценка здоровья пула по окну истории.
+
+    :param rows: сэмплы истории пула за окно (от старых к новым)
+    :param wait: статистика ожидания выдачи соединения за окно (``count``, ``p95``, ``max``)
+    :param peak: пиковое число занятых соединений за длительный период (для рекомендаций)
+    """
+    score = 100
+    warnings = []
+    reasons = []
+    recommendations = []
+
+    def penalty(points: int, warning: str, reason: str):
+        nonlocal score
+        score -= points
+        warnings.append(warning)
+        reasons.append({"signal": warning, "penalty": points, "detail": reason})
+
+    signals = {"samples": len(rows)}
+    if rows and pool_size > 0:
+        active = [row["active_connections"] for row in rows]
+        usage = [row["pool_usage_percent"] for row in rows]
+        saturated = sum(1 for value in usage if value >= SATURATION_PERCENT) / len(usage)
+        overflow_usage = [row["overflow_usage_percent"] for row in rows]
+        slope = _slope_per_minute(rows, "active_connections")
+        current = active[-1]
+        signals.update({
+            "saturated_share": round(saturated, 3),
+            "active_p95": percentile(active, 95),
+            "active_max": max(active),
+            "overflow_max_percent": max(overflow_usage),
+            "trend_per_minute": round(slope, 3),
+        })
+
+        # Длительное насыщение важнее мгновенного значения
+        if saturated >= SUSTAINED_CRITICAL:
+            penalty(40, "Sustained pool saturation",
+                    f"{saturated:.0%} of samples at >= {SATURATION_PERCENT}% usage over {window // 60} min")
+        elif saturated >= SUSTAINED_WARNING:
+            penalty(20, "Frequent pool saturation",
+                    f"{saturated:.0%} of samples at >= {SATURATION_PERCENT}% usage over {window // 60} min")
+        elif usage[-1] >= SATURATION_PERCENT:
+            penalty(10, "Critical pool usage", f"current usage {usage[-1]}%")
+
+        if max_overflow > 0 and max(overflow_usage) >= 100:
+            penalty(30, "Overflow exhausted", "all overflow connections were in use, new checkouts had to wait")
+        elif any(row["overflow"] > 0 for row in rows):
+            penalty(10, "Overflow in use", f"up to {max(row['overflow'] for row in rows)} overflow connections")
+
+        capacity = pool_size + max_overflow
+        if slope > 0 and current < capacity and current + slope * TREND_MINUTES >= capacity:
+            penalty(10, "Growing pool usage",
+                    f"+{slope:.2f} connections/min, capacity reached in ~{(capacity - current) / slope:.0f} min")
+
+    if wait and wait.get("count"):
+        signals["wait_p95"] = wait["p95"]
+        signals["wait_max"] = wait["max"]
+        if wait["p95"] >= WAIT_CRITICAL:
+            penalty(30, "Long checkout wait", f"p95 wait {wait['p95']:.2f}s")
+        elif wait["p95"] >= WAIT_WARNING:
+            penalty(15, "Checkout wait", f"p95 wait {wait['p95'] * 1000:.0f}ms")
+
+    # Рекомендации по размеру: постоянная нагрузка - в pool_size, всплески - в overflow
+    suggested = None
+    if rows and pool_size > 0:
+        typical = signals["active_p95"]
+        observed_peak = max(peak or 0, signals["active_max"])
+        suggested_size = max(math.ceil(typical * HEADROOM), 1)
+        suggested_overflow = max(math.ceil(observed_peak * HEADROOM) - suggested_size, 0)
+        suggested = {"pool_size": suggested_size, "max_overflow": suggested_overflow,
+                     "peak_concurrency": observed_peak}
+        if suggested_size > pool_size:
+            recommendations.append(f"Increase pool_size from {pool_size} to {suggested_size} "
+                                   f"(p95 concurrency {typical})")
+        # Всплески, которые не покрывает pool_size (текущий или рекомендуемый), уходят в overflow
+        needed_overflow = math.ceil(observed_peak * HEADROOM) - max(pool_size, suggested_size)
+        if needed_overflow > max_overflow:
+            recommendations.append(f"Increase max_overflow from {max_overflow} to {needed_overflow} "
+                                   f"(peak concurrency {observed_peak})")
+        if wait and wait.get("count") and wait["p95"] >= WAIT_WARNING and not recommendations:
+            recommendations.append("Checkouts wait while the pool is not full: look for long-held connections "
+                                   "in /database/pool/callers")
+        if peak is not None and observed_peak * HEADROOM < pool_size / 2 and score == 100:
+            recommendations.append(f"Pool is oversized: peak concurrency {observed_peak}, "
+                                   f"pool_size {suggested_size} would be enough")
+
+    score = max(score, 0)
+    return {
+        "health_score": score,
+        'status': 'healthy' if score > 80 else 'warning' if score > 50 else 'critical',
+        "warnings": warnings,
+        "reasons": reasons,
+        "recommendations": recommendations,
+        "suggested": suggested,
+        "signals": signals,
+        "window": window,
+        "evaluated": time.time(),
+    }
@@ -1,7 +1,12 @@
 import time
+import functools
 import threading
+from collections import deque
 from dataclasses import dataclass
-from typing import List
+from typing import Callable, List, Optional
+from sqlalchemy import event
+from plugins.xray.utils.pool_health import HEALTH_WINDOW, evaluate_pool_health
+from plugins.xray.utils.rollup import MetricSeries
 
 
 @dataclass
@@ -17,14 +22,63 @@ class PoolStats:
     overflow_usage_percent: float
 
 
+# Колонки кольцевого буфера истории: имя поля PoolStats -> typecode array
+_HISTORY_COLUMNS = {
+    "active_connections": "i",
+    "idle_connections": "i",
+    "total_connections": "i",
+    "pool_size": "i",
+    "max_overflow": "i",
+    "overflow": "i",
+    "pool_usage_percent": "f",
+    "overflow_usage_percent": "f",
+}
+
+# Метрики, для которых строятся агрегаты min/max/avg/p95
+_ROLLUP_METRICS = ("active_connections", "idle_connections", "overflow")
+
+# Адаптивный интервал: выше BUSY_USAGE % или при overflow - опрос с минимальным интервалом,
+# ниже IDLE_USAGE % - интервал удваивается до максимального
+BUSY_USAGE = 70
+IDLE_USAGE = 20
+# Период, за который пик занятых соединений учитывается в рекомендациях
+PEAK_WINDOW = 86400
+# Минимальный промежуток между сэмплами по событиям checkout/checkin (секунды)
+EVENT_MIN_INTERVAL = 0.25
+
+
 class DatabasePoolMonitor:
-    def __init__(self, engine, logger):
+    def __init__(self, engine, logger, event_bus=None, store=None):
         self.engine = engine
         self.logger = logger
-        self.stats_history: List[PoolStats] = []
+        self.event_bus = event_bus
+        # Хранилище истории на диске (MetricsStore)
+        self.store = store
         self.max_history = 1000
-        self._lock = threading.Lock()
-        self._monitoring = False
+        # Сырые сэмплы и уровни агрегации 1m (сутки) и 1h (30 дней)
+        self.series = MetricSeries(_HISTORY_COLUMNS, _ROLLUP_METRICS, ("pool_size",), self.max_history,
+                                   on_bucket=functools.partial(store.append_rollup, "pool") if store else None)
+        self.interval = 60
+        self.min_interval = self.interval
+        self.max_interval = self.interval
+        self.current_interval = self.interval
+        self.adaptive = True
+        self.event_driven = True
+        self.event_min_interval = EVENT_MIN_INTERVAL
+        self.event_samples = 0
+        self._last_sample = 0.0
+        # Оценка здоровья пересчитывается при каждом сэмпле
+        self.health: Optional[dict] = None
+        self.health_window = HEALTH_WINDOW
+        # Монотонная очередь (время, занято) для максимума за PEAK_WINDOW: значения убывают от начала
+        self._peaks = deque()
+        # Источник статистики ожидания выдачи соединения (PoolTracer.wait_stats)
+        self.wait_source: Optional[Callable[[float], dict]] = None
+        self._stop_event = threading.Event()
+        # Внеочередной сэмпл по событию пула
+        self._wake = threading.Event()
+        self._thread = None
+        self._listening = False
 
     def get_pool_stats(self) -> PoolStats:
         """Получить текущую статистику пула соединений"""
@@ -49,14 +103,17 @@ class DatabasePoolMonitor:
             overflow_usage_percent=round((overflow / max(getattr(pool, '_max_overflow', 1), 1)) * 100, 2),
         )
 
-    def log_pool_stats(self):
-        """Логирование статистики пула"""
+    def log_pool_stats(self) -> PoolStats:
+        """Снять сэмпл: история, агрегаты, оценка здоровья и логирование"""
         stats = self.get_pool_stats()
+        self._last_sample = time.monotonic()
 
-        with self._lock:
-            self.stats_history.append(stats)
-            if len(self.stats_history) > self.max_history:
-                self.stats_history.pop(0)
+        self.series.add(stats.timestamp, **{name: getattr(stats, name) for name in _HISTORY_COLUMNS})
+        self._track_peak(stats.timestamp, stats.active_connections)
+        if self.store:
+            self.store.append("pool", stats.timestamp, {name: getattr(stats, name) for name in _HISTORY_COLUMNS})
+        if self.event_bus:
+            self.event_bus.publish("pool", stats.__dict__)
 
         self.logger.debug(
             f"Pool stats: active={stats.active_connections}, "
@@ -65,47 +122,180 @@ class DatabasePoolMonitor:
             f"overflow={stats.overflow}"
         )
 
+        self.health = self.evaluate_health(stats)
+
         # Предупреждения о высокой нагрузке
-        usage_percent = (stats.active_connections / stats.pool_size) * 100
-        if usage_percent > 80:
-            self.logger.warning(
-                f"High pool usage: {stats.active_connections}/{stats.pool_size} "
-                f"({usage_percent:.1f}%)"
-            )
-        elif usage_percent > 90:
-            self.logger.error(
-                f"Critical pool usage: {stats.active_connections}/{stats.pool_size} "
-                f"({usage_percent:.1f}%)"
-            )
+        if stats.pool_size > 0:
+            usage_percent = (stats.active_connections / stats.pool_size) * 100
+            if usage_percent > 90:
+                self.logger.error(
+                    f"Critical pool usage: {stats.active_connections}/{stats.pool_size} "
+                    f"({usage_percent:.1f}%)"
+                )
+            elif usage_percent > 80:
+                self.logger.warning(
+                    f"High pool usage: {stats.active_connections}/{stats.pool_size} "
+                    f"({usage_percent:.1f}%)"
+                )
+        return stats
+
+    def _track_peak(self, timestamp: float, active: float):
+        while self._peaks and self._peaks[-1][1] <= active:
+            self._peaks.pop()
+        self._peaks.append((timestamp, active))
+        while self._peaks[0][0] < timestamp - PEAK_WINDOW:
+            self._peaks.popleft()
+
+    def evaluate_health(self, stats: PoolStats) -> dict:
+        """Оценка здоровья пула по окну истории, ожиданию выдачи и пику за сутки"""
+        # Окно должно содержать несколько сэмплов даже при редком опросе
+        window = max(self.health_window, self.interval * 5)
+        rows = self.series.raw.since(stats.timestamp - window)
+        wait = None
+        if self.wait_source:
+            try:
+                wait = self.wait_source(window)
+            except Exception as e:
+                self.logger.error(f"Pool wait stats error: {e}")
+        peak = self._peaks[0][1] if self._peaks else None
+        return evaluate_pool_health(rows, stats.pool_size, stats.max_overflow, wait=wait, peak=peak, window=window)
+
+    def get_health(self) -> Optional[dict]:
+        """Последняя оценка здоровья пула (до первого сэмпла - по текущему состоянию)"""
+        if self.health is None:
+            return self.evaluate_health(self.get_pool_stats())
+        return self.health
 
     def get_stats_history(self, minutes: int = 60) -> List[PoolStats]:
         """Получить историю статистики за последние N минут"""
         cutoff_time = time.time() - (minutes * 60)
+        return [self._row_to_stats(row) for row in self.series.raw.since(cutoff_time)]
+
+    def get_history(self, minutes: int = 60, resolution: str = "auto", max_points: int = 500):
+        """Получить историю за N минут в нужном разрешении.
+
+        :param resolution: ``raw``, имя уровня агрегации (``1m``, ``1h``) или ``auto`` -
+            самое подробное разрешение, которое покрывает период и даёт не более ``max_points`` точек
+        :return: (разрешение, список точек)
+        """
+        resolution, points = self.series.history(minutes, resolution, self.interval, max_points)
+        for point in points:
+            if resolution == "raw":
+                point["usage_percent"] = round(point["pool_usage_percent"], 1)
+            else:
+                point["total_connections"] = point["pool_size"]
+                point["usage_percent"] = round(point["active_connections"] / point["pool_size"] * 100, 1) \
+                    if point["pool_size"] else 0
+        return resolution, points
 
-        with self._lock:
-            return [s for s in self.stats_history if s.timestamp > cutoff_time]
+    @staticmethod
+    def _row_to_stats(row: dict) -> PoolStats:
+        return PoolStats(
+            active_connections=row["active_connections"],
+            idle_connections=row["idle_connections"],
+            total_connections=row["total_connections"],
+            pool_size=row["pool_size"],
+            max_overflow=row["max_overflow"],
+            overflow=row["overflow"],
+            timestamp=row["timestamp"],
+            pool_usage_percent=round(row["pool_usage_percent"], 2),
+            overflow_usage_percent=round(row["overflow_usage_percent"], 2),
+        )
+
+    def restore(self):
+        """Загрузить историю, сохранённую до перезапуска"""
+        restored = self.store.restore("pool", self.series)
+        for row in self.series.rollups[0].since(time.time() - PEAK_WINDOW):
+            self._track_peak(row["timestamp"], int(row["active_connections_max"]))
+        self.logger.info(f"Pool history restored: {restored} samples")
+
+    def next_interval(self, stats: PoolStats) -> float:
+        """Интервал до следующего сэмпла: короче под нагрузкой, длиннее в простое"""
+        if not self.adaptive:
+            return self.interval
+        if stats.pool_usage_percent >= BUSY_USAGE or stats.overflow > 0:
+            return self.min_interval
+        if stats.pool_usage_percent < IDLE_USAGE:
+            return min(max(self.current_interval, self.interval) * 2, self.max_interval)
+        return self.interval
+
+    def _on_pool_event(self, *args):
+        # Только будим поток мониторинга: сэмпл не должен замедлять выдачу соединения
+        if not self._wake.is_set() and time.monotonic() - self._last_sample >= self.event_min_interval:
+            self._wake.set()
 
-    def start_monitoring(self, interval: int = 60):
-        """Запуск периодического мониторинга"""
-        if self._monitoring:
+    def set_event_driven(self, enabled: bool):
+        """Включить/выключить сэмплы по событиям checkout/checkin"""
+        if enabled and not self._listening:
+            event.listen(self.engine, "checkout", self._on_pool_event)
+            event.listen(self.engine, "checkin", self._on_pool_event)
+        elif not enabled and self._listening:
+            event.remove(self.engine, "checkout", self._on_pool_event)
+            event.remove(self.engine, "checkin", self._on_pool_event)
+        self._listening = enabled
+        self.event_driven = enabled
+
+    def start_monitoring(self, interval: int = 60, min_interval: Optional[float] = None,
+                         max_interval: Optional[float] = None, adaptive: bool = True, event_driven: bool = True):
+        """Запуск периодического мониторинга.
+
+        :param interval: обычный интервал опроса
+        :param min_interval: интервал под нагрузкой (по умолчанию ``interval / 5``)
+        :param max_interval: интервал в простое (по умолчанию ``interval * 6``)
+        :param adaptive: менять интервал в зависимости от загрузки пула
+        :param event_driven: дополнительно снимать сэмплы по checkout/checkin, не чаще ``event_min_interval``
+        """
+        if self._thread and self._thread.is_alive():
             return
 
-        self._monitoring = True
+        self.interval = interval
+        self.min_interval = min_interval or interval / 5
+        self.max_interval = max_interval or interval * 6
+        self.current_interval = interval
+        self.adaptive = adaptive
+        self._stop_event.clear()
+        self._wake.clear()
+        self.set_event_driven(event_driven)
 
         def monitor_loop():
-            while self._monitoring:
+            if self.store:
                 try:
-                    self.log_pool_stats()
-                    time.sleep(interval)
+                    self.restore()
+                except Exception as e:
+                    self.logger.error(f"Pool history restore error: {e}")
+            while not self._stop_event.is_set():
+                try:
+                    stats = self.log_pool_stats()
+                    self.current_interval = self.next_interval(stats)
                 except Exception as e:
                     self.logger.error(f"Pool monitoring error: {e}")
-                    time.sleep(interval)
+                if self._wake.wait(self.current_interval) and not self._stop_event.is_set():
+                    self.event_samples += 1
+                self._wake.clear()
 
-        monitor_thread = threading.Thread(target=monitor_loop, daemon=True)
-        monitor_thread.start()
-        self.logger.info(f"Pool monitoring started with {interval}s interval")
+        self._thread = threading.Thread(target=monitor_loop, name="xray_pool_monitor", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Pool monitoring started with {interval}s interval "
+                         f"(adaptive {self.min_interval:g}-{self.max_interval:g}s, event-driven: {event_driven})")
 
     def stop_monitoring(self):
         """Остановка мониторинга"""
-        self._monitoring = False
+        self.set_event_driven(False)
+        self._stop_event.set()
+        self._wake.set()
         self.logger.info("Pool monitoring stopped")
+
+    def get_sampling(self) -> dict:
+        """Текущие параметры опроса"""
+        return {
+            "running": bool(self._thread and self._thread.is_alive()),
+            "interval": self.interval,
+            "current_interval": self.current_interval,
+            "min_interval": self.min_interval,
+            "max_interval": self.max_interval,
+            "adaptive": self.adaptive,
+            "event_driven": self.event_driven,
+            "event_min_interval": self.event_min_interval,
+            "event_samples": self.event_samples,
+            "last_sample": time.time() - (time.monotonic() - self._last_sample) if self._last_sample else None,
+        }
@@ -0,0 +1,261 @@
+import os
+import sys
+import time
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from plugins.xray.utils.latency import LogHistogram
+from plugins.xray.utils.rollup import percentile
+
+DEFAULT_LEAK_THRESHOLD = 60
+# Ограничение числа вызывающих: остальные учитываются как OTHER_CALLER
+MAX_CALLERS = 500
+OTHER_CALLER = "other"
+STACK_DEPTH = 10
+# Сколько последних ожиданий соединения хранится для оценки здоровья пула
+RECENT_WAITS = 5000
+# Кадры этих модулей пропускаются при поиске вызывающего кода
+_SKIP_MODULES = ("sqlalchemy", "contextlib", "threading", "concurrent", "flask_sqlalchemy",
+                 "plugins.xray.utils.pool_tracer", "app.database")
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or os.path.basename(code.co_filename)
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+def find_caller(frame) -> Tuple[str, Optional[str], List[str]]:
+    """Вызывающий код для выдачи соединения: (метка, плагин, короткий стек)"""
+    caller = None
+    plugin = None
+    stack = []
+    while frame is not None and len(stack) < STACK_DEPTH:
+        module = frame.f_globals.get("__name__") or ""
+        if not module.startswith(_SKIP_MODULES):
+            label = _frame_label(frame)
+            stack.append(label)
+            if caller is None:
+                caller = label.rpartition(":")[0]
+            if plugin is None and module.startswith("plugins."):
+                plugin = module.split(".")[1]
+        frame = frame.f_back
+    return caller or "unknown", plugin, stack
+
+
+class _CallerStats:
+    __slots__ = ("plugin", "checkouts", "hold", "wait", "long_holds")
+
+    def __init__(self, plugin: Optional[str]):
+        self.plugin = plugin
+        self.checkouts = 0
+        self.hold = LogHistogram()
+        self.wait = LogHistogram()
+        self.long_holds = 0
+
+
+class PoolTracer:
+    """Трассировка выдачи соединений пула SQLAlchemy.
+
+    Слушатели ``checkout``/``checkin``/``connect`` записывают, какой код взял соединение,
+    сколько ждал его и сколько держал. Время удержания агрегируется в гистограммы
+    по вызывающим, соединения, удерживаемые дольше ``leak_threshold`` секунд,
+    считаются возможной утечкой.
+    """
+
+    def __init__(self, engine, logger, leak_threshold: float = DEFAULT_LEAK_THRESHOLD):
+        self.engine = engine
+        self.logger = logger
+        self.leak_threshold = leak_threshold
+        self.connects = 0
+        self.callers: Dict[str, _CallerStats] = {}
+        self._active: Dict[int, dict] = {}
+        # Последние ожидания выдачи: (время, секунды)
+        self._recent_waits = deque(maxlen=RECENT_WAITS)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._attached = False
+        # Пул, у которого замеряется ожидание (после engine.dispose() пул пересоздаётся)
+        self._patched_pool = None
+        self.timeouts = 0
+
+    @property
+    def attached(self) -> bool:
+        return self._attached
+
+    def attach(self):
+        """Подключить слушатели событий пула"""
+        if self._attached:
+            return
+        event.listen(self.engine, "connect", self._on_connect)
+        event.listen(self.engine, "checkout", self._on_checkout)
+        event.listen(self.engine, "checkin", self._on_checkin)
+        self._patch_pool()
+        self._attached = True
+        self.logger.info("Pool checkout tracing attached")
+
+    def detach(self):
+        """Отключить слушатели событий пула"""
+        if not self._attached:
+            return
+        event.remove(self.engine, "connect", self._on_connect)
+        event.remove(self.engine, "checkout", self._on_checkout)
+        event.remove(self.engine, "checkin", self._on_checkin)
+        self._unpatch_pool()
+        with self._lock:
+            self._active.clear()
+        self._attached = False
+        self.logger.info("Pool checkout tracing detached")
+
+    def _patch_pool(self):
+        """Замерять ожидание выдачи в текущем пуле движка: событие для него не предусмотрено,
+        поэтому оборачивается получение соединения из очереди пула"""
+        pool = self.engine.pool
+        if pool is self._patched_pool or not hasattr(pool, "_do_get"):
+            return
+        self._unpatch_pool()
+        original = pool._do_get
+        tracer = self
+
+        def timed_do_get():
+            start = time.perf_counter()
+            try:
+                connection = original()
+            except Exception:
+                # Таймаут пула: ожидание не должно достаться следующей выдаче этого потока
+                tracer._local.wait = None
+                tracer.timeouts += 1
+                raise
+            tracer._local.wait = time.perf_counter() - start
+            return connection
+
+        pool._do_get = timed_do_get
+        self._patched_pool = pool
+
+    def _unpatch_pool(self):
+        pool = self._patched_pool
+        if pool is not None and "_do_get" in vars(pool):
+            del pool._do_get
+        self._patched_pool = None
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        if self.engine.pool is not self._patched_pool:
+            self._patch_pool()
+        caller, plugin, stack = find_caller(sys._getframe(1))
+        wait = getattr(self._local, "wait", None)
+        self._local.wait = None
+        with self._lock:
+            if wait is not None:
+                self._recent_waits.append((time.time(), wait))
+            self._active[id(connection_record)] = {
+                "caller": caller,
+                "plugin": plugin,
+                "stack": stack,
+                "thread": threading.current_thread().name,
+                "checkout": time.time(),
+                "start": time.perf_counter(),
+                "wait": wait,
+            }
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        now = time.perf_counter()
+        with self._lock:
+            info = self._active.pop(id(connection_record), None)
+            if info is None:
+                return
+            stats = self._caller_stats(info["caller"], info["plugin"])
+            hold = now - info["start"]
+            stats.checkouts += 1
+            stats.hold.record(hold)
+            if info["wait"] is not None:
+                stats.wait.record(info["wait"])
+            if hold > self.leak_threshold:
+                stats.long_holds += 1
+
+    def _caller_stats(self, caller: str, plugin: Optional[str]) -> _CallerStats:
+        stats = self.callers.get(caller)
+        if stats is None:
+            if len(self.callers) >= MAX_CALLERS:
+                caller, plugin = OTHER_CALLER, None
+                stats = self.callers.get(caller)
+            if stats is None:
+                stats = self.callers[caller] = _CallerStats(plugin)
+        return stats
+
+    def get_callers(self, top: int = 50, sort: str = "total") -> List[dict]:
+        """Статистика по вызывающим: количество выдач, время ожидания и удержания.
+
+        :param sort: total (суммарное удержание), p99, max, count, wait
+        """
+        with self._lock:
+            rows = []
+            for caller, stats in self.callers.items():
+                hold = stats.hold.summary()
+                wait = stats.wait.summary()
+                rows.append({
+                    "caller": caller,
+                    "plugin": stats.plugin,
+                    "checkouts": stats.checkouts,
+                    "long_holds": stats.long_holds,
+                    "hold_total": round(stats.hold.total, 6),
+                    "hold": {key: round(value, 6) for key, value in hold.items() if key != "count"},
+                    "wait": {key: round(value, 6) for key, value in wait.items() if key != "count"},
+                })
+        sort_keys = {
+            "total": lambda row: row["hold_total"],
+            "p99": lambda row: row["hold"]["p99"],
+            "max": lambda row: row["hold"]["max"],
+            "count": lambda row: row["checkouts"],
+            "wait": lambda row: row["wait"]["p99"],
+        }
+        if sort not in sort_keys:
+            raise ValueError(f"Unknown sort: {sort}")
+        rows.sort(key=sort_keys[sort], reverse=True)
+        return rows[:top]
+
+    def wait_stats(self, seconds: float) -> dict:
+        """Ожидание выдачи соединения за последние ``seconds`` секунд"""
+        cutoff = time.time() - seconds
+        with self._lock:
+            waits = [wait for timestamp, wait in self._recent_waits if timestamp >= cutoff]
+        return {
+            "count": len(waits),
+            "p95": round(percentile(waits, 95), 6),
+            "max": round(max(waits), 6) if waits else 0,
+        }
+
+    def get_checkouts(self, leaks_only: bool = False) -> List[dict]:
+        """Выданные сейчас соединения, самые долгие - первыми"""
+        now = time.perf_counter()
+        with self._lock:
+            active = [dict(info) for info in self._active.values()]
+        rows = []
+        for info in active:
+            held = now - info.pop("start")
+            suspected = held > self.leak_threshold
+            if leaks_only and not suspected:
+                continue
+            info["held"] = round(held, 3)
+            info["suspected_leak"] = suspected
+            rows.append(info)
+        rows.sort(key=lambda row: row["held"], reverse=True)
+        return rows
+
+    def summary(self) -> dict:
+        with self._lock:
+            active = len(self._active)
+            callers = len(self.callers)
+        return {
+            "attached": self._attached,
+            "leak_threshold": self.leak_threshold,
+            "connects": self.connects,
+            "timeouts": self.timeouts,
+            "active": active,
+            "callers": callers,
+            "suspected_leaks": len(self.get_checkouts(leaks_only=True)),
+        }
@@ -0,0 +1,188 @@
+import re
+import sys
+import time
+import heapq
+import threading
+import functools
+from collections import Counter, OrderedDict
+from typing import List, Optional
+from sqlalchemy import event
+from plugins.xray.utils.latency import LogHistogram
+from plugins.xray.utils.pool_tracer import find_caller
+
+MAX_STATEMENTS = 1000
+SLOW_QUERIES = 100
+MAX_PARAMS_LENGTH = 500
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+
+@functools.lru_cache(maxsize=4096)
+def normalize_sql(statement: str) -> str:
+    """SQL без литералов: строки и числа заменяются на ``?``, списки ``IN (?, ?, ...)`` - на ``(?+)``"""
+    sql = _STRING_RE.sub("?", statement)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("(?+)", sql)
+    return _SPACE_RE.sub(" ", sql).strip()
+
+
+class _StatementStats:
+    __slots__ = ("count", "rows", "histogram", "plugins", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.rows = 0
+        self.histogram = LogHistogram()
+        self.plugins = Counter()
+        self.last = None
+
+
+class QueryProfiler:
+    """Профилировщик запросов (включается вручную).
+
+    Слушатели ``before_cursor_execute``/``after_cursor_execute`` замеряют время
+    каждого запроса. Статистика копится по нормализованному SQL в LRU-таблице
+    ограниченного размера, отдельно хранятся ``slow_count`` самых медленных выполнений
+    с параметрами и плагином, из которого выполнен запрос.
+    """
+
+    def __init__(self, engine, logger, max_statements: int = MAX_STATEMENTS, slow_count: int = SLOW_QUERIES):
+        self.engine = engine
+        self.logger = logger
+        self.max_statements = max_statements
+        self.slow_count = slow_count
+        self.started: Optional[float] = None
+        self.evicted = 0
+        self._statements: "OrderedDict[str, _StatementStats]" = OrderedDict()
+        # Куча самых медленных выполнений: (время, порядковый номер, запись)
+        self._slow: list = []
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._enabled = False
+
+    @property
+    def enabled(self) -> bool:
+        return self._enabled
+
+    def enable(self):
+        if self._enabled:
+            return
+        event.listen(self.engine, "before_cursor_execute", self._before_execute)
+        event.listen(self.engine, "after_cursor_execute", self._after_execute)
+        self._enabled = True
+        self.started = time.time()
+        self.logger.info("Query profiler enabled")
+
+    def disable(self):
+        if not self._enabled:
+            return
+        for name, listener in (("before_cursor_execute", self._before_execute),
+                               ("after_cursor_execute", self._after_execute)):
+            if event.contains(self.engine, name, listener):
+                event.remove(self.engine, name, listener)
+        self._enabled = False
+        self.logger.info("Query profiler disabled")
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._slow.clear()
+            self.evicted = 0
+            self.started = time.time() if self._enabled else None
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Время начала живёт в контексте выполнения: если запрос упадёт или профилировщик
+        # выключат между событиями, оно уйдёт вместе с контекстом, а не останется на соединении
+        if context is not None:
+            context._xray_query_start = time.perf_counter()
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, "_xray_query_start", None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        rows = getattr(cursor, "rowcount", -1)
+        caller, plugin, stack = find_caller(sys._getframe(1))
+        sql = normalize_sql(statement)
+        with self._lock:
+            stats = self._statements.get(sql)
+            if stats is None:
+                stats = self._statements[sql] = _StatementStats()
+                if len(self._statements) > self.max_statements:
+                    self._statements.popitem(last=False)
+                    self.evicted += 1
+            else:
+                self._statements.move_to_end(sql)
+            stats.count += 1
+            stats.histogram.record(elapsed)
+            if rows is not None and rows >= 0:
+                stats.rows += rows
+            stats.plugins[plugin or caller] += 1
+            stats.last = time.time()
+
+            if len(self._slow) < self.slow_count or elapsed > self._slow[0][0]:
+                self._seq += 1
+                params = repr(parameters)
+                entry = {
+                    "statement": statement,
+                    "normalized": sql,
+                    "duration": round(elapsed, 6),
+                    "rows": rows,
+                    "parameters": params[:MAX_PARAMS_LENGTH],
+                    "executemany": executemany,
+                    "plugin": plugin,
+                    "caller": caller,
+                    "stack": stack,
+                    "time": time.time(),
+                }
+                if len(self._slow) < self.slow_count:
+                    heapq.heappush(self._slow, (elapsed, self._seq, entry))
+                else:
+                    heapq.heapreplace(self._slow, (elapsed, self._seq, entry))
+
+    def get_statements(self, top: int = 50, sort: str = "total") -> List[dict]:
+        """Статистика по нормализованным запросам.
+
+        :param sort: total, mean, p95, max, count, rows
+        """
+        if sort not in ("total", "mean", "p95", "max", "count", "rows"):
+            raise ValueError(f"Unknown sort: {sort}")
+        with self._lock:
+            rows = []
+            for sql, stats in self._statements.items():
+                summary = stats.histogram.summary()
+                rows.append({
+                    "statement": sql,
+                    "count": stats.count,
+                    "total": round(stats.histogram.total, 6),
+                    "mean": round(summary["avg"], 6),
+                    "p95": round(summary["p95"], 6),
+                    "max": round(summary["max"], 6),
+                    "rows": stats.rows,
+                    "plugins": dict(stats.plugins.most_common(5)),
+                    "last": stats.last,
+                })
+        rows.sort(key=lambda row: row[sort], reverse=True)
+        return rows[:top]
+
+    def get_slow(self) -> List[dict]:
+        """Самые медленные выполнения, от медленных к быстрым"""
+        with self._lock:
+            return [dict(entry) for _, _, entry in sorted(self._slow, reverse=True)]
+
+    def status(self) -> dict:
+        with self._lock:
+            statements = len(self._statements)
+            slow = len(self._slow)
+        return {
+            "enabled": self._enabled,
+            "started": self.started,
+            "statements": statements,
+            "max_statements": self.max_statements,
+            "evicted": self.evicted,
+            "slow": slow,
+            "slow_count": self.slow_count,
+        }
@@ -0,0 +1,134 @@
+import math
+import time
+import threading
+from typing import Dict, Optional
+
+# Окна скользящих средних (как load average): имя -> секунды
+RATE_WINDOWS = (("1m", 60), ("5m", 300), ("15m", 900))
+_WINDOW_INDEX = {name: index for index, (name, _) in enumerate(RATE_WINDOWS)}
+
+
+def ewma(rate: float, instant: float, dt: float, window: float) -> float:
+    """Экспоненциальное скользящее среднее с учётом неравных интервалов"""
+    alpha = 1 - math.exp(-dt / window)
+    return rate + alpha * (instant - rate)
+
+
+class _PropertyRate:
+    """Счётчики и EWMA-скорости одного свойства: O(1) памяти"""
+
+    __slots__ = ("count_read", "count_write", "read", "write")
+
+    def __init__(self, count_read: int, count_write: int):
+        self.count_read = count_read
+        self.count_write = count_write
+        self.read = [0.0] * len(RATE_WINDOWS)
+        self.write = [0.0] * len(RATE_WINDOWS)
+
+    def update(self, count_read: int, count_write: int, dt: float):
+        # Счётчик мог сброситься (перезагрузка объекта) - считаем с нуля
+        delta_read = count_read - self.count_read if count_read >= self.count_read else count_read
+        delta_write = count_write - self.count_write if count_write >= self.count_write else count_write
+        self.count_read = count_read
+        self.count_write = count_write
+        for index, (_, window) in enumerate(RATE_WINDOWS):
+            self.read[index] = ewma(self.read[index], delta_read / dt, dt, window)
+            self.write[index] = ewma(self.write[index], delta_write / dt, dt, window)
+
+
+class PropertyRateTracker:
+    """Скорости чтения/записи свойств (операций в секунду) по снимкам ``getAdvancedStats()``.
+
+    Для каждого свойства хранятся EWMA-скорости за 1/5/15 минут,
+    по ним ищутся самые нагруженные свойства и объекты.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rates: Dict[str, Dict[str, _PropertyRate]] = {}
+        self._last_time: Optional[float] = None
+
+    def observe(self, stats: dict, now: Optional[float] = None):
+        """Учесть снимок статистики"""
+        now = time.time() if now is None else now
+        with self._lock:
+            dt = now - self._last_time if self._last_time is not None else None
+            self._last_time = now
+            if dt is not None and dt <= 0:
+                return
+            rates = {}
+            for obj_name, obj in stats.items():
+                properties = obj.get("stat_properties") if isinstance(obj, dict) else None
+                if not properties:
+                    continue
+                known = self._rates.get(obj_name) or {}
+                obj_rates = rates[obj_name] = {}
+                for name, prop in properties.items():
+                    count_read = prop.get("count_read") or 0
+                    count_write = prop.get("count_write") or 0
+                    rate = known.get(name)
+                    if rate is None:
+                        # Новое свойство: накопленные счётчики не относятся к текущему окну
+                        rate = _PropertyRate(count_read, count_write)
+                    elif dt is not None:
+                        rate.update(count_read, count_write, dt)
+                    obj_rates[name] = rate
+            # Исчезнувшие объекты и свойства отбрасываются
+            self._rates = rates
+
+    @staticmethod
+    def _row(name: str, rate_read, rate_write) -> dict:
+        row = {"name": name}
+        for index, (window, _) in enumerate(RATE_WINDOWS):
+            row[f"read_{window}"] = round(rate_read[index], 3)
+            row[f"write_{window}"] = round(rate_write[index], 3)
+        return row
+
+    def get_property(self, obj_name: str, name: str) -> Optional[dict]:
+        with self._lock:
+            rate = (self._rates.get(obj_name) or {}).get(name)
+            if rate is None:
+                return None
+            return self._row(f"{obj_name}.{name}", rate.read, rate.write)
+
+    def get_all(self) -> Dict[str, dict]:
+        """Скорости всех свойств: ``объект.свойство`` -> скорости"""
+        with self._lock:
+            return {f"{obj_name}.{name}": self._row(f"{obj_name}.{name}", rate.read, rate.write)
+                    for obj_name, props in self._rates.items() for name, rate in props.items()}
+
+    def hottest(self, top: int = 20, by: str = "write", window: str = "1m",
+                level: str = "property") -> list:
+        """Самые нагруженные свойства или объекты.
+
+        :param by: read, write или total
+        :param level: property или object (сумма по свойствам объекта)
+        :raises ValueError: неизвестные by/window/level
+        """
+        if window not in _WINDOW_INDEX:
+            raise ValueError(f"Unknown window: {window}")
+        if by not in ("read", "write", "total"):
+            raise ValueError(f"Unknown rate: {by}")
+        if level not in ("property", "object"):
+            raise ValueError(f"Unknown level: {level}")
+
+        with self._lock:
+            rows = []
+            for obj_name, props in self._rates.items():
+                if level == "object":
+                    size = len(RATE_WINDOWS)
+                    rate_read = [sum(r.read[i] for r in props.values()) for i in range(size)]
+                    rate_write = [sum(r.write[i] for r in props.values()) for i in range(size)]
+                    rows.append(self._row(obj_name, rate_read, rate_write))
+                else:
+                    rows.extend(self._row(f"{obj_name}.{name}", rate.read, rate.write)
+                                for name, rate in props.items())
+
+        def key(row):
+            if by == "total":
+                return row[f"read_{window}"] + row[f"write_{window}"]
+            return row[f"{by}_{window}"]
+
+        rows = [row for row in rows if key(row) > 0]
+        rows.sort(key=key, reverse=True)
+        return rows[:top]
@@ -0,0 +1,105 @@
+import threading
+from array import array
+from typing import Dict, List, Optional
+
+
+class RingBuffer:
+    """Кольцевой буфер фиксированного размера с колоночным хранением.
+
+    Каждая метрика хранится в отдельном типизированном массиве (``array``),
+    временные метки - в колонке ``timestamp`` (double). Записи добавляются
+    в порядке возрастания времени, поэтому выборка по интервалу выполняется
+    бинарным поиском.
+    """
+
+    def __init__(self, capacity: int, columns: Dict[str, str]):
+        """
+        :param capacity: максимальное количество записей
+        :param columns: имя колонки -> typecode модуля ``array`` (например 'i', 'd')
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.columns = dict(columns)
+        self._timestamps = array('d', [0.0]) * capacity
+        self._data = {
+            name: array(typecode, [0]) * capacity
+            for name, typecode in self.columns.items()
+        }
+        self._head = 0  # позиция следующей записи
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, timestamp: float, **values):
+        """Добавить запись. Отсутствующие колонки заполняются нулём"""
+        with self._lock:
+            pos = self._head
+            self._timestamps[pos] = timestamp
+            for name, column in self._data.items():
+                column[pos] = values.get(name, 0)
+            self._head = (pos + 1) % self.capacity
+            if self._size < self.capacity:
+                self._size += 1
+
+    def clear(self):
+        with self._lock:
+            self._head = 0
+            self._size = 0
+
+    def _physical(self, index: int) -> int:
+        """Логический индекс (0 - самая старая запись) -> позиция в массиве"""
+        return (self._head - self._size + index) % self.capacity
+
+    def _bisect(self, timestamp: float) -> int:
+        """Первый логический индекс с временем строго больше ``timestamp``"""
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._timestamps[self._physical(mid)] > timestamp:
+                hi = mid
+            else:
+                lo = mid + 1
+        return lo
+
+    def _rows(self, start: int, stop: int) -> List[dict]:
+        rows = []
+        for index in range(start, stop):
+            pos = self._physical(index)
+            row = {name: column[pos] for name, column in self._data.items()}
+            row['timestamp'] = self._timestamps[pos]
+            rows.append(row)
+        return rows
+
+    def since(self, timestamp: float) -> List[dict]:
+        """Записи с временем строго больше ``timestamp`` (от старых к новым)"""
+        with self._lock:
+            return self._rows(self._bisect(timestamp), self._size)
+
+    def between(self, start: float, end: float) -> List[dict]:
+        """Записи в интервале (start, end]"""
+        with self._lock:
+            return self._rows(self._bisect(start), self._bisect(end))
+
+    def first(self) -> Optional[dict]:
+        """Самая старая запись"""
+        with self._lock:
+            if not self._size:
+                return None
+            return self._rows(0, 1)[0]
+
+    def last(self) -> Optional[dict]:
+        """Самая свежая запись"""
+        with self._lock:
+            if not self._size:
+                return None
+            return self._rows(self._size - 1, self._size)[0]
+
+    def memory_usage(self) -> int:
+        """Размер занятой массивами памяти в байтах"""
+        total = self._timestamps.itemsize * len(self._timestamps)
+        for column in self._data.values():
+            total += column.itemsize * len(column)
+        return total
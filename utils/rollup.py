@@ -0,0 +1,208 @@
+import math
+import time
+import threading
+from typing import Dict, List, Optional, Sequence
+from plugins.xray.utils.ring_buffer import RingBuffer
+
+AGGREGATES = ("min", "max", "avg", "p95")
+
+
+def percentile(values: Sequence[float], percent: float) -> float:
+    """Перцентиль по методу ближайшего ранга"""
+    if not values:
+        return 0
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)) - 1, 0)
+    return ordered[rank]
+
+
+class RollupTier:
+    """Уровень агрегации истории с фиксированным размером корзины.
+
+    Сэмплы накапливаются в текущей корзине, при переходе в следующую корзину
+    по каждой метрике сохраняются min/max/avg/p95 в кольцевой буфер.
+    ``gauges`` - значения, для которых хранится только последнее в корзине.
+    ``on_bucket(name, timestamp, row)`` вызывается для каждой закрытой корзины.
+    """
+
+    def __init__(self, name: str, bucket_seconds: int, capacity: int,
+                 metrics: Sequence[str], gauges: Sequence[str] = (), on_bucket=None):
+        self.name = name
+        self.on_bucket = on_bucket
+        self.bucket_seconds = bucket_seconds
+        self.capacity = capacity
+        self.metrics = tuple(metrics)
+        self.gauges = tuple(gauges)
+        columns = {"samples": "i"}
+        for gauge in self.gauges:
+            columns[gauge] = "i"
+        for metric in self.metrics:
+            for agg in AGGREGATES:
+                columns[f"{metric}_{agg}"] = "f"
+        self.history = RingBuffer(capacity, columns)
+        self._lock = threading.Lock()
+        self._bucket_start: Optional[float] = None
+        self._values: Dict[str, List[float]] = {m: [] for m in self.metrics}
+        self._gauges: Dict[str, int] = {}
+
+    @property
+    def span(self) -> int:
+        """Период (в секундах), который покрывает уровень"""
+        return self.capacity * self.bucket_seconds
+
+    def add(self, timestamp: float, **values):
+        """Добавить сэмпл"""
+        bucket = timestamp - timestamp % self.bucket_seconds
+        with self._lock:
+            if self._bucket_start is not None and bucket != self._bucket_start:
+                row = self._aggregate()
+                self.history.append(self._bucket_start, **row)
+                if self.on_bucket:
+                    self.on_bucket(self.name, self._bucket_start, row)
+                for samples in self._values.values():
+                    samples.clear()
+            self._bucket_start = bucket
+            for metric in self.metrics:
+                self._values[metric].append(values.get(metric, 0))
+            for gauge in self.gauges:
+                self._gauges[gauge] = values.get(gauge, 0)
+
+    def load(self, rows: Sequence[dict]) -> float:
+        """Добавить готовые корзины (например сохранённые на диске) перед новыми сэмплами.
+
+        :return: начало первой незакрытой корзины - сэмплы с этого момента нужно добавить заново
+        """
+        for row in rows[-self.capacity:]:
+            values = dict(row)
+            self.history.append(values.pop("timestamp"), **values)
+        return rows[-1]["timestamp"] + self.bucket_seconds if rows else 0
+
+    def _aggregate(self) -> dict:
+        row = {"samples": len(self._values[self.metrics[0]]) if self.metrics else 0}
+        row.update(self._gauges)
+        for metric, samples in self._values.items():
+            if not samples:
+                continue
+            row[f"{metric}_min"] = min(samples)
+            row[f"{metric}_max"] = max(samples)
+            row[f"{metric}_avg"] = sum(samples) / len(samples)
+            row[f"{metric}_p95"] = percentile(samples, 95)
+        return row
+
+    def since(self, timestamp: float) -> List[dict]:
+        """Корзины, пересекающиеся с периодом после ``timestamp``, включая текущую незавершённую"""
+        rows = self.history.since(timestamp - self.bucket_seconds)
+        with self._lock:
+            if self._bucket_start is not None and any(self._values.values()):
+                current = self._aggregate()
+                current["timestamp"] = self._bucket_start
+                rows.append(current)
+        for row in rows:
+            for key, value in row.items():
+                if isinstance(value, float) and key != "timestamp":
+                    row[key] = round(value, 2)
+        return rows
+
+
+# Уровни агрегации по умолчанию: 1m - сутки, 1h - 30 дней
+DEFAULT_TIERS = (("1m", 60, 1440), ("1h", 3600, 720))
+
+
+def select_resolution(window: float, candidates: Sequence[tuple], max_points: int = 500) -> str:
+    """Выбрать самое подробное разрешение, покрывающее период не более чем ``max_points`` точками.
+
+    :param candidates: ``(имя, шаг в секундах, покрываемый период)`` от подробного к грубому
+    """
+    for name, step, span in candidates:
+        if span >= window and window / step <= max_points:
+            return name
+    return candidates[-1][0]
+
+
+class MetricSeries:
+    """Временной ряд набора метрик: сырые сэмплы в кольцевом буфере и уровни агрегации.
+
+    :param columns: все сохраняемые колонки сырых сэмплов (имя -> typecode array)
+    :param metrics: метрики, по которым считаются min/max/avg/p95 в корзинах
+    :param gauges: метрики, для которых в корзине хранится последнее значение (счётчики)
+    :param on_bucket: вызывается для каждой закрытой корзины: ``(уровень, время, корзина)``
+    """
+
+    def __init__(self, columns: Dict[str, str], metrics: Sequence[str], gauges: Sequence[str] = (),
+                 capacity: int = 1000, tiers: Sequence[tuple] = DEFAULT_TIERS, on_bucket=None):
+        self.capacity = capacity
+        self.raw = RingBuffer(capacity, columns)
+        self.metrics = tuple(metrics)
+        self.rollups = [RollupTier(name, bucket, size, metrics, gauges, on_bucket) for name, bucket, size in tiers]
+
+    def add(self, timestamp: float, **values):
+        self.raw.append(timestamp, **values)
+        for tier in self.rollups:
+            tier.add(timestamp, **values)
+
+    def restore(self, rollups: Dict[str, Sequence[dict]], load_samples):
+        """Восстановить историю после перезапуска.
+
+        :param rollups: имя уровня -> сохранённые закрытые корзины, от старых к новым
+        :param load_samples: ``(count=None, since=None)`` -> ``[(время, значения)]`` от старых к новым:
+            последние ``count`` сырых сэмплов (для буфера) или все сэмплы начиная с ``since``
+            (для корзин, не закрытых до остановки)
+        """
+        resume = {tier.name: tier.load(rollups.get(tier.name, [])) for tier in self.rollups}
+        recent = load_samples(count=self.capacity)
+        for timestamp, values in recent:
+            self.raw.append(timestamp, **values)
+        # После последней сохранённой корзины каждого уровня - не больше одной его корзины,
+        # сколько бы ни длился простой
+        since = min(resume.values(), default=None)
+        replay = load_samples(since=since) if since is not None else []
+        for tier in self.rollups:
+            for timestamp, values in replay:
+                if timestamp >= resume[tier.name]:
+                    tier.add(timestamp, **values)
+        return len({timestamp for timestamp, _ in recent} | {timestamp for timestamp, _ in replay})
+
+    @property
+    def resolutions(self) -> List[str]:
+        """Разрешения от подробного к грубому"""
+        return ["raw"] + [tier.name for tier in self.rollups]
+
+    def resolve(self, minutes: int, interval: float = 1, max_points: int = 500) -> str:
+        """Разрешение, которое ``history(resolution="auto")`` выберет для периода N минут"""
+        # При неравномерном опросе буфер может покрывать меньше номинального периода
+        raw_span = self.capacity * interval
+        oldest = self.raw.first() if len(self.raw) == self.capacity else None
+        if oldest:
+            raw_span = time.time() - oldest["timestamp"]
+        candidates = [("raw", interval, raw_span)]
+        candidates += [(tier.name, tier.bucket_seconds, tier.span) for tier in self.rollups]
+        return select_resolution(minutes * 60, candidates, max_points)
+
+    def history(self, minutes: int, resolution: str = "auto", interval: float = 1,
+                max_points: int = 500):
+        """История за N минут: (разрешение, точки).
+
+        В агрегированных точках значение метрики - среднее по корзине,
+        рядом лежат ``<метрика>_min/_max/_p95``.
+        """
+        window = minutes * 60
+        if resolution == "auto":
+            resolution = self.resolve(minutes, interval, max_points)
+
+        cutoff_time = time.time() - window
+        if resolution == "raw":
+            points = self.raw.since(cutoff_time)
+            for point in points:
+                for key, value in point.items():
+                    if isinstance(value, float) and key != "timestamp":
+                        point[key] = round(value, 2)
+            return resolution, points
+
+        tier = next((t for t in self.rollups if t.name == resolution), None)
+        if tier is None:
+            raise ValueError(f"Unknown resolution: {resolution}")
+        points = tier.since(cutoff_time)
+        for point in points:
+            for metric in self.metrics:
+                point[metric] = point.get(f"{metric}_avg", 0)
+        return resolution, points
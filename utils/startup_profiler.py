@@ -0,0 +1,176 @@
+import os
+import json
+import time
+import platform
+import functools
+import threading
+from typing import List, Optional
+from plugins.xray.utils.import_profiler import ImportProfiler, import_profiler
+
+# История загрузок хранится рядом с плагином
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data",
+                            "startup_history.json")
+KEEP_BOOTS = 10
+# Сколько модулей сохраняется в профиле загрузки
+MAX_MODULES = 200
+PHASES = ("import", "__init__", "initialization")
+
+
+def _plugin_name(module: str) -> str:
+    parts = module.split(".")
+    return parts[1] if parts[0] == "plugins" and len(parts) > 1 else module
+
+
+class StartupProfiler:
+    """Профиль загрузки: время импорта модулей и создания/инициализации плагинов.
+
+    Профиль каждой загрузки сохраняется в историю для сравнения с предыдущей.
+    Учитываются плагины, загруженные после xray; для уже созданных плагинов
+    замеряется только ``initialization()``, если она ещё не вызывалась.
+    """
+
+    def __init__(self, imports: ImportProfiler, path: str = DEFAULT_PATH, keep: int = KEEP_BOOTS):
+        self.imports = imports
+        self.path = path
+        self.keep = keep
+        self.plugins: List[dict] = []
+        self.saved = False
+        self._lock = threading.Lock()
+
+    def _timed(self, plugin: str, phase: str, func):
+        profiler = self
+
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.record(plugin, phase, start, time.perf_counter() - start)
+
+        timed.__xray_timed__ = True
+        return timed
+
+    def record(self, plugin: str, phase: str, start: float, duration: float):
+        with self._lock:
+            self.plugins.append({
+                "plugin": plugin,
+                "phase": phase,
+                "start": round(start - self.imports.origin, 6),
+                "duration": round(duration, 6),
+            })
+
+    def hook_plugin_class(self, base_cls):
+        """Замерять ``__init__`` и ``initialization`` всех плагинов, объявленных после вызова"""
+        profiler = self
+        original = base_cls.__dict__.get("__init_subclass__")
+
+        def __init_subclass__(cls, **kwargs):
+            if original is not None:
+                original.__func__(cls, **kwargs)
+            else:
+                super(base_cls, cls).__init_subclass__(**kwargs)
+            plugin = _plugin_name(cls.__module__)
+            for phase in ("__init__", "initialization"):
+                func = cls.__dict__.get(phase)
+                if func is not None and not getattr(func, "__xray_timed__", False):
+                    setattr(cls, phase, profiler._timed(plugin, phase, func))
+
+        base_cls.__init_subclass__ = classmethod(__init_subclass__)
+
+    def hook_registry(self, plugins_registry):
+        """Замерять ``initialization()`` плагинов, созданных до xray"""
+        for name, plugin in list(plugins_registry.items()):
+            instance = plugin.get("instance")
+            method = getattr(instance, "initialization", None)
+            if method is None or getattr(method, "__xray_timed__", False) \
+                    or getattr(getattr(method, "__func__", None), "__xray_timed__", False):
+                continue
+            instance.initialization = self._timed(name, "initialization", method)
+
+    def current(self) -> dict:
+        """Профиль текущей загрузки"""
+        with self._lock:
+            plugin_records = list(self.plugins)
+        with self.imports._lock:
+            modules = list(self.imports.records)
+
+        plugins = {}
+        for rec in modules:
+            if rec["depth"] == 0 and rec["module"].startswith("plugins.") and rec["module"].count(".") == 1:
+                item = plugins.setdefault(_plugin_name(rec["module"]), {"name": _plugin_name(rec["module"])})
+                item["import"] = rec["cumulative"]
+                item["start"] = rec["start"]
+        for rec in plugin_records:
+            item = plugins.setdefault(rec["plugin"], {"name": rec["plugin"]})
+            item[rec["phase"]] = round(item.get(rec["phase"], 0) + rec["duration"], 6)
+            item.setdefault("start", rec["start"])
+            item["start"] = min(item["start"], rec["start"])
+        for item in plugins.values():
+            item["total"] = round(sum(item.get(phase, 0) for phase in PHASES), 6)
+
+        top_modules = sorted((rec for rec in modules if rec["depth"] == 0),
+                             key=lambda rec: rec["cumulative"], reverse=True)[:MAX_MODULES]
+        return {
+            "boot": self.imports.started,
+            "python": platform.python_version(),
+            "plugins": sorted(plugins.values(), key=lambda item: item["total"], reverse=True),
+            "plugin_phases": plugin_records,
+            "modules": sorted(top_modules, key=lambda rec: rec["start"]),
+            "packages": sorted(self.imports.by_top_level().values(), key=lambda item: item["time"], reverse=True),
+            "imports_total": round(sum(rec["self"] for rec in modules), 6),
+        }
+
+    def history(self) -> List[dict]:
+        """Сохранённые профили загрузок, от старых к новым"""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return []
+
+    def save(self):
+        """Сохранить профиль текущей загрузки в историю"""
+        profile = self.current()
+        history = [boot for boot in self.history() if boot.get("boot") != profile["boot"]]
+        history.append(profile)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(history[-self.keep:], f)
+        os.replace(tmp_path, self.path)
+        self.saved = True
+
+    def save_later(self, delay: float, logger):
+        """Сохранить профиль через ``delay`` секунд, когда загрузка скорее всего завершена"""
+        def save():
+            time.sleep(delay)
+            try:
+                self.save()
+            except Exception as e:
+                logger.error(f"Failed to save startup profile: {e}")
+
+        threading.Thread(target=save, name="xray_startup", daemon=True).start()
+
+    def compare(self) -> dict:
+        """Текущая загрузка и сравнение плагинов с предыдущей"""
+        current = self.current()
+        previous: Optional[dict] = None
+        for boot in reversed(self.history()):
+            if boot.get("boot") != current["boot"]:
+                previous = boot
+                break
+        previous_plugins = {item["name"]: item for item in (previous or {}).get("plugins", [])}
+        for item in current["plugins"]:
+            prev = previous_plugins.get(item["name"])
+            item["previous"] = prev["total"] if prev else None
+            item["delta"] = round(item["total"] - prev["total"], 6) if prev else None
+        return {
+            "current": current,
+            "previous": {key: previous[key] for key in ("boot", "python", "imports_total")} if previous else None,
+            "boots": [boot.get("boot") for boot in self.history()],
+        }
+
+
+# Единственный экземпляр на процесс
+startup_profiler = StartupProfiler(import_profiler)
@@ -0,0 +1,263 @@
+import time
+import threading
+from typing import Dict, List, Optional
+from sqlalchemy import text
+from app.database import session_scope, db
+
+
+def format_size(size_bytes) -> str:
+    """Преобразует размер в байтах в удобочитаемый формат (например, "2.5 MB", "10 KB")."""
+    if not size_bytes:
+        return "0 B"
+    size_name = ("B", "KB", "MB", "GB", "TB")
+    i = 0
+    size = float(size_bytes)
+    while size >= 1024 and i < len(size_name) - 1:
+        size /= 1024
+        i += 1
+    return f"{size:.2f} {size_name[i]}"
+
+
+class TableStatsCollector:
+    """Статистика таблиц БД с кэшем на TTL.
+
+    Количество строк берётся из оценок СУБД (pg_class.reltuples, table_rows в MySQL,
+    sqlite_stat1/max(rowid) в SQLite), точный COUNT(*) выполняется только по
+    явному запросу для конкретной таблицы. Устаревший кэш обновляется
+    в фоновом потоке, запрос получает текущие данные без ожидания.
+    """
+
+    def __init__(self, engine, logger, ttl: int = 300):
+        self.engine = engine
+        self.logger = logger
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._tables: Dict[str, dict] = {}
+        self._updated: Optional[float] = None
+        self._refreshing = False
+
+    @property
+    def age(self) -> Optional[float]:
+        """Возраст кэша в секундах"""
+        if self._updated is None:
+            return None
+        return time.time() - self._updated
+
+    def get_tables(self) -> List[dict]:
+        """Список таблиц из кэша. Первый вызов собирает данные синхронно"""
+        if self._updated is None:
+            self.refresh()
+        elif self.age > self.ttl:
+            self.refresh_async()
+        with self._lock:
+            return [dict(item) for item in self._tables.values()]
+
+    def refresh_async(self):
+        """Запустить обновление кэша в фоне (если ещё не запущено)"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self.refresh, name="xray_table_stats", daemon=True).start()
+
+    def refresh(self):
+        """Собрать статистику таблиц"""
+        try:
+            tables = self._collect()
+            with self._lock:
+                # Точный подсчёт, выполненный в пределах TTL, не заменяем оценкой
+                for name, item in tables.items():
+                    known = self._tables.get(name)
+                    if known and not known["estimated"] and time.time() - known["counted"] < self.ttl:
+                        item["row_count"] = known["row_count"]
+                        item["estimated"] = False
+                        item["counted"] = known["counted"]
+                self._tables = tables
+                self._updated = time.time()
+        except Exception as e:
+            self.logger.exception("Error collecting table stats: %s", e)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def exact_count(self, table_name: str) -> Optional[int]:
+        """Точный COUNT(*) для таблицы из кэша"""
+        with self._lock:
+            if table_name not in self._tables:
+                return None
+        quoted = self.engine.dialect.identifier_preparer.quote(table_name)
+        with session_scope() as session:
+            count = session.execute(text(f"SELECT COUNT(*) FROM {quoted}")).scalar()
+        with self._lock:
+            item = self._tables.get(table_name)
+            if item is not None:
+                item["row_count"] = count
+                item["estimated"] = False
+                item["counted"] = time.time()
+        return count
+
+    def _modules(self) -> Dict[str, str]:
+        """Имя таблицы -> модуль, в котором определена модель"""
+        modules = {}
+        for class_name, model in db.Model.registry._class_registry.items():
+            if hasattr(model, '__tablename__') and hasattr(model, '__table__'):
+                modules[model.__tablename__] = model.__module__.split(".")[1]
+        return modules
+
+    def _collect(self) -> Dict[str, dict]:
+        dialect = self.engine.dialect.name
+        modules = self._modules()
+        tables = {}
+
+        def add(table_name, row_count, data_bytes, index_bytes, toast_bytes=0, indexes=None, size_exact=True):
+            data_bytes = int(data_bytes or 0)
+            index_bytes = int(index_bytes or 0)
+            toast_bytes = int(toast_bytes or 0)
+            size_bytes = data_bytes + index_bytes + toast_bytes
+            tables[table_name] = {
+                'table_name': table_name,
+                'module': modules.get(table_name, 'Unknown'),
+                'row_count': row_count,
+                'estimated': True,
+                'data_bytes': data_bytes,
+                'index_bytes': index_bytes,
+                'toast_bytes': toast_bytes,
+                'size_bytes': size_bytes,
+                'size_exact': size_exact,
+                'size': format_size(size_bytes),
+                'data_size': format_size(data_bytes),
+                'index_size': format_size(index_bytes),
+                'toast_size': format_size(toast_bytes),
+                'indexes': sorted(
+                    [dict(index, size=format_size(index['size_bytes'])) for index in indexes or []],
+                    key=lambda index: index['size_bytes'], reverse=True),
+            }
+
+        with session_scope() as session:
+            if dialect == 'postgresql':
+                # Данные, индексы (с размером каждого) и TOAST одним запросом
+                query = text("""
+                    SELECT
+                        c.relname AS table_name,
+                        CASE WHEN c.reltuples < 0 THEN NULL ELSE c.reltuples::bigint END AS row_count,
+                        pg_relation_size(c.oid) AS data_bytes,
+                        pg_indexes_size(c.oid) AS index_bytes,
+                        CASE WHEN c.reltoastrelid = 0 THEN 0
+                             ELSE pg_total_relation_size(c.reltoastrelid) END AS toast_bytes,
+                        (SELECT json_agg(json_build_object('name', i.relname, 'size_bytes', pg_relation_size(i.oid)))
+                           FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+                          WHERE x.indrelid = c.oid) AS indexes
+                    FROM pg_class c
+                    JOIN pg_namespace n ON n.oid = c.relnamespace
+                    WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p');
+                """)
+                for row in session.execute(query):
+                    add(row.table_name, row.row_count, row.data_bytes, row.index_bytes,
+                        row.toast_bytes, row.indexes)
+
+            elif dialect == 'mysql':
+                # table_rows для InnoDB - оценка. Размеры индексов - из mysql.innodb_index_stats,
+                # если есть права на чтение
+                query = text("""
+                    SELECT
+                        t.table_name AS table_name,
+                        t.table_rows AS row_count,
+                        t.data_length AS data_bytes,
+                        t.index_length AS index_bytes,
+                        s.indexes AS indexes
+                    FROM information_schema.tables t
+                    LEFT JOIN (
+                        SELECT table_name,
+                               GROUP_CONCAT(CONCAT(index_name, ':', stat_value * @@innodb_page_size)) AS indexes
+                        FROM mysql.innodb_index_stats
+                        WHERE database_name = DATABASE() AND stat_name = 'size'
+                        GROUP BY table_name
+                    ) s ON s.table_name = t.table_name
+                    WHERE t.table_schema = DATABASE();
+                """)
+                fallback = text("""
+                    SELECT
+                        table_name,
+                        table_rows AS row_count,
+                        data_length AS data_bytes,
+                        index_length AS index_bytes,
+                        NULL AS indexes
+                    FROM information_schema.tables
+                    WHERE table_schema = DATABASE();
+                """)
+                try:
+                    rows = session.execute(query).fetchall()
+                except Exception as e:
+                    self.logger.debug("innodb_index_stats not available: %s", e)
+                    rows = session.execute(fallback).fetchall()
+                for row in rows:
+                    indexes = []
+                    for item in (row.indexes or '').split(','):
+                        if ':' in item:
+                            name, size = item.rsplit(':', 1)
+                            indexes.append({'name': name, 'size_bytes': int(float(size))})
+                    add(row.table_name, row.row_count, row.data_bytes, row.index_bytes, 0, indexes)
+
+            elif dialect == 'sqlite':
+                names = [row.name for row in session.execute(
+                    text("SELECT name FROM sqlite_master WHERE type='table';"))]
+                # Оценки из ANALYZE, если он выполнялся
+                stat_rows = {}
+                try:
+                    for row in session.execute(text("SELECT tbl, stat FROM sqlite_stat1;")):
+                        count = int(str(row.stat).split()[0])
+                        stat_rows[row.tbl] = max(stat_rows.get(row.tbl, 0), count)
+                except Exception:
+                    pass
+
+                # Размеры B-деревьев таблиц и индексов из dbstat (нужен SQLITE_ENABLE_DBSTAT_VTAB)
+                sizes = {name: {'data': 0, 'index': 0, 'overflow': 0, 'indexes': []} for name in names}
+                size_exact = True
+                try:
+                    query = text("""
+                        SELECT
+                            m.tbl_name AS table_name,
+                            m.type AS type,
+                            s.name AS name,
+                            SUM(s.pgsize) AS size_bytes,
+                            SUM(CASE WHEN s.pagetype = 'overflow' THEN s.pgsize ELSE 0 END) AS overflow_bytes
+                        FROM dbstat s
+                        JOIN sqlite_master m ON m.name = s.name
+                        GROUP BY s.name;
+                    """)
+                    for row in session.execute(query):
+                        item = sizes.get(row.table_name)
+                        if item is None:
+                            continue
+                        if row.type == 'index':
+                            item['index'] += row.size_bytes
+                            item['indexes'].append({'name': row.name, 'size_bytes': row.size_bytes})
+                        else:
+                            item['data'] += row.size_bytes - row.overflow_bytes
+                            item['overflow'] += row.overflow_bytes
+                except Exception as e:
+                    # Без dbstat известен только размер всего файла БД
+                    self.logger.debug("dbstat not available: %s", e)
+                    size_exact = False
+                    db_size = session.execute(text(
+                        "SELECT page_count * page_size AS size_bytes FROM pragma_page_count(), pragma_page_size();"
+                    )).scalar()
+                    for item in sizes.values():
+                        item['data'] = db_size
+
+                for name in names:
+                    row_count = stat_rows.get(name)
+                    if row_count is None:
+                        # max(rowid) - O(log n) по B-дереву, верхняя граница количества строк
+                        try:
+                            quoted = self.engine.dialect.identifier_preparer.quote(name)
+                            row_count = session.execute(text(f"SELECT max(rowid) FROM {quoted};")).scalar() or 0
+                        except Exception:
+                            row_count = None
+                    item = sizes[name]
+                    add(name, row_count, item['data'], item['index'], item['overflow'],
+                        item['indexes'], size_exact)
+
+            else:
+                raise NotImplementedError(f"Unsupported database dialect: {dialect}")
+        return tables
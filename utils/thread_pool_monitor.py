@@ -0,0 +1,181 @@
+import time
+import functools
+import threading
+from typing import Dict, Optional
+from plugins.xray.utils.rollup import MetricSeries
+
+# Колонки истории пулов потоков
+_POOL_COLUMNS = {
+    "active_tasks": "i",
+    "max_workers": "i",
+    "utilization": "f",
+    "queue_size": "i",
+    "completed_tasks": "i",
+    "failed_tasks": "i",
+    "rejected_tasks": "i",
+    "avg_exec_ms": "f",
+    "max_exec_ms": "f",
+}
+_POOL_METRICS = ("active_tasks", "utilization", "queue_size", "avg_exec_ms")
+_POOL_GAUGES = ("max_workers", "completed_tasks", "failed_tasks", "rejected_tasks")
+
+# Колонки истории batch writer
+_BATCH_WRITER_COLUMNS = {
+    "batch_size": "i",
+    "total_added": "i",
+    "total_flushed": "i",
+    "total_errors": "i",
+    "error_rate": "f",
+    "avg_flush_ms": "f",
+    "max_flush_ms": "f",
+}
+_BATCH_WRITER_METRICS = ("batch_size", "error_rate", "avg_flush_ms")
+_BATCH_WRITER_GAUGES = ("total_added", "total_flushed", "total_errors")
+
+
+def get_thread_pools_stats() -> dict:
+    """Текущая статистика пулов потоков и batch writer"""
+    from app.core.main.ObjectManager import _poolLinkedProperty, _batch_writer
+    from app.core.lib.common import _poolSay, _poolPlaysound
+    return {"linked_pool": _poolLinkedProperty.get_monitoring_stats(),
+            "say_pool": _poolSay.get_monitoring_stats(),
+            "playsound_pool": _poolPlaysound.get_monitoring_stats(),
+            "batch_writer": _batch_writer.get_stats()}
+
+
+def _pool_values(stats: dict) -> dict:
+    pool = stats.get("thread_pool") or {}
+    execution = stats.get("execution_time") or {}
+    return {
+        "active_tasks": len(pool.get("active_tasks") or {}),
+        "max_workers": pool.get("max_workers") or 0,
+        "utilization": pool.get("pool_utilization") or 0,
+        "queue_size": pool.get("queue_size") or 0,
+        "completed_tasks": pool.get("completed_tasks") or 0,
+        "failed_tasks": pool.get("failed_tasks") or 0,
+        "rejected_tasks": pool.get("rejected_tasks") or 0,
+        "avg_exec_ms": (execution.get("avg_execution_time") or 0) * 1000,
+        "max_exec_ms": (execution.get("max_execution_time") or 0) * 1000,
+    }
+
+
+def _batch_writer_values(stats: dict) -> dict:
+    execution = stats.get("execution_time") or {}
+    efficiency = stats.get("efficiency") or {}
+    return {
+        "batch_size": stats.get("current_batch_size") or 0,
+        "total_added": stats.get("total_added") or 0,
+        "total_flushed": stats.get("total_flushed") or 0,
+        "total_errors": stats.get("total_errors") or 0,
+        "error_rate": efficiency.get("error_rate") or 0,
+        "avg_flush_ms": (execution.get("avg_seconds") or 0) * 1000,
+        "max_flush_ms": (execution.get("max_seconds") or 0) * 1000,
+    }
+
+
+class ThreadPoolMonitor:
+    """Периодический сбор статистики пулов потоков и batch writer во временные ряды"""
+
+    def __init__(self, logger, max_history: int = 1000, event_bus=None, store=None):
+        self.logger = logger
+        self.event_bus = event_bus
+        # Хранилище истории на диске (MetricsStore): ряды thread_pool.<имя> и batch_writer
+        self.store = store
+        self.max_history = max_history
+        self.pools: Dict[str, MetricSeries] = {}
+        self.batch_writer = MetricSeries(_BATCH_WRITER_COLUMNS, _BATCH_WRITER_METRICS,
+                                         _BATCH_WRITER_GAUGES, max_history,
+                                         on_bucket=self._on_bucket("batch_writer"))
+        self.last_stats: Optional[dict] = None
+        self.interval = 60
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _on_bucket(self, series_name: str):
+        return functools.partial(self.store.append_rollup, series_name) if self.store else None
+
+    def _pool_series(self, name: str) -> MetricSeries:
+        with self._lock:
+            series = self.pools.get(name)
+            if series is None:
+                series = MetricSeries(_POOL_COLUMNS, _POOL_METRICS, _POOL_GAUGES, self.max_history,
+                                      on_bucket=self._on_bucket(f"thread_pool.{name}"))
+                self.pools[name] = series
+        return series
+
+    def sample(self):
+        """Снять статистику и добавить в историю"""
+        stats = get_thread_pools_stats()
+        timestamp = time.time()
+        for name, pool_stats in stats.items():
+            if name == "batch_writer":
+                values = _batch_writer_values(pool_stats)
+                self.batch_writer.add(timestamp, **values)
+                if self.store:
+                    self.store.append("batch_writer", timestamp, values)
+                continue
+            if not pool_stats or not pool_stats.get("thread_pool"):
+                continue
+            values = _pool_values(pool_stats)
+            self._pool_series(name).add(timestamp, **values)
+            if self.store:
+                self.store.append(f"thread_pool.{name}", timestamp, values)
+        self.last_stats = stats
+        if self.event_bus:
+            self.event_bus.publish("thread_pools", stats)
+            self.event_bus.publish("batch_writer", stats.get("batch_writer"))
+        return stats
+
+    def restore(self):
+        """Загрузить историю, сохранённую до перезапуска"""
+        restored = 0
+        for series_name in self.store.series("thread_pool."):
+            restored += self.store.restore(series_name, self._pool_series(series_name[len("thread_pool."):]))
+        restored += self.store.restore("batch_writer", self.batch_writer)
+        self.logger.info(f"Thread pool history restored: {restored} samples")
+
+    def get_history(self, minutes: int = 60, resolution: str = "auto") -> dict:
+        """История пулов и batch writer за N минут"""
+        with self._lock:
+            pools = dict(self.pools)
+        if resolution == "auto":
+            # Одно разрешение для всех рядов - самое грубое из выбранных по отдельности
+            # (после восстановления длина сырой истории рядов может отличаться)
+            chosen = [series.resolve(minutes, self.interval) for series in [self.batch_writer, *pools.values()]]
+            resolution = max(chosen, key=self.batch_writer.resolutions.index)
+        result = {"pools": {}}
+        for name, series in pools.items():
+            result["pools"][name] = series.history(minutes, resolution, self.interval)[1]
+        result["batch_writer"] = self.batch_writer.history(minutes, resolution, self.interval)[1]
+        result["resolution"] = resolution
+        return result
+
+    def start_monitoring(self, interval: int = 60):
+        """Запуск периодического мониторинга"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.interval = interval
+
+        def monitor_loop():
+            if self.store:
+                try:
+                    self.restore()
+                except Exception as e:
+                    self.logger.error(f"Thread pool history restore error: {e}")
+            while not self._stop_event.is_set():
+                try:
+                    self.sample()
+                except Exception as e:
+                    self.logger.error(f"Thread pool monitoring error: {e}")
+                self._stop_event.wait(interval)
+
+        self._thread = threading.Thread(target=monitor_loop, name="xray_thread_pools", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Thread pool monitoring started with {interval}s interval")
+
+    def stop_monitoring(self):
+        """Остановка мониторинга"""
+        self._stop_event.set()
+        self.logger.info("Thread pool monitoring stopped")
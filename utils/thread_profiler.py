@@ -0,0 +1,205 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from typing import Dict, Optional
+
+# Частота тиков ядра для перевода utime/stime в секунды
+try:
+    _CLK_TCK = os.sysconf("SC_CLK_TCK")
+except (AttributeError, ValueError, OSError):
+    _CLK_TCK = 100
+
+DEFAULT_INTERVAL = 0.01
+MAX_DURATION = 300
+# Ограничения памяти: глубина стека и число уникальных стеков
+MAX_DEPTH = 64
+MAX_STACKS = 10000
+
+
+def read_thread_cpu(native_id: int) -> Optional[float]:
+    """Процессорное время потока (user + system, секунды) из /proc/self/task/<tid>/stat.
+    None, если /proc недоступен (не Linux)"""
+    try:
+        with open(f"/proc/self/task/{native_id}/stat", "rb") as f:
+            data = f.read().decode()
+    except OSError:
+        return None
+    # Имя потока в скобках может содержать пробелы - поля считаем после последней ')'
+    fields = data[data.rfind(")") + 2:].split()
+    # utime и stime - 14 и 15 поля stat, после имени это 12 и 13
+    return (int(fields[11]) + int(fields[12])) / _CLK_TCK
+
+
+def get_threads_cpu() -> list:
+    """Потоки процесса с процессорным временем"""
+    data = []
+    for thread in threading.enumerate():
+        native_id = getattr(thread, "native_id", None)
+        data.append({
+            'name': thread.name,
+            'id': thread.ident,
+            'native_id': native_id,
+            'alive': thread.is_alive(),
+            'daemon': thread.daemon,
+            'cpu_seconds': read_thread_cpu(native_id) if native_id else None,
+        })
+    return data
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__") or os.path.basename(code.co_filename)
+    return f"{module}:{code.co_name}"
+
+
+class ThreadProfiler:
+    """Сэмплирующий профилировщик потоков.
+
+    С заданным интервалом снимает стеки всех потоков через ``sys._current_frames()``
+    и считает сэмплы по потокам, функциям и стекам (collapsed-stack формат для flame graph).
+    Работает ограниченное время, после чего останавливается сам.
+    """
+
+    def __init__(self, logger):
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._reset(DEFAULT_INTERVAL, 0)
+
+    def _reset(self, interval: float, duration: float):
+        self.interval = interval
+        self.duration = duration
+        self.started = None
+        self.finished = None
+        self.samples = 0
+        self.dropped = 0
+        self.thread_samples: Counter = Counter()
+        self.function_samples: Counter = Counter()
+        self.stacks: Counter = Counter()
+        self._thread_names: Dict[int, str] = {}
+        self._cpu_start: Dict[int, float] = {}
+        self._cpu_end: Dict[int, float] = {}
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, duration: float = 30, interval: float = DEFAULT_INTERVAL) -> bool:
+        """Запустить профилирование на ``duration`` секунд. False, если уже запущено"""
+        if self.running:
+            return False
+        duration = min(max(duration, 1), MAX_DURATION)
+        interval = max(interval, 0.001)
+        with self._lock:
+            self._reset(interval, duration)
+            self.started = time.time()
+            self._cpu_start = self._read_cpu()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="xray_profiler", daemon=True)
+        self._thread.start()
+        self.logger.info(f"Thread profiler started for {duration}s with {interval}s interval")
+        return True
+
+    def stop(self):
+        """Остановить профилирование"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _run(self):
+        deadline = self.started + self.duration
+        try:
+            while not self._stop.is_set() and time.time() < deadline:
+                self._sample()
+                self._stop.wait(self.interval)
+        except Exception as e:
+            self.logger.error(f"Thread profiler error: {e}")
+        finally:
+            with self._lock:
+                self.finished = time.time()
+                self._cpu_end = self._read_cpu()
+            self.logger.info(f"Thread profiler finished: {self.samples} samples")
+
+    def _read_cpu(self) -> Dict[int, float]:
+        cpu = {}
+        for thread in threading.enumerate():
+            native_id = getattr(thread, "native_id", None)
+            if thread.ident and native_id:
+                value = read_thread_cpu(native_id)
+                if value is not None:
+                    cpu[thread.ident] = value
+        return cpu
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        frames = sys._current_frames()
+        with self._lock:
+            self.samples += 1
+            self._thread_names.update(names)
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                if not stack:
+                    continue
+                self.thread_samples[ident] += 1
+                self.function_samples[stack[0]] += 1
+                name = names.get(ident, str(ident))
+                key = ";".join([name] + stack[::-1])
+                if key in self.stacks or len(self.stacks) < MAX_STACKS:
+                    self.stacks[key] += 1
+                else:
+                    self.dropped += 1
+
+    def status(self) -> dict:
+        return {
+            "running": self.running,
+            "started": self.started,
+            "finished": self.finished,
+            "duration": self.duration,
+            "interval": self.interval,
+            "samples": self.samples,
+            "dropped_stacks": self.dropped,
+        }
+
+    def results(self, top: int = 20) -> dict:
+        """Самые загруженные потоки и функции"""
+        with self._lock:
+            cpu_end = self._cpu_end if self.finished else self._read_cpu()
+            elapsed = ((self.finished or time.time()) - self.started) if self.started else 0
+            threads = []
+            for ident, count in self.thread_samples.most_common():
+                cpu = None
+                if ident in cpu_end and ident in self._cpu_start:
+                    cpu = round(cpu_end[ident] - self._cpu_start[ident], 3)
+                threads.append({
+                    "id": ident,
+                    "name": self._thread_names.get(ident, str(ident)),
+                    "samples": count,
+                    "cpu_seconds": cpu,
+                    "cpu_percent": round(cpu / elapsed * 100, 1) if cpu is not None and elapsed else None,
+                })
+            # Самые загруженные по CPU потоки - первыми, без данных CPU - по числу сэмплов
+            threads.sort(key=lambda t: (t["cpu_seconds"] is not None, t["cpu_seconds"] or 0, t["samples"]),
+                         reverse=True)
+            functions = [{"function": name, "samples": count}
+                         for name, count in self.function_samples.most_common(top)]
+            result = self.status()
+            result.update({
+                "elapsed": round(elapsed, 3),
+                "threads": threads[:top],
+                "functions": functions,
+            })
+            return result
+
+    def collapsed(self) -> str:
+        """Стеки в collapsed-stack формате (``поток;кадр;...;кадр количество``)"""
+        with self._lock:
+            return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
@@ -0,0 +1,99 @@
+import time
+import threading
+from typing import Optional
+from plugins.xray.utils.thread_pool_monitor import _batch_writer_values
+
+DEFAULT_INTERVAL = 10
+
+
+class WidgetSnapshotter:
+    """Данные виджета xray, собираемые в фоне.
+
+    Рендер виджета берёт готовый снимок из памяти и не обходит плагины
+    и хранилище объектов на каждый показ.
+    """
+
+    def __init__(self, logger, plugins_registry, objects_storage, pool_monitor=None,
+                 thread_pool_monitor=None, cycle_watchdog=None, interval: float = DEFAULT_INTERVAL):
+        self.logger = logger
+        self.plugins_registry = plugins_registry
+        self.objects_storage = objects_storage
+        self.pool_monitor = pool_monitor
+        self.thread_pool_monitor = thread_pool_monitor
+        self.cycle_watchdog = cycle_watchdog
+        self.interval = interval
+        self._snapshot: Optional[dict] = None
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def build(self) -> dict:
+        """Собрать снимок"""
+        services_count = 0
+        service_work = 0
+        for name, plugin in list(self.plugins_registry.items()):
+            if 'cycle' in plugin['instance'].actions:
+                services_count += 1
+                if plugin['instance'].is_alive():
+                    service_work += 1
+        stalled = self.cycle_watchdog.stalled() if self.cycle_watchdog else []
+        snapshot = {
+            "services": {
+                "count": services_count,
+                "alive": service_work,
+                "stopped": services_count - service_work,
+                "stalled": len(stalled),
+                "stalled_names": stalled,
+            },
+            "objects": len(self.objects_storage.items()),
+            "pool": None,
+            "batch_writer": None,
+            "timestamp": time.time(),
+        }
+        if self.pool_monitor:
+            stats = self.pool_monitor.get_pool_stats()
+            snapshot["pool"] = {
+                "active": stats.active_connections,
+                "size": stats.pool_size,
+                "usage_percent": stats.pool_usage_percent,
+                "overflow": stats.overflow,
+            }
+        last_stats = self.thread_pool_monitor.last_stats if self.thread_pool_monitor else None
+        if last_stats and last_stats.get("batch_writer"):
+            values = _batch_writer_values(last_stats["batch_writer"])
+            snapshot["batch_writer"] = {
+                "queue": values["batch_size"],
+                "errors": values["total_errors"],
+            }
+        return snapshot
+
+    def refresh(self) -> dict:
+        self._snapshot = self.build()
+        return self._snapshot
+
+    def get(self) -> dict:
+        """Последний снимок (при первом обращении до запуска фона - собирается сразу)"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh()
+        return snapshot
+
+    def start(self):
+        """Запуск фонового обновления"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+
+        def refresh_loop():
+            while not self._stop_event.is_set():
+                try:
+                    self.refresh()
+                except Exception as e:
+                    self.logger.error(f"Widget snapshot error: {e}")
+                self._stop_event.wait(self.interval)
+
+        self._thread = threading.Thread(target=refresh_loop, name="xray_widget", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Остановка фонового обновления"""
+        self._stop_event.set()